@@ -1,10 +1,27 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
-from matplotlib.gridspec import GridSpec
-from io import BytesIO
 import os
+import uuid
+from contextlib import contextmanager, nullcontext
+
+from calculos import CUADRANTES, resultado_seccion
+from estadisticas import (Agregados, agregados_memoizados, cubo_dataset, fusionar_agregados, tabla_por_ciclo)
+from filtros import COLUMNA_INGRESO, COLUMNAS_FILTRO, INGRESARON, NO_INGRESARON, clave_filtros
+from graficas import (MOTOR_GRAFICAS, MOTOR_VEGA, MOTORES_GRAFICAS, TRABAJADORES_GRAFICAS,
+                      UMBRAL_PUNTOS, especificacion_merito, estadisticas_cache_figuras, grafica_boxplot_modalidad,
+                      grafica_coincidencia, grafica_correlacion_areas, grafica_demanda_selectividad,
+                      grafica_departamento, grafica_edades, grafica_frecuencia_opcion, grafica_genero,
+                      grafica_gestion, grafica_histogramas_materias, grafica_matriz_correlacion, grafica_merito,
+                      grafica_modalidad, grafica_nacionalidad, grafica_perfil_materias,
+                      grafica_probabilidad, grafica_probabilidad_selectividad, grafica_puntaje_especialidad,
+                      grafica_rangos_merito, grafica_sexo, grafica_tipo_institucion, png_grafica,
+                      renderizar_pngs)
+from ingesta import (ColumnasFaltantesError, EXTENSIONES_ACEPTADAS, MAXIMOS_POR_VERSION, VERSION_EXAMEN,
+                     bytes_snapshot, cargar_datasets, ciclo_de_archivo, detectar_formato,
+                     estadisticas_cache_ingesta, huella_particiones, retener_datasets)
+from percentiles import indice_percentiles, indice_percentiles_ciclos
+from perfilado import ARCHIVO_PERFILADO, PERFILADO_ACTIVO, Perfilador
+from streaming import cargar_agregados
 
 # Configuración de la página
 st.set_page_config(
@@ -77,324 +94,185 @@ else:
              caption="Universidad Nacional Agraria La Molina - Proceso de Admisión")
 
 
+# Gráficas pedidas dentro de un lote: (lugar reservado en la página, especificación)
+_lote_graficas = None
 
 
-def convertir_a_escala_20(dataframe):
-    """Convierte las calificaciones a escala de 0 a 20"""
-    df_convertido = dataframe.copy()
-    
-    # Definir los máximos posibles para cada área
-    maximos = {
-        'RV': 25, 'RM': 25, 'Arit': 5, 'Alg': 5, 'Geo': 4, 'Trig': 4,
-        'Bio': 6, 'Qui': 6, 'Fis': 6, 'Eco': 4, 'Geog': 5, 'His': 5, 'Final': 100
-    }
-    
-    # Lista de columnas de calificaciones
-    columnas_calificaciones = ['RV', 'RM', 'Arit', 'Alg', 'Geo', 'Trig', 'Bio', 'Qui', 'Fis', 'Eco', 'Geog', 'His', 'Final']
-    
-    # Convertir SOLO las columnas de calificaciones a escala 0-20
-    for col in columnas_calificaciones:
-        if col in df_convertido.columns and col in maximos:
-            df_convertido[col] = (df_convertido[col] / maximos[col]) * 20
-    
-    # Redondear SOLO las columnas convertidas
-    df_convertido[columnas_calificaciones] = df_convertido[columnas_calificaciones].round(2)
-    
-    return df_convertido
+@contextmanager
+def lote_graficas(trabajadores=TRABAJADORES_GRAFICAS):
+    """Agrupa las gráficas mostradas dentro del bloque y las dibuja juntas (en paralelo) al salir
+
+    Cada gráfica reserva su lugar con st.empty(), así que el orden y las columnas de la
+    página se mantienen aunque la imagen llegue al final.
+    """
+    global _lote_graficas
+    _lote_graficas = []
+    try:
+        yield
+        lugares = [lugar for lugar, _ in _lote_graficas]
+        pngs = renderizar_pngs([especificacion for _, especificacion in _lote_graficas], trabajadores)
+        for lugar, png in zip(lugares, pngs):
+            lugar.image(png, use_container_width=True)
+    finally:
+        _lote_graficas = None
+
+
+# Perfilador de la página actual (None si el perfilado está desactivado)
+_perfilador = None
+
+
+def bloque_medido(nombre):
+    """Mide el bloque (tiempo y memoria) si el perfilado está activo"""
+    return _perfilador.seccion(nombre) if _perfilador is not None else nullcontext()
+
+
+def id_sesion():
+    """Identificador de esta sesión del navegador (para reservar en las cachés compartidas lo que usa)"""
+    if 'id_sesion' not in st.session_state:
+        st.session_state['id_sesion'] = uuid.uuid4().hex
+    return st.session_state['id_sesion']
+
+
+def motor_graficas():
+    """Motor elegido en la barra lateral para las gráficas con muchos puntos"""
+    return st.session_state.get('motor_graficas', MOTOR_GRAFICAS)
 
-def analisis_materias(dataframe):
+
+def mostrar_grafica(clave, id_grafica, dibujar, *args):
+    """Muestra la gráfica desde la caché de figuras; dentro de un lote solo reserva su lugar"""
+    if _lote_graficas is None:
+        st.image(png_grafica(clave, id_grafica, dibujar, *args), use_container_width=True)
+    else:
+        _lote_graficas.append((st.empty(), (clave, id_grafica, dibujar, args)))
+
+
+
+def analisis_materias(dataframe, clave=None):
     """Función para el análisis específico por materias"""
     
     st.markdown('<div class="section-header">📚 Análisis Detallado por Materias</div>', unsafe_allow_html=True)
     
-    df_plot = dataframe
     columnas_sin_final = ['RV', 'RM', 'Arit', 'Alg', 'Geo', 'Trig', 'Bio', 'Qui', 'Fis', 'Eco', 'Geog', 'His']
-    columnas_calificaciones = ['RV', 'RM', 'Arit', 'Alg', 'Geo', 'Trig', 'Bio', 'Qui', 'Fis', 'Eco', 'Geog', 'His', 'Final']
     
-    # Métricas rápidas de materias
-    col1, col2, col3, col4 = st.columns(4)
-    with col1:
-        mejor_materia = df_plot[columnas_sin_final].mean().idxmax()
-        mejor_promedio = df_plot[columnas_sin_final].mean().max()
-        st.metric("Mejor rendimiento", f"{mejor_materia}", f"{mejor_promedio:.1f}")
+    # Estadísticas precalculadas (compartidas con el Análisis General para la misma clave)
+    with bloque_medido('Materias · Estadísticas y métricas'):
+        resultado = resultado_seccion('materias', dataframe, clave)
+        resumen = resultado['resumen']
+        correlaciones = resultado['correlaciones']
+        promedios_materias = resultado['promedios']
+        std_materias = resultado['desviaciones']
     
-    with col2:
-        peor_materia = df_plot[columnas_sin_final].mean().idxmin()
-        peor_promedio = df_plot[columnas_sin_final].mean().min()
-        st.metric("Menor rendimiento", f"{peor_materia}", f"{peor_promedio:.1f}")
+        # Métricas rápidas de materias
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            mejor_materia = promedios_materias.idxmax()
+            mejor_promedio = promedios_materias.max()
+            st.metric("Mejor rendimiento", f"{mejor_materia}", f"{mejor_promedio:.1f}")
     
-    with col3:
-        mayor_variabilidad = df_plot[columnas_sin_final].std().idxmax()
-        mayor_std = df_plot[columnas_sin_final].std().max()
-        st.metric("Mayor variabilidad", f"{mayor_variabilidad}", f"{mayor_std:.1f}")
+        with col2:
+            peor_materia = promedios_materias.idxmin()
+            peor_promedio = promedios_materias.min()
+            st.metric("Menor rendimiento", f"{peor_materia}", f"{peor_promedio:.1f}")
     
-    with col4:
-        mejor_correlacion = df_plot[columnas_calificaciones].corr()['Final'].drop('Final').idxmax()
-        correlacion_valor = df_plot[columnas_calificaciones].corr()['Final'].drop('Final').max()
-        st.metric("Mejor correlación con Final", f"{mejor_correlacion}", f"{correlacion_valor:.3f}")
+        with col3:
+            mayor_variabilidad = std_materias.idxmax()
+            mayor_std = std_materias.max()
+            st.metric("Mayor variabilidad", f"{mayor_variabilidad}", f"{mayor_std:.1f}")
+    
+        with col4:
+            mejor_correlacion = correlaciones['Final'].drop('Final').idxmax()
+            correlacion_valor = correlaciones['Final'].drop('Final').max()
+            st.metric("Mejor correlación con Final", f"{mejor_correlacion}", f"{correlacion_valor:.3f}")
 
     # 1. GRÁFICO DE BARRAS COMPARATIVO CON RADAR
-    st.markdown("#### 1. Comparativa de Rendimiento por Materia")
+    with bloque_medido('Materias · 1. Comparativa de Rendimiento por Materia'):
+        st.markdown("#### 1. Comparativa de Rendimiento por Materia")
     
-    fig = plt.figure(figsize=(20, 8))
-    gs = GridSpec(1, 2, figure=fig)
-
-    # Subplot 1: Radar chart
-    ax1 = fig.add_subplot(gs[0, 0], polar=True)
-    promedios = [df_plot[materia].mean() for materia in columnas_sin_final]
-    angles = np.linspace(0, 2*np.pi, len(promedios), endpoint=False).tolist()
-    angles += angles[:1]
-    promedios_radar = promedios + [promedios[0]]
-
-    ax1.plot(angles, promedios_radar, 'o-', linewidth=2, label='Promedio', color='blue', markersize=8)
-    ax1.fill(angles, promedios_radar, alpha=0.25, color='blue')
-    ax1.set_xticks(angles[:-1])
-    ax1.set_xticklabels(columnas_sin_final)
-    ax1.set_ylim(0, 20)
-    ax1.set_yticks([0, 5, 10, 15, 20])
-    ax1.grid(True)
-    ax1.set_title('Perfil Académico Promedio - Gráfico Radar', fontsize=14, fontweight='bold', pad=20)
-
-    # Subplot 2: Barras comparativas
-    ax2 = fig.add_subplot(gs[0, 1])
-    colors = plt.cm.Set3(np.linspace(0, 1, len(columnas_sin_final)))
-    bars = ax2.bar(range(len(promedios)), promedios, color=colors, alpha=0.7, edgecolor='black')
-
-    ax2.set_xticks(range(len(promedios)))
-    ax2.set_xticklabels(columnas_sin_final, rotation=45)
-    ax2.set_ylabel('Calificación (0-20)')
-    ax2.set_ylim(0, 20)
-    ax2.grid(True, alpha=0.3, axis='y')
-    ax2.set_title('Calificaciones Promedio por Materia', fontsize=14, fontweight='bold')
-
-    # Añadir valores en las barras
-    for bar, valor in zip(bars, promedios):
-        ax2.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.1, 
-                f'{valor:.1f}', ha='center', va='bottom', fontweight='bold')
-
-    plt.tight_layout()
-    st.pyplot(fig)
-    plt.close()
+        mostrar_grafica(clave, 'perfil_materias', grafica_perfil_materias, columnas_sin_final, promedios_materias.tolist())
 
     # 2. MATRIZ DE CORRELACIÓN (SOLO calificaciones)
-    st.markdown("#### 2. Matriz de Correlación entre Materias")
+    with bloque_medido('Materias · 2. Matriz de Correlación entre Materias'):
+        st.markdown("#### 2. Matriz de Correlación entre Materias")
     
-    fig, ax = plt.subplots(figsize=(12, 10))
-    correlaciones = df_plot[columnas_calificaciones].corr()
-
-    im = ax.imshow(correlaciones, cmap='RdBu_r', aspect='auto', vmin=-1, vmax=1)
-
-    ax.set_xticks(range(len(columnas_calificaciones)))
-    ax.set_yticks(range(len(columnas_calificaciones)))
-    ax.set_xticklabels(columnas_calificaciones, rotation=45, ha='right')
-    ax.set_yticklabels(columnas_calificaciones)
-
-    # Añadir valores en las celdas
-    for i in range(len(columnas_calificaciones)):
-        for j in range(len(columnas_calificaciones)):
-            color = 'white' if abs(correlaciones.iloc[i, j]) > 0.5 else 'black'
-            ax.text(j, i, f'{correlaciones.iloc[i, j]:.2f}', 
-                    ha="center", va="center", color=color, fontweight='bold', fontsize=8)
-
-    ax.set_title('Matriz de Correlación entre Materias', fontsize=16, fontweight='bold')
-    plt.colorbar(im, ax=ax, shrink=0.8)
-    plt.tight_layout()
-    st.pyplot(fig)
-    plt.close()
+        mostrar_grafica(clave, 'matriz_correlacion', grafica_matriz_correlacion, correlaciones)
 
     # 3. ANÁLISIS POR GÉNERO (si existe la columna SEXO)
-    if 'SEXO' in df_plot.columns:
-        st.markdown("#### 3. Análisis de Rendimiento por Género")
-        
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(18, 6))
-        
-        # Boxplot por género para el puntaje final
-        generos = df_plot['SEXO'].unique()
-        for i, genero in enumerate(generos):
-            data_genero = df_plot[df_plot['SEXO'] == genero]['Final']
-            positions = [i + 1]
-            box = ax1.boxplot([data_genero], positions=positions, widths=0.6, 
-                            patch_artist=True, labels=[genero])
-            for patch in box['boxes']:
-                patch.set_facecolor(plt.cm.Pastel1(i))
-        
-        ax1.set_ylabel('Puntaje Final (0-20)')
-        ax1.set_ylim(0, 20)
-        ax1.grid(True, alpha=0.3, axis='y')
-        ax1.set_title('Puntaje Final por Género', fontsize=14, fontweight='bold')
+    with bloque_medido('Materias · 3. Análisis de Rendimiento por Género'):
+        if resultado['cajas_genero'] is not None:
+            st.markdown("#### 3. Análisis de Rendimiento por Género")
         
-        # Promedio por género para cada materia
-        if len(generos) > 0:
-            promedio_genero_materia = df_plot.groupby('SEXO')[columnas_sin_final].mean().T
-            
-            for genero in promedio_genero_materia.columns:
-                ax2.plot(range(len(columnas_sin_final)), promedio_genero_materia[genero], 
-                        'o-', label=genero, linewidth=2, markersize=6)
-            
-            ax2.set_xticks(range(len(columnas_sin_final)))
-            ax2.set_xticklabels(columnas_sin_final, rotation=45)
-            ax2.set_ylabel('Calificación Promedio (0-20)')
-            ax2.set_ylim(0, 20)
-            ax2.grid(True, alpha=0.3)
-            ax2.legend()
-            ax2.set_title('Rendimiento por Género y Materia', fontsize=14, fontweight='bold')
-        
-        plt.tight_layout()
-        st.pyplot(fig)
-        plt.close()
+            mostrar_grafica(clave, 'genero', grafica_genero, resultado['cajas_genero'],
+                            resultado['promedio_genero_materia'], columnas_sin_final)
 
     # 4. HISTOGRAMAS ACUMULADOS PARA LAS PRINCIPALES MATERIAS
-    st.markdown("#### 4. Distribución de Calificaciones por Materia")
+    with bloque_medido('Materias · 4. Distribución de Calificaciones por Materia'):
+        st.markdown("#### 4. Distribución de Calificaciones por Materia")
     
-    fig, axes = plt.subplots(3, 4, figsize=(20, 12))
-    axes = axes.ravel()
-
-    # Seleccionar las primeras 12 materias para los histogramas
-    materias_histograma = columnas_sin_final[:12]
-    colors = plt.cm.Set3(np.linspace(0, 1, len(materias_histograma)))
-
-    for i, materia in enumerate(materias_histograma):
-        if i < len(axes):
-            axes[i].hist(df_plot[materia], bins=15, alpha=0.7, color=colors[i], edgecolor='black')
-            axes[i].set_xlim(0, 20)
-            axes[i].set_xlabel('Calificación')
-            axes[i].set_ylabel('Frecuencia')
-            axes[i].set_title(f'{materia}\n(μ={df_plot[materia].mean():.1f}, σ={df_plot[materia].std():.1f})')
-            axes[i].grid(True, alpha=0.3)
-
-    # Ocultar ejes vacíos
-    for i in range(len(materias_histograma), len(axes)):
-        axes[i].set_visible(False)
-
-    plt.suptitle('Distribución de Calificaciones por Materia', fontsize=16, fontweight='bold', y=0.95)
-    plt.tight_layout()
-    st.pyplot(fig)
-    plt.close()
+        mostrar_grafica(clave, 'histogramas_materias', grafica_histogramas_materias,
+                        resultado['histogramas'], columnas_sin_final, promedios_materias, std_materias)
 
     # 5. ESTADÍSTICAS RESUMEN
-    st.markdown("#### 5. Estadísticas Resumen Detalladas")
+    with bloque_medido('Materias · 5. Estadísticas Resumen Detalladas'):
+        st.markdown("#### 5. Estadísticas Resumen Detalladas")
     
-    col1, col2 = st.columns(2)
+        col1, col2 = st.columns(2)
     
-    with col1:
-        st.markdown("**📊 PUNTAJE FINAL:**")
-        st.write(f"- Promedio: {df_plot['Final'].mean():.2f}")
-        st.write(f"- Máximo: {df_plot['Final'].max():.2f}")
-        st.write(f"- Mínimo: {df_plot['Final'].min():.2f}")
-        st.write(f"- Desviación estándar: {df_plot['Final'].std():.2f}")
-        
-        st.markdown("**🎯 TOP 5 MATERIAS CON MEJOR RENDIMIENTO:**")
-        mejores_materias = df_plot[columnas_sin_final].mean().sort_values(ascending=False)
-        for i, (materia, promedio) in enumerate(mejores_materias.head(5).items(), 1):
-            st.write(f"{i}. {materia}: {promedio:.2f}")
+        with col1:
+            st.markdown("**📊 PUNTAJE FINAL:**")
+            st.write(f"- Promedio: {resumen.loc['Final', 'mean']:.2f}")
+            st.write(f"- Máximo: {resumen.loc['Final', 'max']:.2f}")
+            st.write(f"- Mínimo: {resumen.loc['Final', 'min']:.2f}")
+            st.write(f"- Desviación estándar: {resumen.loc['Final', 'std']:.2f}")
+            st.write(f"- Puntaje para estar en el 10% superior: {resultado['final_top_10']:.2f}")
+        
+            st.markdown("**🎯 TOP 5 MATERIAS CON MEJOR RENDIMIENTO:**")
+            mejores_materias = promedios_materias.sort_values(ascending=False)
+            for i, (materia, promedio) in enumerate(mejores_materias.head(5).items(), 1):
+                st.write(f"{i}. {materia}: {promedio:.2f}")
     
-    with col2:
-        st.markdown("**⚠️ TOP 5 MATERIAS CON MAYOR VARIABILIDAD:**")
-        materias_variabilidad = df_plot[columnas_sin_final].std().sort_values(ascending=False)
-        for i, (materia, std) in enumerate(materias_variabilidad.head(5).items(), 1):
-            st.write(f"{i}. {materia}: {std:.2f}")
-        
-        st.markdown("**🔗 TOP 5 CORRELACIONES CON PUNTAJE FINAL:**")
-        correlaciones_final = df_plot[columnas_calificaciones].corr()['Final'].sort_values(ascending=False)
-        for i, (materia, corr) in enumerate(correlaciones_final.head(6).items(), 1):
-            if materia != 'Final' and i <= 5:
-                st.write(f"{materia}: {corr:.3f}")
+        with col2:
+            st.markdown("**⚠️ TOP 5 MATERIAS CON MAYOR VARIABILIDAD:**")
+            materias_variabilidad = std_materias.sort_values(ascending=False)
+            for i, (materia, std) in enumerate(materias_variabilidad.head(5).items(), 1):
+                st.write(f"{i}. {materia}: {std:.2f}")
+        
+            st.markdown("**🔗 TOP 5 CORRELACIONES CON PUNTAJE FINAL:**")
+            correlaciones_final = correlaciones['Final'].sort_values(ascending=False)
+            for i, (materia, corr) in enumerate(correlaciones_final.head(6).items(), 1):
+                if materia != 'Final' and i <= 5:
+                    st.write(f"{materia}: {corr:.3f}")
 
     # 6. TABLA DE ESTADÍSTICAS COMPLETA
-    st.markdown("#### 6. Tabla Completa de Estadísticas por Materia")
+    with bloque_medido('Materias · 6. Tabla Completa de Estadísticas por Materia'):
+        st.markdown("#### 6. Tabla Completa de Estadísticas por Materia")
     
-    stats_df = pd.DataFrame({
-        'Materia': columnas_sin_final,
-        'Promedio': [df_plot[materia].mean() for materia in columnas_sin_final],
-        'Mediana': [df_plot[materia].median() for materia in columnas_sin_final],
-        'Desviación Estándar': [df_plot[materia].std() for materia in columnas_sin_final],
-        'Máximo': [df_plot[materia].max() for materia in columnas_sin_final],
-        'Mínimo': [df_plot[materia].min() for materia in columnas_sin_final],
-        'Correlación con Final': [df_plot[columnas_calificaciones].corr()['Final'][materia] for materia in columnas_sin_final]
-    }).round(3)
-    
-    st.dataframe(stats_df.sort_values('Promedio', ascending=False), use_container_width=True)
+        st.dataframe(resultado['tabla'], use_container_width=True)
 
 
     
-def generar_todas_graficas(dataframe):
-    """Función para generar todas las gráficas en Streamlit"""
-    
-    df_plot = dataframe
-    
-    # Header principal
-    st.markdown('<div class="main-header">📊 Dashboard de Análisis - Proceso de Admisión 2025-I</div>', unsafe_allow_html=True)
-    
-    # Métricas principales
-    col1, col2, col3, col4 = st.columns(4)
-    with col1:
-        st.metric("Total de Postulantes", len(df_plot))
-    with col2:
-        st.metric("Edad Promedio", f"{df_plot['EDAD'].mean():.1f} años")
-    with col3:
-        st.metric("Puntaje Promedio", f"{df_plot['Final'].mean():.2f}")
-    with col4:
-        coincidencia = (df_plot['OPCION.1'] == df_plot['Especialidad']).mean() * 100
-        st.metric("Coincidencia 1ra Opción", f"{coincidencia:.1f}%")
-    
+def seccion_edades(df_plot, clave=None):
+    """Sección 1: histograma de edades"""
+
     # 1. Distribución de edades
     st.markdown('<div class="section-header">1. Distribución de Edades</div>', unsafe_allow_html=True)
-    fig, ax = plt.subplots(figsize=(10, 6))
-    ax.hist(df_plot['EDAD'], bins=8, color='cornflowerblue', edgecolor='black', alpha=0.7)
-    ax.set_title("Distribución de edades de postulantes", fontsize=14, fontweight='bold')
-    ax.set_xlabel("Edad", fontsize=12)
-    ax.set_ylabel("Frecuencia", fontsize=12)
-    ax.grid(axis='y', linestyle='--', alpha=0.7)
-    st.pyplot(fig)
-    plt.close()
-    
+    resultado = resultado_seccion('edades', df_plot, clave)
+    mostrar_grafica(clave, 'edades', grafica_edades, resultado['conteos'], resultado['bordes'])
+
+
+def seccion_sexo(df_plot, clave=None):
+    """Sección 2: distribución por sexo"""
+
     # 2. Distribución por sexo
     # 2. Distribución por sexo
     st.markdown('<div class="section-header">2. Distribución por Sexo</div>', unsafe_allow_html=True)
+    resultado = resultado_seccion('sexo', df_plot, clave)
+    sexo_counts = resultado['conteos']
     col1, col2 = st.columns([2, 1])
 
     with col1:
-        fig, ax = plt.subplots(figsize=(8, 8))
-        
-        # Obtener los conteos y ordenarlos consistentemente
-        sexo_counts = df_plot['SEXO'].value_counts()
-        
-        # Definir colores según el sexo (coherentes con las métricas)
-        colors = []
-        labels = []
-        for sexo in sexo_counts.index:
-            if sexo.lower() == 'femenino':
-                colors.append('#E75480')  # Rosa igual que las métricas
-                labels.append(sexo)
-            elif sexo.lower() == 'masculino':
-                colors.append('#0074D9')  # Azul igual que las métricas
-                labels.append(sexo)
-            else:
-                colors.append('lightgray')  # Color por defecto
-                labels.append(sexo)
-        
-        # Crear el gráfico pie con colores personalizados
-        wedges, texts, autotexts = ax.pie(sexo_counts.values, labels=labels, autopct='%1.1f%%',
-                                        colors=colors, startangle=90, explode=(0.05, 0) if len(sexo_counts) == 2 else (0,))
-        
-        # Personalizar el texto de los porcentajes
-        for autotext in autotexts:
-            autotext.set_color('white')
-            autotext.set_fontweight('bold')
-            autotext.set_fontsize(11)
-        
-        # Personalizar las etiquetas
-        for text in texts:
-            text.set_fontweight('bold')
-            text.set_fontsize(12)
-        
-        ax.set_title('Distribución de Postulantes por Sexo', fontsize=14, fontweight='bold')
-        ax.set_ylabel('')
-        st.pyplot(fig)
-        plt.close()
+        mostrar_grafica(clave, 'sexo', grafica_sexo, sexo_counts)
 
     with col2:
-        sexo_counts = df_plot['SEXO'].value_counts()
         for sexo, count in sexo_counts.items():
             # Definir colores según el sexo (coherentes con el pie chart)
             if sexo.lower() == 'femenino':
@@ -408,194 +286,88 @@ def generar_todas_graficas(dataframe):
             <div class="metric-card">
                 <h4 style="color: {color}; font-weight: bold;">{sexo}</h4>
                 <h3 style="color: {color}; font-weight: bold;">{count}</h3>
-                <p style="color: {color}; font-weight: bold;">({count/len(df_plot)*100:.1f}%)</p>
+                <p style="color: {color}; font-weight: bold;">({count/resultado['total']*100:.1f}%)</p>
             </div>
             """, unsafe_allow_html=True)
 
 
+def seccion_nacionalidad(df_plot, clave=None):
+    """Sección 3: distribución por nacionalidad (acepta también Agregados)"""
+    resultado = resultado_seccion('nacionalidad', df_plot, clave)
+
     # 3. Distribución por nacionalidad
     # 3. Distribución por nacionalidad
     st.markdown('<div class="section-header">3. Distribución por Nacionalidad</div>', unsafe_allow_html=True)
-    fig, ax = plt.subplots(figsize=(10, 6))
-    nationality_counts = df_plot['NACIONALIDAD'].value_counts()
-    bars = ax.bar(nationality_counts.index, nationality_counts.values, 
-                color='skyblue', edgecolor='black', alpha=0.7)
-    ax.set_title('Distribución de Postulantes por Nacionalidad', fontsize=14, fontweight='bold')
-    ax.set_xlabel('Nacionalidad', fontsize=12)
-    ax.set_ylabel('Número de Postulantes', fontsize=12)
-    ax.tick_params(axis='x', rotation=45)
-
-    # Calcular límite Y dinámicamente
-    max_valor = nationality_counts.max()
-    y_upper_limit = max_valor + (max_valor * 0.12)  # 12% de margen superior
-    ax.set_ylim(0, y_upper_limit)
-
-    for bar in bars:
-        height = bar.get_height()
-        # Posicionar texto dentro del gráfico con margen
-        text_y_pos = min(height + (max_valor * 0.01), y_upper_limit - (max_valor * 0.005))
-        ax.text(bar.get_x() + bar.get_width()/2., text_y_pos,
-                f'{int(height)}', ha='center', va='bottom', fontsize=10)
-    ax.grid(axis='y', linestyle='--', alpha=0.7)
-    plt.tight_layout()
-    st.pyplot(fig)
-    plt.close()
-    
+    mostrar_grafica(clave, 'nacionalidad', grafica_nacionalidad, resultado['conteos'])
+
+
+def seccion_departamento(df_plot, clave=None):
+    """Sección 4: distribución por departamento de domicilio (acepta también Agregados)"""
+    resultado = resultado_seccion('departamento', df_plot, clave)
+
     # 4. Distribución por departamento de domicilio
     # 4. Distribución por departamento de domicilio
     st.markdown('<div class="section-header">4. Distribución por Departamento de Domicilio</div>', unsafe_allow_html=True)
-    fig, ax = plt.subplots(figsize=(12, 8))
-    dep_counts = df_plot['DEP..DOM.'].value_counts().sort_values(ascending=True)
-    bars = ax.barh(dep_counts.index, dep_counts.values, 
-                color='steelblue', alpha=0.7, edgecolor='black')
-    ax.set_title('Distribución de Postulantes por Departamento de Domicilio', fontsize=14, fontweight='bold')
-    ax.set_xlabel('Número de Postulantes', fontsize=12)
-    ax.set_ylabel('Departamento', fontsize=12)
-
-    # Calcular límite X dinámicamente
-    max_valor = dep_counts.max()
-    x_upper_limit = max_valor + (max_valor * 0.15)  # 15% de margen superior
-    ax.set_xlim(0, x_upper_limit)
-
-    for bar in bars:
-        width = bar.get_width()
-        # Posicionar texto dentro del gráfico con margen
-        text_x_pos = min(width + (max_valor * 0.01), x_upper_limit - (max_valor * 0.02))
-        ax.text(text_x_pos, bar.get_y() + bar.get_height()/2, 
-                f'{int(width)}', ha='left', va='center', fontsize=10)
-    ax.grid(axis='x', linestyle='--', alpha=0.3)
-    plt.tight_layout()
-    st.pyplot(fig)
-    plt.close()
-    
+    mostrar_grafica(clave, 'departamento', grafica_departamento, resultado['conteos'])
+
+
+def seccion_institucion_gestion(df_plot, clave=None):
+    """Sección 5: tipo de institución y gestión educativa"""
+
     # 5. Tipo de Institución vs Gestión
     st.markdown('<div class="section-header">5. Tipo de Institución y Gestión Educativa</div>', unsafe_allow_html=True)
+    resultado = resultado_seccion('institucion_gestion', df_plot, clave)
     col1, col2 = st.columns(2)
     
     with col1:
-        fig, ax = plt.subplots(figsize=(8, 6))
-        tipo_counts = df_plot['TIPO.INSTITUCIÓN'].value_counts()
-        colors_circle = ['lightblue', 'lightcoral', 'lightgreen']
-        wedges, texts, autotexts = ax.pie(tipo_counts.values, labels=None, autopct='%1.1f%%',
-                                         startangle=90, colors=colors_circle)
-        ax.legend(wedges, [f'{label} ({count})' for label, count in zip(tipo_counts.index, tipo_counts.values)],
-                 title="Tipo de Institución", loc="center")
-        ax.set_title('Distribución por Tipo de Institución Educativa', fontsize=14, fontweight='bold')
-        st.pyplot(fig)
-        plt.close()
+        mostrar_grafica(clave, 'tipo_institucion', grafica_tipo_institucion, resultado['tipos'])
     
     with col2:
-        fig, ax = plt.subplots(figsize=(8, 6))
-        gestion_counts = df_plot['GESTIÓN'].value_counts().sort_values(ascending=True)
-        colors_bars = ['lightcoral', 'lightgreen', 'lightblue']
-        bars = ax.barh(gestion_counts.index, gestion_counts.values, 
-                    color=colors_bars, alpha=0.8, edgecolor='black')
-        
-        # Calcular límite X dinámicamente
-        max_valor = gestion_counts.max()
-        x_upper_limit = max_valor + (max_valor * 0.22)  # 18% de margen superior para texto más largo
-        ax.set_xlim(0, x_upper_limit)
-        
-        for bar in bars:
-            width = bar.get_width()
-            # Posicionar texto dentro del gráfico con margen
-            text_x_pos = min(width + (max_valor * 0.02), x_upper_limit - (max_valor * 0.03))
-            ax.text(text_x_pos, bar.get_y() + bar.get_height()/2, 
-                f'{int(width)} ({width/len(df_plot)*100:.1f}%)', 
-                ha='left', va='center', fontsize=10, fontweight='bold')
-        ax.set_title('Distribución por Tipo de Gestión Educativa', fontsize=14, fontweight='bold')
-        ax.set_xlabel('Número de Postulantes', fontsize=12)
-        ax.grid(axis='x', linestyle='--', alpha=0.3)
-        plt.tight_layout()
-        st.pyplot(fig)
-        plt.close()
-    
+        mostrar_grafica(clave, 'gestion', grafica_gestion, resultado['gestiones'], resultado['total'])
+
+
+def seccion_modalidad(df_plot, clave=None):
+    """Sección 6: distribución por modalidad (acepta también Agregados)"""
+    resultado = resultado_seccion('modalidad', df_plot, clave)
+
     # 6. Distribución por modalidad
     # 6. Distribución por modalidad
     st.markdown('<div class="section-header">6. Distribución por Modalidad</div>', unsafe_allow_html=True)
-    fig, ax = plt.subplots(figsize=(10, 6))
-    modalidad_counts = df_plot['MODALIDAD'].value_counts().sort_values(ascending=True)
-    bars = ax.barh(modalidad_counts.index, modalidad_counts.values, 
-                color='lightsteelblue', alpha=0.8, edgecolor='navy', linewidth=0.5)
-    ax.set_title('Distribución de Postulantes por Modalidad', fontsize=14, fontweight='bold')
-    ax.set_xlabel('Número de Postulantes', fontsize=12)
-    ax.set_ylabel('Modalidad', fontsize=12)
-
-    # Calcular límite X dinámicamente
-    max_valor = modalidad_counts.max()
-    x_upper_limit = max_valor + (max_valor * 0.22)  # 15% de margen superior
-    ax.set_xlim(0, x_upper_limit)
-
-    for bar in bars:
-        width = bar.get_width()
-        # Posicionar texto dentro del gráfico con margen
-        text_x_pos = min(width + (max_valor * 0.01), x_upper_limit - (max_valor * 0.02))
-        ax.text(text_x_pos, bar.get_y() + bar.get_height()/2, 
-            f'{int(width)} ({width/len(df_plot)*100:.2f}%)', 
-            ha='left', va='center', fontsize=10, fontweight='bold')
-    ax.grid(axis='x', linestyle='--', alpha=0.3)
-    plt.tight_layout()
-    st.pyplot(fig)
-    plt.close()
+    mostrar_grafica(clave, 'modalidad', grafica_modalidad, resultado['conteos'], resultado['total'])
 
 
+def seccion_comparacion_modalidad(df_plot, clave=None):
+    """Sección 7: edades y puntajes por modalidad"""
+
     # 7. Boxplots modalidad vs edad y puntaje
     st.markdown('<div class="section-header">7. Comparación por Modalidad</div>', unsafe_allow_html=True)
+    resultado = resultado_seccion('comparacion_modalidad', df_plot, clave)
     col1, col2 = st.columns(2)
     
     with col1:
-        fig, ax = plt.subplots(figsize=(8, 6))
-        df_plot.boxplot(column='EDAD', by='MODALIDAD', ax=ax, vert=False)
-        ax.set_title('Distribución de Edades por Modalidad', fontsize=12, fontweight='bold')
-        ax.set_xlabel('Edad', fontsize=10)
-        ax.set_ylabel('Modalidad', fontsize=10)
-        st.pyplot(fig)
-        plt.close()
+        mostrar_grafica(clave, 'edad_modalidad', grafica_boxplot_modalidad, resultado['cajas_edad'],
+                        'Distribución de Edades por Modalidad', 'Edad')
     
     with col2:
-        fig, ax = plt.subplots(figsize=(8, 6))
-        df_plot.boxplot(column='Final', by='MODALIDAD', ax=ax, vert=False)
-        ax.set_title('Distribución de Puntajes por Modalidad', fontsize=12, fontweight='bold')
-        ax.set_xlabel('Puntaje Final', fontsize=10)
-        ax.set_ylabel('Modalidad', fontsize=10)
-        st.pyplot(fig)
-        plt.close()
-    
+        mostrar_grafica(clave, 'puntaje_modalidad', grafica_boxplot_modalidad, resultado['cajas_puntaje'],
+                        'Distribución de Puntajes por Modalidad', 'Puntaje Final')
+
+
+def seccion_coincidencia(df_plot, clave=None):
+    """Sección 8: coincidencia entre primera opción y especialidad"""
+
     # 8. Coincidencia opción 1 vs especialidad
     # 8. Coincidencia opción 1 vs especialidad
     st.markdown('<div class="section-header">8. Coincidencia Primera Opción vs Especialidad</div>', unsafe_allow_html=True)
 
-    coincidencias = (df_plot['OPCION.1'] == df_plot['Especialidad']).value_counts()
-    porcentajes = (coincidencias / len(df_plot)) * 100
+    resultado = resultado_seccion('coincidencia', df_plot, clave)
+    coincidencias = resultado['coincidencias']
+    porcentajes = resultado['porcentajes']
 
     col1, col2 = st.columns([2, 1])
 
     with col1:
-        fig, ax = plt.subplots(figsize=(8, 6))
-        labels_ordenados = ['No Coincide', 'Coincide']
-        valores_ordenados = [coincidencias.get(False, 0), coincidencias.get(True, 0)]
-        porcentajes_ordenados = [porcentajes.get(False, 0), porcentajes.get(True, 0)]
-        
-        bars = ax.bar(labels_ordenados, valores_ordenados, 
-                    color=['lightcoral', 'lightgreen'], alpha=0.8, edgecolor='black')
-        ax.set_title('Coincidencia entre Primera Opción y Especialidad Asignada', fontsize=14, fontweight='bold')
-        ax.set_ylabel('Número de Postulantes', fontsize=12)
-        
-        # Calcular límite Y dinámicamente
-        max_valor = max(valores_ordenados)
-        y_upper_limit = max_valor + (max_valor * 0.15)  # 15% de margen superior
-        ax.set_ylim(0, y_upper_limit)
-        
-        for i, bar in enumerate(bars):
-            height = bar.get_height()
-            # Posicionar texto dentro del gráfico con margen
-            text_y_pos = min(height + (max_valor * 0.02), y_upper_limit - (max_valor * 0.01))
-            ax.text(bar.get_x() + bar.get_width()/2., text_y_pos,
-                f'{int(height)} postulantes\n({porcentajes_ordenados[i]:.1f}%)', 
-                ha='center', va='bottom', fontsize=11, fontweight='bold')
-        ax.grid(axis='y', linestyle='--', alpha=0.3)
-        st.pyplot(fig)
-        plt.close()
+        mostrar_grafica(clave, 'coincidencia', grafica_coincidencia, coincidencias, porcentajes)
     
     with col2:
         st.markdown("### Resumen de Coincidencia")
@@ -605,77 +377,23 @@ def generar_todas_graficas(dataframe):
         st.metric("No ingresaron a 1ra Opción", 
                  f"{coincidencias.get(False, 0)}", 
                  f"{porcentajes.get(False, 0):.1f}%")
-    
-    # 9. Boxplot puntaje final por especialidad
-    # 9. Boxplot puntaje final por especialidad
-    st.markdown('<div class="section-header">9. Puntaje Final por Especialidad</div>', unsafe_allow_html=True)
-
-    fig, ax = plt.subplots(figsize=(14, 8))
-    especialidad_puntaje_median = df_plot.groupby('Especialidad')['Final'].median().sort_values(ascending=False)
-    especialidades_ordenadas = especialidad_puntaje_median.index
-    puntaje_data = [df_plot[df_plot['Especialidad'] == esp]['Final'] for esp in especialidades_ordenadas]
 
-    box_plot = ax.boxplot(puntaje_data, labels=especialidades_ordenadas, patch_artist=True, vert=True)
-    colors = plt.cm.Set3(np.linspace(0, 1, len(especialidades_ordenadas)))
-    for patch, color in zip(box_plot['boxes'], colors):
-        patch.set_facecolor(color)
 
-    # Calcular el límite Y dinámicamente
-    max_puntaje_global = df_plot['Final'].max()
-    min_puntaje_global = df_plot['Final'].min()
-    rango_puntaje = max_puntaje_global - min_puntaje_global
+def seccion_puntaje_especialidad(df_plot, clave=None):
+    """Sección 9: puntaje final por especialidad"""
+    resultado = resultado_seccion('puntaje_especialidad', df_plot, clave)
 
-    # Establecer límites del eje Y con margen para las etiquetas
-    y_upper_limit = max_puntaje_global + (rango_puntaje * 0.08)  # 8% de margen superior
-    y_lower_limit = max(0, min_puntaje_global - (rango_puntaje * 0.02))  # 2% de margen inferior, mínimo 0
+    # 9. Boxplot puntaje final por especialidad
+    # 9. Boxplot puntaje final por especialidad
+    st.markdown('<div class="section-header">9. Puntaje Final por Especialidad</div>', unsafe_allow_html=True)
 
-    ax.set_ylim(y_lower_limit, y_upper_limit)
-
-    for i, especialidad in enumerate(especialidades_ordenadas):
-        datos_especialidad = df_plot[df_plot['Especialidad'] == especialidad]['Final']
-        max_puntaje = datos_especialidad.max()
-        
-        # Verificar que la etiqueta esté dentro del límite Y
-        y_pos = min(max_puntaje + 0.3, y_upper_limit - 0.1)  # Asegurar que esté dentro del gráfico
-        
-        ax.text(i + 1, y_pos, f'{max_puntaje:.1f}', 
-                ha='center', va='bottom', fontsize=9, fontweight='bold',
-                bbox=dict(boxstyle="round,pad=0.2", facecolor="yellow", alpha=0.7, edgecolor='black'))
-
-    ax.set_title('Distribución de Puntaje Final por Especialidad Asignada', fontsize=14, fontweight='bold')
-    ax.set_ylabel('Puntaje Final', fontsize=12)
-    ax.set_xlabel('Especialidad', fontsize=12)
-    ax.tick_params(axis='x', rotation=45)
-    ax.grid(axis='y', linestyle='--', alpha=0.3)
-
-    promedio_general = df_plot['Final'].mean()
-    ax.axhline(y=promedio_general, color='red', linestyle='--', linewidth=2, 
-            label=f'Promedio General: {promedio_general:.2f}')
-    ax.legend()
-
-    # Ajustar diseño automáticamente
-    plt.tight_layout()
-    st.pyplot(fig)
-    plt.close()
+    mostrar_grafica(clave, 'puntaje_especialidad', grafica_puntaje_especialidad, resultado['cajas'], resultado['maximos'],
+                    resultado['promedio_general'], resultado['maximo_global'], resultado['minimo_global'])
 
     # Mostrar resumen estadístico con máximos
     st.markdown("#### Resumen Estadístico por Especialidad")
 
-    # Crear DataFrame con estadísticas
-    stats_especialidades = []
-    for especialidad in especialidades_ordenadas:
-        datos = df_plot[df_plot['Especialidad'] == especialidad]['Final']
-        stats_especialidades.append({
-            'Especialidad': especialidad,
-            'Postulantes': len(datos),
-            'Mediana': datos.median(),
-            'Promedio': datos.mean(),
-            'Mínimo': datos.min(),
-            'Máximo': datos.max(),
-            'Desviación Estándar': datos.std()
-        })
-
-    df_stats = pd.DataFrame(stats_especialidades).round(2)
+    df_stats = resultado['tabla']
 
     # Mostrar en dos columnas
     col1, col2 = st.columns(2)
@@ -725,7 +443,17 @@ def generar_todas_graficas(dataframe):
             st.markdown(f"- **Máximo:** {row['Máximo']:.2f} ★")
             st.markdown(f"- **Desviación Estándar:** {row['Desviación Estándar']:.2f}")
             st.markdown("")
-    
+
+
+def seccion_frecuencia_opciones(df_plot, clave=None):
+    """Sección 10: frecuencia de carreras en primera y segunda opción (acepta también Agregados)"""
+    resultado = resultado_seccion('frecuencia_opciones', df_plot, clave)
+    total = resultado['total']
+    conteos_op1 = resultado['conteos_op1']
+    conteos_op2 = resultado['conteos_op2']
+    op2_count = resultado['op2_count']
+    carreras_comunes = resultado['carreras_comunes']
+
     # 10. Frecuencia opción 1 vs opción 2
     # 10. Frecuencia opción 1 vs opción 2
     st.markdown('<div class="section-header">10. Frecuencia de Carreras por Opción</div>', unsafe_allow_html=True)
@@ -733,54 +461,12 @@ def generar_todas_graficas(dataframe):
     col1, col2 = st.columns(2)
 
     with col1:
-        fig, ax = plt.subplots(figsize=(10, 8))
-        op1_counts = df_plot['OPCION.1'].value_counts().sort_values(ascending=True)
-        bars1 = ax.barh(op1_counts.index, op1_counts.values, 
-                    color='lightblue', alpha=0.8, edgecolor='darkblue', linewidth=0.5)
-        ax.set_title('Frecuencia - Primera Opción', fontsize=12, fontweight='bold')
-        ax.set_xlabel('Número de Postulantes', fontsize=10)
-        
-        # Calcular límite X dinámicamente para Opción 1
-        max_valor_op1 = op1_counts.max()
-        x_upper_limit_op1 = max_valor_op1 + (max_valor_op1 * 0.12)  # 12% de margen superior
-        ax.set_xlim(0, x_upper_limit_op1)
-        
-        for bar in bars1:
-            width = bar.get_width()
-            porcentaje = (width / len(df_plot)) * 100
-            # Posicionar texto dentro del gráfico con margen
-            text_x_pos = min(width + (max_valor_op1 * 0.01), x_upper_limit_op1 - (max_valor_op1 * 0.02))
-            ax.text(text_x_pos, bar.get_y() + bar.get_height()/2, 
-                f'{int(width)} ({porcentaje:.1f}%)', 
-                ha='left', va='center', fontsize=8, fontweight='bold')
-        ax.grid(axis='x', linestyle='--', alpha=0.3)
-        st.pyplot(fig)
-        plt.close()
+        mostrar_grafica(clave, 'opcion_1', grafica_frecuencia_opcion, conteos_op1, total,
+                        'Frecuencia - Primera Opción', 'lightblue', 'darkblue')
 
     with col2:
-        fig, ax = plt.subplots(figsize=(10, 8))
-        op2_counts = df_plot['OPCION.2'].dropna().value_counts().sort_values(ascending=True)
-        bars2 = ax.barh(op2_counts.index, op2_counts.values, 
-                    color='lightcoral', alpha=0.8, edgecolor='darkred', linewidth=0.5)
-        ax.set_title('Frecuencia - Segunda Opción', fontsize=12, fontweight='bold')
-        ax.set_xlabel('Número de Postulantes', fontsize=10)
-        
-        # Calcular límite X dinámicamente para Opción 2
-        max_valor_op2 = op2_counts.max()
-        x_upper_limit_op2 = max_valor_op2 + (max_valor_op2 * 0.12)  # 12% de margen superior
-        ax.set_xlim(0, x_upper_limit_op2)
-        
-        for bar in bars2:
-            width = bar.get_width()
-            porcentaje = (width / len(df_plot['OPCION.2'].dropna())) * 100
-            # Posicionar texto dentro del gráfico con margen
-            text_x_pos = min(width + (max_valor_op2 * 0.01), x_upper_limit_op2 - (max_valor_op2 * 0.02))
-            ax.text(text_x_pos, bar.get_y() + bar.get_height()/2, 
-                f'{int(width)} ({porcentaje:.1f}%)', 
-                ha='left', va='center', fontsize=8, fontweight='bold')
-        ax.grid(axis='x', linestyle='--', alpha=0.3)
-        st.pyplot(fig)
-        plt.close()
+        mostrar_grafica(clave, 'opcion_2', grafica_frecuencia_opcion, conteos_op2, op2_count,
+                        'Frecuencia - Segunda Opción', 'lightcoral', 'darkred')
 
 
     # Análisis comparativo
@@ -792,28 +478,26 @@ def generar_todas_graficas(dataframe):
     with col1:
         st.metric(
             "Total Opción 1", 
-            f"{len(df_plot)}",
+            f"{total}",
             "100%"
         )
 
     with col2:
-        op2_count = len(df_plot['OPCION.2'].dropna())
         st.metric(
             "Total Opción 2", 
             f"{op2_count}",
-            f"{op2_count/len(df_plot)*100:.1f}%"
+            f"{op2_count/total*100:.1f}%"
         )
 
     with col3:
-        sin_op2 = df_plot['OPCION.2'].isna().sum()
+        sin_op2 = total - op2_count
         st.metric(
             "Sin Opción 2", 
             f"{sin_op2}",
-            f"{sin_op2/len(df_plot)*100:.1f}%"
+            f"{sin_op2/total*100:.1f}%"
         )
 
     with col4:
-        carreras_comunes = set(df_plot['OPCION.1']).intersection(set(df_plot['OPCION.2'].dropna()))
         st.metric(
             "Carreras en ambas opciones", 
             f"{len(carreras_comunes)}"
@@ -824,72 +508,51 @@ def generar_todas_graficas(dataframe):
 
     with col_left:
         st.markdown("**🏆 TOP 5 CARRERAS MÁS ELEGIDAS - OPCIÓN 1:**")
-        top5_op1 = df_plot['OPCION.1'].value_counts().head()
-        top1_df = pd.DataFrame({
-            'Carrera': top5_op1.index,
-            'Postulantes': top5_op1.values,
-            'Porcentaje': (top5_op1.values / len(df_plot)) * 100
-        }).round(2)
-        
-        for idx, row in top1_df.iterrows():
+        for idx, row in resultado['top_op1'].iterrows():
             st.write(f"{idx+1}. **{row['Carrera']}**: {row['Postulantes']} postulantes ({row['Porcentaje']:.1f}%)")
 
     with col_right:
         st.markdown("**🏆 TOP 5 CARRERAS MÁS ELEGIDAS - OPCIÓN 2:**")
-        top5_op2 = df_plot['OPCION.2'].value_counts().head()
-        top2_df = pd.DataFrame({
-            'Carrera': top5_op2.index,
-            'Postulantes': top5_op2.values,
-            'Porcentaje': (top5_op2.values / len(df_plot['OPCION.2'].dropna())) * 100
-        }).round(2)
-        
-        for idx, row in top2_df.iterrows():
+        for idx, row in resultado['top_op2'].iterrows():
             st.write(f"{idx+1}. **{row['Carrera']}**: {row['Postulantes']} postulantes ({row['Porcentaje']:.1f}%)")
 
     # Carreras comunes
     st.markdown("**🔄 CARRERAS QUE APARECEN EN AMBAS OPCIONES:**")
     if carreras_comunes:
         # Mostrar en varias columnas para mejor visualización
-        carreras_ordenadas = sorted(carreras_comunes)
         n_cols = 3
-        carreras_por_columna = len(carreras_ordenadas) // n_cols + 1
         
         cols = st.columns(n_cols)
-        for i, carrera in enumerate(carreras_ordenadas):
+        for i, carrera in enumerate(carreras_comunes):
             col_idx = i % n_cols
             with cols[col_idx]:
-                count_op1 = len(df_plot[df_plot['OPCION.1'] == carrera])
-                count_op2 = len(df_plot[df_plot['OPCION.2'] == carrera])
+                count_op1 = conteos_op1[carrera]
+                count_op2 = conteos_op2[carrera]
                 st.write(f"• **{carrera}**")
                 st.write(f"  - Op1: {count_op1} | Op2: {count_op2}")
     else:
         st.write("No hay carreras comunes entre ambas opciones")
 
 
-    
+def seccion_orden_merito(df_plot, clave=None):
+    """Sección 11: puntaje final frente al orden de mérito"""
+    resultado = resultado_seccion('orden_merito', df_plot, clave)
+    z = resultado['z']
+    correlacion = resultado['correlacion']
+
     # 11. Relación puntaje final vs orden de mérito
     # 11. Relación puntaje final vs orden de mérito
     st.markdown('<div class="section-header">11. Relación Puntaje Final vs Orden de Mérito</div>', unsafe_allow_html=True)
 
-    fig, ax = plt.subplots(figsize=(10, 6))
-    ax.scatter(df_plot['OM'], df_plot['Final'], alpha=0.6, color='steelblue', s=50)
-    ax.set_title('Relación entre Puntaje Final y Orden de Mérito', fontsize=14, fontweight='bold')
-    ax.set_xlabel('Orden de Mérito (OM)', fontsize=12)
-    ax.set_ylabel('Puntaje Final', fontsize=12)
-    ax.grid(True, alpha=0.3)
-
-    z = np.polyfit(df_plot['OM'], df_plot['Final'], 1)
-    p = np.poly1d(z)
-    ax.plot(df_plot['OM'], p(df_plot['OM']), "r--", alpha=0.8, linewidth=2, 
-            label=f'Tendencia: y = {z[0]:.3f}x + {z[1]:.3f}')
-
-    correlacion = df_plot['OM'].corr(df_plot['Final'])
-    ax.text(0.05, 0.95, f'Correlación: {correlacion:.3f}', 
-            transform=ax.transAxes, fontsize=12,
-            bbox=dict(boxstyle="round", facecolor="wheat", alpha=0.8))
-    ax.legend()
-    st.pyplot(fig)
-    plt.close()
+    if motor_graficas() == MOTOR_VEGA:
+        # Se dibuja en el navegador; con muchos puntos solo viajan las celdas agregadas
+        nube = resultado_seccion('nube_merito_vega', df_plot, clave)
+        st.vega_lite_chart(especificacion_merito(nube, resultado['extremos'], z, correlacion),
+                           use_container_width=True)
+    else:
+        # Solo viaja al proceso de dibujo la nube ya reducida y los extremos de la recta
+        nube = resultado_seccion('nube_merito', df_plot, clave)
+        mostrar_grafica(clave, 'merito', grafica_merito, nube, resultado['extremos'], z, correlacion)
 
     # Análisis adicional
     st.markdown("#### 📊 Análisis: Relación Puntaje Final vs Orden de Mérito")
@@ -921,30 +584,7 @@ def generar_todas_graficas(dataframe):
     # Analizar rangos específicos
     st.markdown("#### 🔍 Análisis por Rangos de Orden de Mérito")
 
-    rangos_om = [
-        (1, 10, "Top 10"),
-        (11, 50, "Top 11-50"),
-        (51, 100, "Top 51-100"),
-        (101, 500, "Top 101-500"),
-        (501, 1000, "Top 501-1000"),
-        (1001, 2000, "Resto (1001-2000)"),
-        (2001, df_plot['OM'].max(), f"Resto (2001-{int(df_plot['OM'].max())})")
-    ]
-
-    # Crear DataFrame para los rangos
-    rangos_data = []
-    for rango_min, rango_max, etiqueta in rangos_om:
-        datos_rango = df_plot[(df_plot['OM'] >= rango_min) & (df_plot['OM'] <= rango_max)]
-        if len(datos_rango) > 0:
-            rangos_data.append({
-                'Rango OM': etiqueta,
-                'Postulantes': len(datos_rango),
-                'Puntaje Promedio': datos_rango['Final'].mean(),
-                'Puntaje Mínimo': datos_rango['Final'].min(),
-                'Puntaje Máximo': datos_rango['Final'].max(),
-                'Rango Puntajes': f"{datos_rango['Final'].min():.1f} - {datos_rango['Final'].max():.1f}"
-            })
-
+    rangos_data = resultado['rangos']
     df_rangos = pd.DataFrame(rangos_data).round(2)
 
     # Mostrar tabla de rangos
@@ -953,46 +593,7 @@ def generar_todas_graficas(dataframe):
     # Gráfica adicional: Boxplot por rangos
     st.markdown("#### 📦 Distribución de Puntajes por Rango de Mérito")
 
-    # Crear columna de rangos para el boxplot
-    df_rangos_plot = df_plot.copy()
-    condiciones = [
-        (df_rangos_plot['OM'] <= 10),
-        (df_rangos_plot['OM'] <= 50) & (df_rangos_plot['OM'] > 10),
-        (df_rangos_plot['OM'] <= 100) & (df_rangos_plot['OM'] > 50),
-        (df_rangos_plot['OM'] <= 500) & (df_rangos_plot['OM'] > 100),
-        (df_rangos_plot['OM'] <= 1000) & (df_rangos_plot['OM'] > 500),
-        (df_rangos_plot['OM'] > 1000)
-    ]
-
-    categorias = ['Top 10', 'Top 11-50', 'Top 51-100', 'Top 101-500', 'Top 501-1000', 'Resto (>1000)']
-    df_rangos_plot['Rango_Merito'] = np.select(condiciones, categorias, default='Otros')
-
-    # Ordenar los rangos correctamente
-    orden_rangos = ['Top 10', 'Top 11-50', 'Top 51-100', 'Top 101-500', 'Top 501-1000', 'Resto (>1000)']
-    df_rangos_plot['Rango_Merito'] = pd.Categorical(df_rangos_plot['Rango_Merito'], categories=orden_rangos, ordered=True)
-
-    fig2, ax2 = plt.subplots(figsize=(12, 6))
-    box_data = [df_rangos_plot[df_rangos_plot['Rango_Merito'] == rango]['Final'] for rango in orden_rangos]
-
-    box_plot = ax2.boxplot(box_data, labels=orden_rangos, patch_artist=True, vert=True)
-    colors = plt.cm.viridis(np.linspace(0, 1, len(orden_rangos)))
-    for patch, color in zip(box_plot['boxes'], colors):
-        patch.set_facecolor(color)
-
-    ax2.set_title('Distribución de Puntajes Finales por Rango de Orden de Mérito', fontsize=14, fontweight='bold')
-    ax2.set_ylabel('Puntaje Final', fontsize=12)
-    ax2.set_xlabel('Rango de Orden de Mérito', fontsize=12)
-    ax2.tick_params(axis='x', rotation=45)
-    ax2.grid(axis='y', linestyle='--', alpha=0.3)
-
-    # Añadir línea del promedio general
-    promedio_general = df_plot['Final'].mean()
-    ax2.axhline(y=promedio_general, color='red', linestyle='--', linewidth=2, 
-            label=f'Promedio General: {promedio_general:.2f}')
-    ax2.legend()
-
-    st.pyplot(fig2)
-    plt.close()
+    mostrar_grafica(clave, 'rangos_merito', grafica_rangos_merito, resultado['cajas_rangos'], resultado['promedio_general'])
 
     # Análisis expandible adicional
     with st.expander("📈 Ver análisis estadístico detallado"):
@@ -1026,15 +627,15 @@ def generar_todas_graficas(dataframe):
     col1, col2, col3, col4 = st.columns(4)
 
     with col1:
-        mejor_puntaje = df_plot.loc[df_plot['Final'].idxmax()]
+        mejor_final, mejor_om = resultado['mejor_puntaje']
         st.metric(
             "Mejor puntaje absoluto",
-            f"{mejor_puntaje['Final']:.2f}",
-            f"OM: {int(mejor_puntaje['OM'])}"
+            f"{mejor_final:.2f}",
+            f"OM: {mejor_om}"
         )
 
     with col2:
-        peor_puntaje_top10 = df_plot[df_plot['OM'] <= 10]['Final'].min()
+        peor_puntaje_top10 = resultado['peor_puntaje_top10']
         st.metric(
             "Peor puntaje en Top 10",
             f"{peor_puntaje_top10:.2f}",
@@ -1042,7 +643,7 @@ def generar_todas_graficas(dataframe):
         )
 
     with col3:
-        mejor_puntaje_ultimos = df_plot[df_plot['OM'] > 1000]['Final'].max()
+        mejor_puntaje_ultimos = resultado['mejor_puntaje_fuera_top1000']
         st.metric(
             "Mejor puntaje fuera del top 1000",
             f"{mejor_puntaje_ultimos:.2f}",
@@ -1050,86 +651,41 @@ def generar_todas_graficas(dataframe):
         )
 
     with col4:
-        diferencia_promedio_top_vs_resto = (
-            df_plot[df_plot['OM'] <= 100]['Final'].mean() - 
-            df_plot[df_plot['OM'] > 1000]['Final'].mean()
-        )
+        diferencia_promedio_top_vs_resto = resultado['diferencia_top100_resto']
         st.metric(
             "Diferencia promedio Top 100 vs Resto",
             f"{diferencia_promedio_top_vs_resto:.2f}",
             "Puntos de ventaja"
         )
-    
 
 
+# Pestañas de los cuadrantes de la sección 12, en el orden de CUADRANTES: (emoji, título, descripción)
+PESTANAS_CUADRANTES = [
+    ("🔷", "Alta Demanda + Alta Selectividad", "Carreras muy populares y muy exigentes"),
+    ("🔶", "Alta Demanda + Baja Selectividad", "Carreras populares pero menos exigentes"),
+    ("🟩", "Baja Demanda + Alta Selectividad", "Carreras nicho pero muy exigentes"),
+    ("🟥", "Baja Demanda + Baja Selectividad", "Carreras con menor popularidad y menos exigentes"),
+]
+
+
+def seccion_demanda_selectividad(df_plot, clave=None):
+    """Sección 12: demanda frente a selectividad por carrera"""
+
     # 12. Demanda vs Selectividad
     # 12. Demanda vs Selectividad
     st.markdown('<div class="section-header">12. Demanda vs Selectividad por Carrera</div>', unsafe_allow_html=True)
 
-    fig, ax = plt.subplots(figsize=(12, 8))
-    demanda = df_plot['OPCION.1'].value_counts()
-    selectividad = df_plot.groupby('Especialidad')['Final'].mean()
-
-    carreras_comunes = list(set(demanda.index) & set(selectividad.index))
-    demanda_selectividad = pd.DataFrame({
-        'Demanda': [demanda[c] for c in carreras_comunes],
-        'Selectividad': [selectividad[c] for c in carreras_comunes]
-    }, index=carreras_comunes)
-
-    # Definir cuadrantes para colores
-    promedio_demanda = demanda_selectividad['Demanda'].mean()
-    promedio_selectividad = demanda_selectividad['Selectividad'].mean()
-
-    alto_demanda = demanda_selectividad['Demanda'] > promedio_demanda
-    alta_selectividad = demanda_selectividad['Selectividad'] > promedio_selectividad
-
-    # Asignar colores por cuadrante
-    colores = []
-    for carrera in demanda_selectividad.index:
-        if alto_demanda[carrera] and alta_selectividad[carrera]:
-            colores.append('blue')  # Alto-Alto
-        elif alto_demanda[carrera] and not alta_selectividad[carrera]:
-            colores.append('orange')  # Alto-Bajo
-        elif not alto_demanda[carrera] and alta_selectividad[carrera]:
-            colores.append('green')  # Bajo-Alto
-        else:
-            colores.append('red')  # Bajo-Bajo
-
-    scatter = ax.scatter(demanda_selectividad['Demanda'], demanda_selectividad['Selectividad'], 
-            s=100, alpha=0.7, c=colores, edgecolors='black')
-    ax.set_title('Relación entre Demanda y Selectividad por Carrera', fontsize=14, fontweight='bold')
-    ax.set_xlabel('Demanda (Número de postulantes como Opción 1)', fontsize=12)
-    ax.set_ylabel('Selectividad (Puntaje Promedio de Ingreso)', fontsize=12)
-    ax.grid(True, alpha=0.3)
-
-    for carrera in demanda_selectividad.index:
-        ax.annotate(carrera, 
-                (demanda_selectividad.loc[carrera, 'Demanda'], 
-                    demanda_selectividad.loc[carrera, 'Selectividad']),
-                xytext=(5, 5), textcoords='offset points', 
-                fontsize=9, alpha=0.8)
-
-    correlacion = demanda_selectividad['Demanda'].corr(demanda_selectividad['Selectividad'])
-    ax.text(0.05, 0.95, f'Correlación: {correlacion:.3f}', 
-            transform=ax.transAxes, fontsize=12,
-            bbox=dict(boxstyle="round", facecolor="wheat", alpha=0.8))
-
-    ax.axhline(y=promedio_selectividad, color='red', linestyle='--', alpha=0.7, 
-            label=f'Promedio Selectividad: {promedio_selectividad:.1f}')
-    ax.axvline(x=promedio_demanda, color='green', linestyle='--', alpha=0.7,
-            label=f'Promedio Demanda: {promedio_demanda:.1f}')
-
-    # Añadir leyenda de cuadrantes
-    from matplotlib.lines import Line2D
-    legend_elements = [
-        Line2D([0], [0], marker='o', color='w', markerfacecolor='blue', markersize=10, label='Alta Demanda + Alta Selectividad'),
-        Line2D([0], [0], marker='o', color='w', markerfacecolor='orange', markersize=10, label='Alta Demanda + Baja Selectividad'),
-        Line2D([0], [0], marker='o', color='w', markerfacecolor='green', markersize=10, label='Baja Demanda + Alta Selectividad'),
-        Line2D([0], [0], marker='o', color='w', markerfacecolor='red', markersize=10, label='Baja Demanda + Baja Selectividad')
-    ]
-    ax.legend(handles=legend_elements, loc='upper right')
-    st.pyplot(fig)
-    plt.close()
+    resultado = resultado_seccion('demanda_selectividad', df_plot, clave)
+    tabla = resultado['tabla']
+    limites = resultado['limites']
+    promedio_demanda = resultado['promedio_demanda']
+    promedio_selectividad = resultado['promedio_selectividad']
+    correlacion = resultado['correlacion']
+    if tabla.empty:
+        st.info("No hay carreras con postulantes en primera opción e ingresantes para comparar demanda y selectividad")
+        return
+    mostrar_grafica(clave, 'demanda_selectividad', grafica_demanda_selectividad, tabla,
+                    promedio_demanda, promedio_selectividad, correlacion)
 
     # Análisis de cuadrantes
     st.markdown("#### 📊 Análisis por Cuadrantes: Demanda vs Selectividad")
@@ -1158,110 +714,32 @@ def generar_todas_graficas(dataframe):
             "puntaje"
         )
 
-    # Mostrar análisis por cuadrantes en pestañas
-    tab1, tab2, tab3, tab4 = st.tabs([
-        "🔷 Alto-Alto", "🔶 Alto-Bajo", "🟩 Bajo-Alto", "🟥 Bajo-Bajo"
-    ])
-
-    with tab1:
-        st.markdown("**🔷 CUADRANTE ALTO-ALTO (Alta Demanda + Alta Selectividad)**")
-        st.write("Carreras muy populares y muy exigentes")
-        
-        cuadrante_alto_alto = demanda_selectividad[alto_demanda & alta_selectividad]
-        if not cuadrante_alto_alto.empty:
-            for carrera in cuadrante_alto_alto.index:
-                demanda_val = cuadrante_alto_alto.loc[carrera, 'Demanda']
-                selectividad_val = cuadrante_alto_alto.loc[carrera, 'Selectividad']
-                st.write(f"• **{carrera}**: Demanda={demanda_val}, Selectividad={selectividad_val:.1f}")
-            
-            st.metric(
-                "Carreras en este cuadrante",
-                f"{len(cuadrante_alto_alto)}",
-                f"{len(cuadrante_alto_alto)/len(demanda_selectividad)*100:.1f}% del total"
-            )
-        else:
-            st.write("No hay carreras en este cuadrante")
-
-    with tab2:
-        st.markdown("**🔶 CUADRANTE ALTO-BAJO (Alta Demanda + Baja Selectividad)**")
-        st.write("Carreras populares pero menos exigentes")
-        
-        cuadrante_alto_bajo = demanda_selectividad[alto_demanda & ~alta_selectividad]
-        if not cuadrante_alto_bajo.empty:
-            for carrera in cuadrante_alto_bajo.index:
-                demanda_val = cuadrante_alto_bajo.loc[carrera, 'Demanda']
-                selectividad_val = cuadrante_alto_bajo.loc[carrera, 'Selectividad']
-                st.write(f"• **{carrera}**: Demanda={demanda_val}, Selectividad={selectividad_val:.1f}")
-            
-            st.metric(
-                "Carreras en este cuadrante",
-                f"{len(cuadrante_alto_bajo)}",
-                f"{len(cuadrante_alto_bajo)/len(demanda_selectividad)*100:.1f}% del total"
-            )
-        else:
-            st.write("No hay carreras en este cuadrante")
-
-    with tab3:
-        st.markdown("**🟩 CUADRANTE BAJO-ALTO (Baja Demanda + Alta Selectividad)**")
-        st.write("Carreras nicho pero muy exigentes")
-        
-        cuadrante_bajo_alto = demanda_selectividad[~alto_demanda & alta_selectividad]
-        if not cuadrante_bajo_alto.empty:
-            for carrera in cuadrante_bajo_alto.index:
-                demanda_val = cuadrante_bajo_alto.loc[carrera, 'Demanda']
-                selectividad_val = cuadrante_bajo_alto.loc[carrera, 'Selectividad']
-                st.write(f"• **{carrera}**: Demanda={demanda_val}, Selectividad={selectividad_val:.1f}")
+    # Mostrar análisis por cuadrantes en pestañas: cada una es un tramo contiguo de la tabla
+    pestanas = st.tabs([f"{emoji} {nombre}" for (emoji, _, _), nombre in zip(PESTANAS_CUADRANTES, CUADRANTES)])
+    cuadrantes = {}
+    for i, (pestana, nombre, (emoji, titulo, descripcion)) in enumerate(zip(pestanas, CUADRANTES, PESTANAS_CUADRANTES)):
+        cuadrante = tabla.iloc[limites[i]:limites[i + 1]]
+        cuadrantes[nombre] = cuadrante
+        with pestana:
+            st.markdown(f"**{emoji} CUADRANTE {nombre.upper()} ({titulo})**")
+            st.write(descripcion)
             
-            st.metric(
-                "Carreras en este cuadrante",
-                f"{len(cuadrante_bajo_alto)}",
-                f"{len(cuadrante_bajo_alto)/len(demanda_selectividad)*100:.1f}% del total"
-            )
-        else:
-            st.write("No hay carreras en este cuadrante")
-
-    with tab4:
-        st.markdown("**🟥 CUADRANTE BAJO-BAJO (Baja Demanda + Baja Selectividad)**")
-        st.write("Carreras con menor popularidad y menos exigentes")
-        
-        cuadrante_bajo_bajo = demanda_selectividad[~alto_demanda & ~alta_selectividad]
-        if not cuadrante_bajo_bajo.empty:
-            for carrera in cuadrante_bajo_bajo.index:
-                demanda_val = cuadrante_bajo_bajo.loc[carrera, 'Demanda']
-                selectividad_val = cuadrante_bajo_bajo.loc[carrera, 'Selectividad']
-                st.write(f"• **{carrera}**: Demanda={demanda_val}, Selectividad={selectividad_val:.1f}")
-            
-            st.metric(
-                "Carreras en este cuadrante",
-                f"{len(cuadrante_bajo_bajo)}",
-                f"{len(cuadrante_bajo_bajo)/len(demanda_selectividad)*100:.1f}% del total"
-            )
-        else:
-            st.write("No hay carreras en este cuadrante")
+            if not cuadrante.empty:
+                for carrera, demanda_val, selectividad_val in zip(cuadrante.index, cuadrante['Demanda'], cuadrante['Selectividad']):
+                    st.write(f"• **{carrera}**: Demanda={demanda_val}, Selectividad={selectividad_val:.1f}")
+                
+                st.metric(
+                    "Carreras en este cuadrante",
+                    f"{len(cuadrante)}",
+                    f"{len(cuadrante)/len(tabla)*100:.1f}% del total"
+                )
+            else:
+                st.write("No hay carreras en este cuadrante")
 
     # Resumen estadístico
     st.markdown("#### 📈 Resumen Estadístico por Cuadrante")
 
-    # Calcular estadísticas por cuadrante
-    resumen_cuadrantes = []
-    for nombre, cuadrante in [
-        ("Alto-Alto", cuadrante_alto_alto),
-        ("Alto-Bajo", cuadrante_alto_bajo),
-        ("Bajo-Alto", cuadrante_bajo_alto),
-        ("Bajo-Bajo", cuadrante_bajo_bajo)
-    ]:
-        if not cuadrante.empty:
-            resumen_cuadrantes.append({
-                'Cuadrante': nombre,
-                'Carreras': len(cuadrante),
-                '% Total': f"{(len(cuadrante)/len(demanda_selectividad)*100):.1f}%",
-                'Demanda Promedio': cuadrante['Demanda'].mean(),
-                'Selectividad Promedio': cuadrante['Selectividad'].mean(),
-                'Demanda Total': cuadrante['Demanda'].sum()
-            })
-
-    df_resumen = pd.DataFrame(resumen_cuadrantes).round(2)
-    st.dataframe(df_resumen, use_container_width=True)
+    st.dataframe(resultado['resumen_cuadrantes'], use_container_width=True)
 
     # Análisis expandible adicional
     with st.expander("🔍 Ver análisis estratégico"):
@@ -1293,78 +771,44 @@ def generar_todas_graficas(dataframe):
     col1, col2, col3 = st.columns(3)
 
     with col1:
-        carrera_mas_demandada = demanda_selectividad.loc[demanda_selectividad['Demanda'].idxmax()]
+        carrera_mas_demandada = tabla['Demanda'].idxmax()
         st.metric(
             "Carrera más demandada",
-            f"{demanda_selectividad['Demanda'].idxmax()}",
-            f"{carrera_mas_demandada['Demanda']} postulantes"
+            f"{carrera_mas_demandada}",
+            f"{tabla.loc[carrera_mas_demandada, 'Demanda']} postulantes"
         )
 
     with col2:
-        carrera_mas_selectiva = demanda_selectividad.loc[demanda_selectividad['Selectividad'].idxmax()]
+        carrera_mas_selectiva = tabla['Selectividad'].idxmax()
         st.metric(
             "Carrera más selectiva",
-            f"{demanda_selectividad['Selectividad'].idxmax()}",
-            f"{carrera_mas_selectiva['Selectividad']:.1f} puntos"
+            f"{carrera_mas_selectiva}",
+            f"{tabla.loc[carrera_mas_selectiva, 'Selectividad']:.1f} puntos"
         )
 
     with col3:
+        cuadrante_alto_alto = cuadrantes['Alto-Alto']
         if not cuadrante_alto_alto.empty:
-            mejor_balance = cuadrante_alto_alto.loc[
-                (cuadrante_alto_alto['Demanda'] / cuadrante_alto_alto['Selectividad']).idxmin()
-            ]
             st.metric(
                 "Mejor balance demanda/selectividad",
                 f"{(cuadrante_alto_alto['Demanda'] / cuadrante_alto_alto['Selectividad']).idxmin()}",
                 "Alto-Alto equilibrado"
             )
-    
+
+
+def seccion_probabilidad_ingreso(df_plot, clave=None):
+    """Sección 13: probabilidad empírica de ingreso por carrera"""
+
     # 13. Probabilidad empírica de ingreso
     # 13. Probabilidad empírica de ingreso
     st.markdown('<div class="section-header">13. Probabilidad Empírica de Ingreso por Carrera</div>', unsafe_allow_html=True)
 
-    fig, ax = plt.subplots(figsize=(12, 8))
-    probabilidades = {}
-    for carrera in df_plot['OPCION.1'].unique():
-        total_op1 = len(df_plot[df_plot['OPCION.1'] == carrera])
-        ingresaron_op1 = len(df_plot[(df_plot['OPCION.1'] == carrera) & (df_plot['Especialidad'] == carrera)])
-        probabilidad = (ingresaron_op1 / total_op1 * 100) if total_op1 > 0 else 0
-        probabilidades[carrera] = probabilidad
-
-    df_probabilidades = pd.DataFrame.from_dict(probabilidades, orient='index', columns=['Probabilidad'])
-    df_probabilidades = df_probabilidades.sort_values('Probabilidad', ascending=True)
-
-    bars = ax.barh(df_probabilidades.index, df_probabilidades['Probabilidad'], 
-                color='lightcoral', alpha=0.8, edgecolor='darkred')
-    ax.set_title('Probabilidad Empírica de Ingresar a la Primera Opción por Carrera', fontsize=14, fontweight='bold')
-    ax.set_xlabel('Probabilidad de Ingreso (%)', fontsize=12)
-    ax.set_ylabel('Carrera (Primera Opción)', fontsize=12)
-
-    # Calcular límite X dinámicamente (máximo 100% pero con margen para etiquetas)
-    max_probabilidad = df_probabilidades['Probabilidad'].max()
-    x_upper_limit = min(100 + 8, max_probabilidad + (max_probabilidad * 0.15))  # Máximo 108% o 15% de margen
-    ax.set_xlim(0, x_upper_limit)
-
-    for bar in bars:
-        width = bar.get_width()
-        carrera = df_probabilidades.index[bars.index(bar)]
-        total_op1 = len(df_plot[df_plot['OPCION.1'] == carrera])
-        ingresaron_op1 = len(df_plot[(df_plot['OPCION.1'] == carrera) & (df_plot['Especialidad'] == carrera)])
-        
-        # Posicionar texto dentro del gráfico con margen
-        text_x_pos = min(width + 1, x_upper_limit - 3)  # Margen de 3 unidades del borde
-        ax.text(text_x_pos, bar.get_y() + bar.get_height()/2, 
-                f'{width:.1f}%\n({ingresaron_op1}/{total_op1})', 
-                ha='left', va='center', fontsize=9, fontweight='bold')
-
-    prob_promedio_global = (df_plot['OPCION.1'] == df_plot['Especialidad']).mean() * 100
-    ax.axvline(x=prob_promedio_global, color='blue', linestyle='--', linewidth=2,
-            label=f'Probabilidad Promedio Global: {prob_promedio_global:.1f}%')
-    ax.grid(axis='x', linestyle='--', alpha=0.3)
-    ax.legend()
-    plt.tight_layout()
-    st.pyplot(fig)
-    plt.close()
+    resultado = resultado_seccion('probabilidad_ingreso', df_plot, clave)
+    df_probabilidades = resultado['probabilidades']
+    prob_promedio_global = resultado['promedio_global']
+    correlacion_prob_select = resultado['correlacion_selectividad']
+
+    mostrar_grafica(clave, 'probabilidad', grafica_probabilidad, df_probabilidades, prob_promedio_global)
 
     # Análisis detallado
     st.markdown("#### 📊 Análisis de Probabilidades de Ingreso por Carrera")
@@ -1381,10 +825,6 @@ def generar_todas_graficas(dataframe):
 
     with col2:
         # Correlación con selectividad
-        selectividad_carreras = df_plot.groupby('Especialidad')['Final'].mean()
-        correlacion_prob_select = df_probabilidades['Probabilidad'].corr(
-            selectividad_carreras[df_probabilidades.index]
-        )
         st.metric(
             "Correlación Probabilidad-Selectividad",
             f"{correlacion_prob_select:.3f}",
@@ -1392,7 +832,7 @@ def generar_todas_graficas(dataframe):
         )
 
     with col3:
-        carreras_sobre_promedio = len(df_probabilidades[df_probabilidades['Probabilidad'] > prob_promedio_global])
+        carreras_sobre_promedio = resultado['carreras_sobre_promedio']
         st.metric(
             "Carreras sobre el promedio",
             f"{carreras_sobre_promedio}",
@@ -1404,84 +844,20 @@ def generar_todas_graficas(dataframe):
 
     with col_left:
         st.markdown("**🎯 CARRERAS CON MAYOR PROBABILIDAD DE INGRESO (Top 5):**")
-        top5_alta = df_probabilidades.nlargest(5, 'Probabilidad')
-        
-        top_alta_data = []
-        for carrera, prob in top5_alta.iterrows():
-            total_op1 = len(df_plot[df_plot['OPCION.1'] == carrera])
-            ingresaron_op1 = len(df_plot[(df_plot['OPCION.1'] == carrera) & (df_plot['Especialidad'] == carrera)])
-            top_alta_data.append({
-                'Carrera': carrera,
-                'Probabilidad': prob['Probabilidad'],
-                'Ingresaron': ingresaron_op1,
-                'Total': total_op1,
-                'Ratio': f"{ingresaron_op1}/{total_op1}"
-            })
-        
-        for i, data in enumerate(top_alta_data, 1):
+        for i, data in enumerate(resultado['top_alta'], 1):
             st.write(f"{i}. **{data['Carrera']}**: {data['Probabilidad']:.1f}% ({data['Ratio']})")
 
     with col_right:
         st.markdown("**⚠️ CARRERAS CON MENOR PROBABILIDAD DE INGRESO (Top 5):**")
-        top5_baja = df_probabilidades.nsmallest(5, 'Probabilidad')
-        
-        top_baja_data = []
-        for carrera, prob in top5_baja.iterrows():
-            total_op1 = len(df_plot[df_plot['OPCION.1'] == carrera])
-            ingresaron_op1 = len(df_plot[(df_plot['OPCION.1'] == carrera) & (df_plot['Especialidad'] == carrera)])
-            top_baja_data.append({
-                'Carrera': carrera,
-                'Probabilidad': prob['Probabilidad'],
-                'Ingresaron': ingresaron_op1,
-                'Total': total_op1,
-                'Ratio': f"{ingresaron_op1}/{total_op1}"
-            })
-        
-        for i, data in enumerate(top_baja_data, 1):
+        for i, data in enumerate(resultado['top_baja'], 1):
             st.write(f"{i}. **{data['Carrera']}**: {data['Probabilidad']:.1f}% ({data['Ratio']})")
 
     # Análisis de correlación expandible
     with st.expander("📈 Ver análisis de correlación con selectividad"):
         st.markdown("**RELACIÓN ENTRE PROBABILIDAD DE INGRESO Y SELECTIVIDAD:**")
         
-        # Crear gráfica de correlación
-        fig_corr, ax_corr = plt.subplots(figsize=(10, 6))
-        
-        # Preparar datos para correlación
-        datos_correlacion = pd.DataFrame({
-            'Probabilidad': df_probabilidades['Probabilidad'],
-            'Selectividad': selectividad_carreras[df_probabilidades.index]
-        }).dropna()
-        
-        scatter = ax_corr.scatter(datos_correlacion['Selectividad'], datos_correlacion['Probabilidad'],
-                                alpha=0.7, s=80, color='purple', edgecolors='black')
-        
-        # Añadir etiquetas
-        for carrera in datos_correlacion.index:
-            ax_corr.annotate(carrera, 
-                            (datos_correlacion.loc[carrera, 'Selectividad'], 
-                            datos_correlacion.loc[carrera, 'Probabilidad']),
-                            xytext=(5, 5), textcoords='offset points', 
-                            fontsize=8, alpha=0.8)
-        
-        ax_corr.set_xlabel('Selectividad (Puntaje Promedio de Ingreso)', fontsize=12)
-        ax_corr.set_ylabel('Probabilidad de Ingreso (%)', fontsize=12)
-        ax_corr.set_title('Relación entre Probabilidad de Ingreso y Selectividad', fontsize=14, fontweight='bold')
-        ax_corr.grid(True, alpha=0.3)
-        
-        # Línea de tendencia
-        if len(datos_correlacion) > 1:
-            z_corr = np.polyfit(datos_correlacion['Selectividad'], datos_correlacion['Probabilidad'], 1)
-            p_corr = np.poly1d(z_corr)
-            ax_corr.plot(datos_correlacion['Selectividad'], p_corr(datos_correlacion['Selectividad']), 
-                        "r--", alpha=0.8, linewidth=2)
-        
-        ax_corr.text(0.05, 0.95, f'Correlación: {correlacion_prob_select:.3f}', 
-                    transform=ax_corr.transAxes, fontsize=12,
-                    bbox=dict(boxstyle="round", facecolor="wheat", alpha=0.8))
-        
-        st.pyplot(fig_corr)
-        plt.close()
+        mostrar_grafica(clave, 'probabilidad_selectividad', grafica_probabilidad_selectividad,
+                        df_probabilidades[['Probabilidad', 'Selectividad']].dropna(), correlacion_prob_select)
         
         # Interpretación de la correlación
         st.markdown("**INTERPRETACIÓN DE LA CORRELACIÓN:**")
@@ -1499,25 +875,7 @@ def generar_todas_graficas(dataframe):
     # Tabla completa de probabilidades
     st.markdown("#### 📋 Tabla Completa de Probabilidades por Carrera")
 
-    # Crear DataFrame completo para la tabla
-    tabla_completa = []
-    for carrera in df_probabilidades.index:
-        total_op1 = len(df_plot[df_plot['OPCION.1'] == carrera])
-        ingresaron_op1 = len(df_plot[(df_plot['OPCION.1'] == carrera) & (df_plot['Especialidad'] == carrera)])
-        selectividad_val = selectividad_carreras.get(carrera, 0)
-        
-        tabla_completa.append({
-            'Carrera': carrera,
-            'Probabilidad (%)': df_probabilidades.loc[carrera, 'Probabilidad'],
-            'Ingresaron': ingresaron_op1,
-            'Total Opción 1': total_op1,
-            'Ratio': f"{ingresaron_op1}/{total_op1}",
-            'Selectividad': selectividad_val,
-            'Sobre Promedio': '✅' if df_probabilidades.loc[carrera, 'Probabilidad'] > prob_promedio_global else '❌'
-        })
-
-    df_tabla_completa = pd.DataFrame(tabla_completa).sort_values('Probabilidad (%)', ascending=False).round(2)
-    st.dataframe(df_tabla_completa, use_container_width=True)
+    st.dataframe(resultado['tabla_completa'], use_container_width=True)
 
     # Puntos clave destacados
     st.markdown("#### 🎯 Puntos Clave Destacados")
@@ -1543,10 +901,8 @@ def generar_todas_graficas(dataframe):
         )
 
     with col3:
-        carrera_mas_postulantes = max([(carrera, len(df_plot[df_plot['OPCION.1'] == carrera])) 
-                                    for carrera in df_probabilidades.index], 
-                                    key=lambda x: x[1])[0]
-        postulantes_count = len(df_plot[df_plot['OPCION.1'] == carrera_mas_postulantes])
+        carrera_mas_postulantes = df_probabilidades['Postulantes'].idxmax()
+        postulantes_count = df_probabilidades.loc[carrera_mas_postulantes, 'Postulantes']
         st.metric(
             "Más postulantes Op1",
             f"{carrera_mas_postulantes}",
@@ -1579,52 +935,22 @@ def generar_todas_graficas(dataframe):
         st.write("- Usar estas probabilidades como referencia realista")
         st.write("- Considerar carreras con buen balance demanda/probabilidad")
         st.write("- Incluir segunda opción con probabilidades complementarias")
-    
+
+
+def seccion_correlacion_areas(df_plot, clave=None):
+    """Sección 14: correlación de las áreas con el puntaje final (acepta también Agregados)"""
+    resultado = resultado_seccion('correlacion_areas', df_plot, clave)
+    correlaciones_ordenadas = resultado['correlaciones']
+
     # 14. Correlación áreas vs puntaje final
     # 14. Correlación áreas vs puntaje final
     st.markdown('<div class="section-header">14. Correlación Áreas Académicas vs Puntaje Final</div>', unsafe_allow_html=True)
 
-    areas = ['RV', 'RM', 'Arit', 'Alg', 'Geo', 'Trig', 'Bio', 'Qui', 'Fis', 'Eco', 'Geog', 'His']
-    correlaciones = df_plot[areas + ['Final']].corr()['Final'].drop('Final')
-    correlaciones_ordenadas = correlaciones.sort_values(ascending=False).round(3)
-
-    fig, ax = plt.subplots(figsize=(12, 6))
-    bars = ax.bar(correlaciones_ordenadas.index, correlaciones_ordenadas.values,
-                color=['green' if x > 0.5 else 'orange' if x > 0.3 else 'red' for x in correlaciones_ordenadas.values],
-                alpha=0.7, edgecolor='black')
-    ax.set_title('Correlación entre Áreas Académicas y Puntaje Final', fontsize=14, fontweight='bold')
-    ax.set_xlabel('Áreas Académicas', fontsize=12)
-    ax.set_ylabel('Coeficiente de Correlación', fontsize=12)
-    ax.set_ylim(-0.1, 1.0)
-    ax.axhline(y=0, color='black', linewidth=0.8)
-    ax.axhline(y=0.5, color='red', linestyle='--', alpha=0.5, label='Correlación fuerte (0.5)')
-    ax.axhline(y=0.3, color='orange', linestyle='--', alpha=0.5, label='Correlación moderada (0.3)')
-
-    for bar in bars:
-        height = bar.get_height()
-        ax.text(bar.get_x() + bar.get_width()/2., height + 0.02,
-                f'{height:.3f}', ha='center', va='bottom', fontsize=10, fontweight='bold')
-    ax.legend()
-    ax.grid(axis='y', linestyle='--', alpha=0.3)
-    st.pyplot(fig)
-    plt.close()
+    mostrar_grafica(clave, 'correlacion_areas', grafica_correlacion_areas, correlaciones_ordenadas)
 
     # Interpretación cualitativa
     st.markdown("#### 📊 Interpretación Cualitativa de Correlaciones")
 
-    # Definir categorías de correlación
-    def clasificar_correlacion(valor):
-        if valor >= 0.7:
-            return "🔴 Muy fuerte", "Las áreas con correlación muy fuerte son determinantes clave para el éxito en el examen"
-        elif valor >= 0.5:
-            return "🟠 Fuerte", "Áreas importantes que influyen significativamente en el puntaje final"
-        elif valor >= 0.3:
-            return "🟡 Moderada", "Áreas con influencia notable pero no determinante"
-        elif valor >= 0.1:
-            return "🟢 Débil", "Áreas con poca influencia directa en el resultado final"
-        else:
-            return "⚪ Muy débil", "Áreas con influencia prácticamente nula en el puntaje final"
-
     # Mostrar interpretación en columnas
     st.markdown("**ESCALA DE INTERPRETACIÓN DE CORRELACIONES:**")
     col1, col2, col3 = st.columns([1, 2, 2])
@@ -1656,20 +982,7 @@ def generar_todas_graficas(dataframe):
     # Análisis por áreas
     st.markdown("#### 🎯 Análisis Detallado por Área Académica")
 
-    # Crear DataFrame con análisis
-    analisis_areas = []
-    for area in correlaciones_ordenadas.index:
-        clasificacion, significado = clasificar_correlacion(correlaciones_ordenadas[area])
-        analisis_areas.append({
-            'Área': area,
-            'Correlación': correlaciones_ordenadas[area],
-            'Clasificación': clasificacion,
-            'Interpretación': significado,
-            #'Peso Relativo': f"{(correlaciones_ordenadas[area]/correlaciones_ordenadas.max()*100):.1f}%"
-        })
-
-    df_analisis = pd.DataFrame(analisis_areas)
-    st.dataframe(df_analisis, use_container_width=True)
+    st.dataframe(resultado['analisis_areas'], use_container_width=True)
 
     # Puntos clave destacados
     st.markdown("#### 📈 Puntos Clave Destacados")
@@ -1695,7 +1008,7 @@ def generar_todas_graficas(dataframe):
         )
 
     with col3:
-        areas_fuertes = len([x for x in correlaciones_ordenadas if x >= 0.5])
+        areas_fuertes = resultado['areas_fuertes']
         st.metric(
             "Áreas fuertes (≥0.5)",
             f"{areas_fuertes}",
@@ -1703,7 +1016,7 @@ def generar_todas_graficas(dataframe):
         )
 
     with col4:
-        areas_moderadas = len([x for x in correlaciones_ordenadas if 0.3 <= x < 0.5])
+        areas_moderadas = resultado['areas_moderadas']
         st.metric(
             "Áreas moderadas (0.3-0.5)",
             f"{areas_moderadas}",
@@ -1713,27 +1026,7 @@ def generar_todas_graficas(dataframe):
     # Análisis por grupos de áreas
     st.markdown("#### 📚 Análisis por Grupos de Áreas")
 
-    # Definir grupos de áreas
-    grupos_areas = {
-        "Matemáticas": ['RV', 'RM', 'Arit', 'Alg', 'Geo', 'Trig'],
-        "Ciencias": ['Bio', 'Qui', 'Fis'],
-        "Humanidades": ['Eco', 'Geog', 'His']
-    }
-
-    # Calcular promedios por grupo
-    analisis_grupos = []
-    for grupo, areas_grupo in grupos_areas.items():
-        correlaciones_grupo = [correlaciones_ordenadas[area] for area in areas_grupo if area in correlaciones_ordenadas]
-        if correlaciones_grupo:
-            analisis_grupos.append({
-                'Grupo': grupo,
-                'Áreas Incluidas': ', '.join(areas_grupo),
-                'Correlación Promedio': np.mean(correlaciones_grupo),
-                'Correlación Máxima': max(correlaciones_grupo),
-                'Correlación Mínima': min(correlaciones_grupo),
-                'Número de Áreas': len(correlaciones_grupo)
-            })
-
+    analisis_grupos = resultado['analisis_grupos']
     df_grupos = pd.DataFrame(analisis_grupos).round(3)
     st.dataframe(df_grupos, use_container_width=True)
 
@@ -1770,19 +1063,269 @@ def generar_todas_graficas(dataframe):
     st.write("3. **Diferencial competitivo**: Áreas con correlación moderada pueden marcar diferencia")
     st.write("4. **Planificación**: Distribuir tiempo de estudio según importancia correlacional")
 
-        
-    st.success("✅ Todas las gráficas generadas exitosamente!")
+
+# Secciones del Análisis General: cada una se calcula y dibuja solo cuando se abre
+SECCIONES_GENERALES = {
+    '1. Distribución de Edades': seccion_edades,
+    '2. Distribución por Sexo': seccion_sexo,
+    '3. Distribución por Nacionalidad': seccion_nacionalidad,
+    '4. Distribución por Departamento de Domicilio': seccion_departamento,
+    '5. Tipo de Institución y Gestión Educativa': seccion_institucion_gestion,
+    '6. Distribución por Modalidad': seccion_modalidad,
+    '7. Comparación por Modalidad': seccion_comparacion_modalidad,
+    '8. Coincidencia Primera Opción vs Especialidad': seccion_coincidencia,
+    '9. Puntaje Final por Especialidad': seccion_puntaje_especialidad,
+    '10. Frecuencia de Carreras por Opción': seccion_frecuencia_opciones,
+    '11. Relación Puntaje Final vs Orden de Mérito': seccion_orden_merito,
+    '12. Demanda vs Selectividad por Carrera': seccion_demanda_selectividad,
+    '13. Probabilidad Empírica de Ingreso por Carrera': seccion_probabilidad_ingreso,
+    '14. Correlación Áreas Académicas vs Puntaje Final': seccion_correlacion_areas,
+}
+# Secciones que solo usan Agregados: se pueden mostrar en el modo por bloques, sin el frame completo
+SECCIONES_AGREGABLES = [
+    '3. Distribución por Nacionalidad',
+    '4. Distribución por Departamento de Domicilio',
+    '6. Distribución por Modalidad',
+    '10. Frecuencia de Carreras por Opción',
+    '14. Correlación Áreas Académicas vs Puntaje Final',
+]
+# Secciones que dan lo mismo desde Agregados que desde el frame: con un solo ciclo reciben los
+# Agregados de la selección (del cubo) en lugar de recorrer las filas. La 14 no: con el frame
+# usa la correlación por pares de pandas
+SECCIONES_DESDE_AGREGADOS = [
+    '3. Distribución por Nacionalidad',
+    '4. Distribución por Departamento de Domicilio',
+    '6. Distribución por Modalidad',
+    '10. Frecuencia de Carreras por Opción',
+]
+TODAS_LAS_SECCIONES = 'Todas las secciones'
+
+
+def generar_todas_graficas(dataframe, clave=None, secciones=None, agregados=None):
+    """Función para generar las gráficas en Streamlit (solo las secciones indicadas; por defecto todas)
+
+    `agregados` (los de la misma selección que el frame) alimentan las métricas principales y
+    SECCIONES_DESDE_AGREGADOS; sin ellos esas secciones se calculan desde el frame.
+    """
+    
+    df_plot = dataframe
+    if agregados is None:
+        agregados = df_plot
+    
+    # Header principal
+    st.markdown('<div class="main-header">📊 Dashboard de Análisis - Proceso de Admisión 2025-I</div>', unsafe_allow_html=True)
+    
+    # Métricas principales
+    with bloque_medido('Métricas principales'):
+        metricas = resultado_seccion('metricas', agregados, clave)
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Total de Postulantes", metricas['postulantes'])
+        with col2:
+            st.metric("Edad Promedio", f"{metricas['edad_media']:.1f} años")
+        with col3:
+            st.metric("Puntaje Promedio", f"{metricas['puntaje_promedio']:.2f}")
+        with col4:
+            st.metric("Coincidencia 1ra Opción", f"{metricas['coincidencia']:.1f}%")
+    
+    if secciones is None:
+        secciones = list(SECCIONES_GENERALES)
+    for titulo in secciones:
+        with bloque_medido(titulo):
+            SECCIONES_GENERALES[titulo](agregados if titulo in SECCIONES_DESDE_AGREGADOS else df_plot, clave)
+
+    if len(secciones) == len(SECCIONES_GENERALES):
+        st.success("✅ Todas las gráficas generadas exitosamente!")
+
+
+def mostrar_perfilado(seccion, df, clave, secciones_generales=None, agregados=None):
+    """Genera la página midiendo cada sección y añade al final la tabla de tiempos"""
+    global _perfilador
+    huella, escala, filtros = clave
+    contexto = {'pagina': seccion, 'huella': huella, 'escala': escala,
+                'filtros': filtros, 'filas': len(df)}
+    with Perfilador(contexto=contexto) as perfilador:
+        _perfilador = perfilador
+        try:
+            if seccion == "Análisis General":
+                generar_todas_graficas(df, clave, secciones_generales, agregados)
+            else:
+                analisis_materias(df, clave)
+        finally:
+            _perfilador = None
+    
+    st.markdown('<div class="section-header">⏱️ Tiempo y Memoria por Sección</div>', unsafe_allow_html=True)
+    tabla = perfilador.tabla()
+    st.caption(f"Total: {tabla['total_s'].sum():.2f} s · dibujo: {tabla['render_s'].sum():.2f} s · "
+               f"mediciones guardadas en {ARCHIVO_PERFILADO}")
+    st.dataframe(tabla, use_container_width=True)
+
+
+def mostrar_pagina(seccion, datos, clave, secciones_generales, trabajadores_graficas, perfilar, agregados=None):
+    """Genera la sección elegida (las gráficas de la página se dibujan juntas en paralelo)"""
+    if perfilar:
+        mostrar_perfilado(seccion, datos, clave, secciones_generales, agregados)
+        return
+    with lote_graficas(trabajadores_graficas):
+        if seccion == "Análisis General":
+            generar_todas_graficas(datos, clave, secciones_generales, agregados)
+        else:
+            analisis_materias(datos, clave)
+
+
+TODOS_LOS_CICLOS = 'Todos los ciclos'
+
+CONSULTA_POSTULANTE = "Consulta de Postulante"
+
+
+def consulta_postulante(indice):
+    """Ubica un vector de puntajes cualquiera entre todos los postulantes (sin filtros)"""
+    st.markdown('<div class="section-header">🔎 Consulta de Postulante</div>', unsafe_allow_html=True)
+    st.caption("Ingresa los puntajes de un postulante (por defecto, la mediana de cada área) "
+               "para ver su percentil, su orden de mérito estimado y su probabilidad de ingreso")
+    
+    puntajes = {}
+    columnas = st.columns(4)
+    for k, columna in enumerate(indice.columnas):
+        # Sin ningún valor en la columna no hay mediana: se parte de 0
+        mediana = indice.mediana(columna)
+        with columnas[k % 4]:
+            puntajes[columna] = st.number_input(columna, value=0.0 if pd.isna(mediana) else round(mediana, 2),
+                                                step=0.5, key=f"consulta_{columna}")
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        especialidad = st.selectbox("Especialidad:", sorted(map(str, indice.categorias('Especialidad'))))
+    with col2:
+        modalidad = st.selectbox("Modalidad:", sorted(map(str, indice.categorias('MODALIDAD'))))
+    with col3:
+        carrera = st.selectbox("Carrera de primera opción:", sorted(map(str, indice.primera_opcion)))
+    
+    with bloque_medido('Consulta de postulante'):
+        resultado = indice.consultar(puntajes, especialidad, modalidad, carrera)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Orden de mérito estimado", resultado['orden_merito'])
+    with col2:
+        probabilidad = resultado['probabilidad']
+        if probabilidad is not None:
+            st.metric(f"Probabilidad de ingreso a {carrera}", f"{probabilidad['probabilidad']:.1f}%")
+            st.caption(f"Entre {probabilidad['postulantes']} postulantes de {carrera} en primera opción con "
+                       f"puntaje entre {probabilidad['puntaje_minimo']:.2f} y {probabilidad['puntaje_maximo']:.2f}")
+    
+    st.dataframe(resultado['percentiles'], use_container_width=True, hide_index=True)
+    
+    if resultado['vecindad'] is not None:
+        st.write("**Postulantes alrededor de ese orden de mérito:**")
+        st.dataframe(resultado['vecindad'], use_container_width=True, hide_index=True)
+    else:
+        st.info("📅 El orden de mérito de ciclos distintos no es comparable: "
+                "elige un ciclo para ver los postulantes alrededor del puesto estimado")
+
+
+def archivos_por_ciclo_de(archivos):
+    """Ciclo -> archivo subido; si dos archivos dan el mismo ciclo se distinguen por su nombre"""
+    por_ciclo = {}
+    for archivo in archivos or []:
+        ciclo = ciclo_de_archivo(archivo.name)
+        if ciclo in por_ciclo:
+            ciclo = f"{ciclo} ({archivo.name})"
+        por_ciclo[ciclo] = archivo
+    return por_ciclo
+
+
+def filtros_barra_lateral(indices):
+    """Filtros de la barra lateral; devuelve la selección (columna -> categorías aceptadas)
+
+    Las opciones de cada filtro son las categorías presentes en cualquiera de los índices.
+    """
+    with st.sidebar.expander("🔍 Filtros"):
+        # Filtro por estado de ingreso
+        opciones_ingreso = ['Todos', 'Solo ingresaron', 'Solo no ingresaron']
+        filtro_ingreso = st.selectbox("Filtrar por estado de ingreso:", opciones_ingreso)
+        
+        seleccion = {COLUMNA_INGRESO: {'Solo ingresaron': [INGRESARON],
+                                       'Solo no ingresaron': [NO_INGRESARON]}.get(filtro_ingreso, [])}
+        
+        # Filtros de selección múltiple (sin selección = todos)
+        for columna in COLUMNAS_FILTRO:
+            categorias = dict.fromkeys(categoria for indice in indices for categoria in indice.categorias(columna))
+            seleccion[columna] = st.multiselect(f"Filtrar por {columna}:", list(categorias))
+    return seleccion
+
+
+def agregados_filtrados(datos, escala, seleccion):
+    """Agregados de la selección: fusionando celdas del cubo si se puede, si no recorriendo las filas"""
+    clave = (datos.huella, escala, clave_filtros(seleccion))
+    cubo = cubo_dataset(datos.df, (datos.huella, escala))
+    if cubo.responde(seleccion):
+        return agregados_memoizados(clave, lambda: cubo.consultar(seleccion))
+    return agregados_memoizados(clave, lambda: Agregados.de_dataframe(datos.indice.aplicar(datos.df, seleccion)))
+
+
+def mostrar_agregados(particiones, ciclo, por_bloques, escala, seccion, secciones_generales,
+                      trabajadores_graficas, perfilar):
+    """Página calculada solo desde Agregados: lectura por bloques o todos los ciclos a la vez
+
+    Cada ciclo se resume por separado (con los filtros aplicados sobre su propio índice) y
+    los resúmenes se fusionan, sin concatenar las filas de las particiones.
+    """
+    ciclos = list(particiones) if ciclo == TODOS_LOS_CICLOS else [ciclo]
+    if seccion == CONSULTA_POSTULANTE:
+        if por_bloques:
+            st.info("🔎 La consulta de postulantes necesita los archivos cargados completos: "
+                    "desactiva la lectura por bloques")
+            return
+        huellas = {nombre: particiones[nombre].huella for nombre in ciclos}
+        claves = [(particiones[nombre].huella, escala) for nombre in ciclos]
+        indice = indice_percentiles_ciclos([particiones[nombre].df for nombre in ciclos], claves,
+                                           (huella_particiones(huellas), escala))
+        consulta_postulante(indice)
+        return
+    if por_bloques:
+        st.sidebar.info("📦 Modo por bloques: sin filtros y solo con las secciones calculables desde agregados")
+        huellas = {nombre: particiones[nombre][0] for nombre in ciclos}
+        agregados_por_ciclo = {nombre: particiones[nombre][1] for nombre in ciclos}
+        filtros = 'bloques'
+    else:
+        huellas = {nombre: particiones[nombre].huella for nombre in ciclos}
+        seleccion = filtros_barra_lateral([particiones[nombre].indice for nombre in ciclos])
+        filtros = clave_filtros(seleccion)
+        agregados_por_ciclo = {nombre: agregados_filtrados(particiones[nombre], escala, seleccion)
+                               for nombre in ciclos}
+    
+    agregados = fusionar_agregados(agregados_por_ciclo.values())
+    st.sidebar.success(f"✅ {len(ciclos)} ciclo(s) cargado(s): {agregados.n_filas} registros")
+    if agregados.n_filas == 0:
+        st.warning("⚠️ Ningún postulante cumple los filtros seleccionados")
+        return
+    
+    if len(ciclos) > 1:
+        st.markdown('<div class="section-header">📅 Comparación por Ciclo de Admisión</div>', unsafe_allow_html=True)
+        st.dataframe(tabla_por_ciclo(agregados_por_ciclo), use_container_width=True)
+    
+    clave = (huella_particiones(huellas), escala, filtros)
+    if seccion == "Análisis General":
+        mostrar_pagina(seccion, agregados, clave, secciones_generales, trabajadores_graficas, perfilar)
+    else:
+        st.info("📚 El análisis por materias necesita un único ciclo cargado completo: "
+                "elige un ciclo y desactiva la lectura por bloques")
+
 
 # Interfaz principal de Streamlit
 # Interfaz principal de Streamlit
 def main():
     st.sidebar.title("📁 Carga de Datos")
     
-    uploaded_file = st.sidebar.file_uploader(
-        "Sube tu archivo Excel (.xlsx)", 
-        type=['xlsx'],
-        help="El archivo debe contener las columnas especificadas en el formato"
+    archivos = st.sidebar.file_uploader(
+        "Sube tus archivos Excel (.xlsx) o snapshots (.feather/.parquet), uno por ciclo", 
+        type=EXTENSIONES_ACEPTADAS,
+        accept_multiple_files=True,
+        help="Cada archivo debe contener las columnas especificadas en el formato; "
+             "el ciclo de admisión (p. ej. 2025-I) se toma del nombre del archivo"
     )
+    archivos_por_ciclo = archivos_por_ciclo_de(archivos)
     
     # Opción para convertir a escala 0-20
     convertir_escala = st.sidebar.checkbox(
@@ -1790,25 +1333,89 @@ def main():
         value=True,
         help="Convierte RV, RM, Arit, Alg, Geo, Trig, Bio, Qui, Fis, Eco, Geog, His y Final a escala de 0 a 20"
     )
+    version_examen = VERSION_EXAMEN
+    if convertir_escala and len(MAXIMOS_POR_VERSION) > 1:
+        versiones = list(MAXIMOS_POR_VERSION)
+        version_examen = st.sidebar.selectbox(
+            "Versión del examen (máximos por área):",
+            versiones,
+            index=versiones.index(VERSION_EXAMEN)
+        )
+    escala = version_examen if convertir_escala else None
+    
+    # Lectura por bloques: solo se guardan agregados, nunca el frame completo (solo para .xlsx)
+    modo_bloques = st.sidebar.checkbox(
+        "📦 Leer por bloques (archivos muy grandes)",
+        value=False,
+        help="Recorre el Excel por bloques de filas acumulando conteos y momentos. "
+             "Solo están disponibles las métricas principales y las secciones 3, 4, 6, 10 y 14, sin filtros"
+    )
+    por_bloques = (modo_bloques and bool(archivos_por_ciclo)
+                   and all(detectar_formato(bytes(archivo.getbuffer()[:8])) == 'xlsx' for archivo in archivos_por_ciclo.values()))
+    
+    # Con varios archivos se analiza un ciclo (completo) o todos juntos (desde agregados)
+    ciclo = next(iter(archivos_por_ciclo), None)
+    if len(archivos_por_ciclo) > 1:
+        ciclo = st.sidebar.selectbox("📅 Ciclo de admisión:", list(archivos_por_ciclo) + [TODOS_LOS_CICLOS])
+    solo_agregados = por_bloques or ciclo == TODOS_LOS_CICLOS
     
     # Navegación entre secciones
     st.sidebar.markdown("---")
     st.sidebar.title("🔍 Navegación")
     seccion = st.sidebar.radio(
         "Selecciona la sección a visualizar:",
-        ["Análisis General", "Análisis por Materias"]
+        ["Análisis General", "Análisis por Materias", CONSULTA_POSTULANTE]
     )
     
-    if uploaded_file is not None:
+    # Solo se calcula y dibuja la sección abierta (o todas, si se pide)
+    secciones_generales = None
+    if seccion == "Análisis General":
+        disponibles = SECCIONES_AGREGABLES if solo_agregados else list(SECCIONES_GENERALES)
+        seccion_general = st.sidebar.radio(
+            "Sección del análisis general:",
+            disponibles + [TODAS_LAS_SECCIONES]
+        )
+        secciones_generales = disponibles if seccion_general == TODAS_LAS_SECCIONES else [seccion_general]
+    
+    with st.sidebar.expander("⚙️ Rendimiento"):
+        trabajadores_graficas = st.number_input(
+            "Procesos en paralelo",
+            min_value=1,
+            max_value=max(os.cpu_count() or 1, TRABAJADORES_GRAFICAS),
+            value=TRABAJADORES_GRAFICAS,
+            help="Las gráficas de la página se dibujan en paralelo; 1 las dibuja una tras otra "
+                 "(los archivos subidos se leen con DASHBOARD_TRABAJADORES_INGESTA procesos)"
+        )
+        perfilar = st.checkbox(
+            "⏱️ Medir tiempo y memoria por sección",
+            value=PERFILADO_ACTIVO,
+            help=f"Muestra una tabla al final de la página y guarda cada medición en {ARCHIVO_PERFILADO}. "
+                 "Mientras está activo las gráficas se dibujan dentro de su sección, sin paralelismo"
+        )
+        st.selectbox(
+            "Gráficas de dispersión",
+            MOTORES_GRAFICAS,
+            index=MOTORES_GRAFICAS.index(MOTOR_GRAFICAS),
+            key='motor_graficas',
+            help=f"Vega-Lite las dibuja en el navegador; con más de {UMBRAL_PUNTOS} puntos "
+                 "se envían celdas agregadas en lugar de cada postulante"
+        )
+    
+    if archivos_por_ciclo:
         try:
-            # Leer el archivo Excel
-            df = pd.read_excel(uploaded_file)
-            
-            # Validar que tenga las columnas necesarias
-            columnas_requeridas = ['SEXO', 'EDAD', 'NACIONALIDAD', 'TIPO.INSTITUCIÓN', 'GESTIÓN', 
-                                 'DEP..DOM.', 'MODALIDAD', 'OPCION.1', 'OPCION.2', 'Final', 'OM', 'Especialidad']
-            
-            columnas_faltantes = [col for col in columnas_requeridas if col not in df.columns]
+            # Leer, validar y convertir los archivos (reutilizando la caché por contenido)
+            try:
+                contenidos = {nombre: archivo.getvalue() for nombre, archivo in archivos_por_ciclo.items()}
+                if por_bloques:
+                    particiones = {nombre: cargar_agregados(contenido, convertir_escala, version_examen)
+                                   for nombre, contenido in contenidos.items()}
+                else:
+                    particiones = cargar_datasets(contenidos, convertir_escala, version_examen)
+                    # Mientras esta sesión los use, no se desalojan por la memoria que ocupen otras
+                    retener_datasets(id_sesion(), particiones.values(), convertir_escala, version_examen)
+                columnas_faltantes = []
+            except ColumnasFaltantesError as error:
+                columnas_faltantes = error.faltantes
             
             if columnas_faltantes:
                 st.error(f"❌ Faltan las siguientes columnas en el archivo: {', '.join(columnas_faltantes)}")
@@ -1821,28 +1428,13 @@ def main():
                 - RV, RM, Arit, Alg, Geo, Trig, Bio, Qui, Fis, Eco, Geog, His
                 - Final, OM, Especialidad
                 """)
+            elif solo_agregados:
+                mostrar_agregados(particiones, ciclo, por_bloques, escala, seccion, secciones_generales,
+                                  trabajadores_graficas, perfilar)
             else:
-                # Convertir a escala 0-20 si está seleccionado
-                if convertir_escala:
-                    df_original = df.copy()
-                    df = convertir_a_escala_20(df)
-                    #st.sidebar.success("✅ Calificaciones convertidas a escala 0-20")
-                    
-                    # Mostrar comparación de escalas
-                    #with st.sidebar.expander("🔍 Ver conversión escala"):
-                    #    st.write("**Ejemplo de conversión:**")
-                    #    columnas_calificaciones = ['RV', 'RM', 'Arit', 'Alg', 'Geo', 'Trig', 'Bio', 'Qui', 'Fis', 'Eco', 'Geog', 'His', 'Final']
-                    #    columnas_disponibles = [col for col in columnas_calificaciones if col in df.columns]
-                    #    
-                    #    if len(columnas_disponibles) > 0:
-                    #        ejemplo_original = df_original[columnas_disponibles].iloc[0]
-                    #        ejemplo_convertido = df[columnas_disponibles].iloc[0]
-                    #        comparacion = pd.DataFrame({
-                    #            'Original': ejemplo_original,
-                    #           'Escala 0-20': ejemplo_convertido
-                    #        })
-                    #        st.dataframe(comparacion)
-                
+                datos = particiones[ciclo]
+                df = datos.df
+                archivo = archivos_por_ciclo[ciclo]
                 st.sidebar.success(f"✅ Archivo cargado correctamente: {len(df)} registros")
                 
                 # Mostrar información del dataset
@@ -1851,8 +1443,8 @@ def main():
                     #st.write(f"**Columnas:** {len(df.columns)}")
                     
                     # Estadísticas de ingreso vs no ingreso
-                    no_ingreso_count = len(df[df['Especialidad'] == 'No Ingreso'])
-                    si_ingreso_count = len(df[df['Especialidad'] != 'No Ingreso'])
+                    no_ingreso_count = datos.indice.contar(COLUMNA_INGRESO, NO_INGRESARON)
+                    si_ingreso_count = datos.indice.contar(COLUMNA_INGRESO, INGRESARON)
                     st.write(f"**No ingresaron:** {no_ingreso_count} ({no_ingreso_count/len(df)*100:.1f}%)")
                     st.write(f"**Ingresaron:** {si_ingreso_count} ({si_ingreso_count/len(df)*100:.1f}%)")
                     
@@ -1860,25 +1452,42 @@ def main():
                     #st.dataframe(df.head(3))
                     
                     if convertir_escala:
-                        st.write("**🔢 Escala aplicada:** 0-20")
-                
-                # Filtros en sidebar - CAMBIO PRINCIPAL AQUÍ
-                with st.sidebar.expander("🔍 Filtros"):
-                    # Filtro por estado de ingreso
-                    opciones_ingreso = ['Todos', 'Solo ingresaron', 'Solo no ingresaron']
-                    filtro_ingreso = st.selectbox("Filtrar por estado de ingreso:", opciones_ingreso)
+                        st.write(f"**🔢 Escala aplicada:** 0-20 (máximos {version_examen})")
+                    
+                    memoria = f"{datos.memoria / 1024**2:.1f} MB"
+                    if datos.memoria_original:
+                        memoria = f"{datos.memoria_original / 1024**2:.1f} MB → {memoria}"
+                    st.write(f"**🗜️ Memoria:** {memoria}")
                     
-                    if filtro_ingreso == 'Solo ingresaron':
-                        df = df[df['Especialidad'] != 'No Ingreso']
-                    elif filtro_ingreso == 'Solo no ingresaron':
-                        df = df[df['Especialidad'] == 'No Ingreso']
+                    cache = estadisticas_cache_ingesta()
+                    st.write(f"**⚡ Caché de carga:** {cache['aciertos']} aciertos / {cache['fallos']} fallos "
+                             f"({cache['entradas']}/{cache['max_entradas']} archivos, {cache['retenidas']} en uso)")
+                    cache_figuras = estadisticas_cache_figuras()
+                    st.write(f"**🖼️ Caché de gráficas:** {cache_figuras['aciertos']} aciertos / {cache_figuras['fallos']} fallos "
+                             f"({cache_figuras['bytes'] / 1024**2:.1f}/{cache_figuras['max_bytes'] / 1024**2:.0f} MB)")
                     
-                    # Filtro adicional por modalidad (opcional)
-                    if 'MODALIDAD' in df.columns:
-                        modalidades = ['Todos'] + list(df['MODALIDAD'].unique())
-                        modalidad_seleccionada = st.selectbox("Filtrar por modalidad:", modalidades)
-                        if modalidad_seleccionada != 'Todos':
-                            df = df[df['MODALIDAD'] == modalidad_seleccionada]
+                    # Snapshot columnar para recargar el mismo archivo en milisegundos
+                    snapshot = bytes_snapshot(datos.huella)
+                    if snapshot is not None:
+                        st.download_button(
+                            "⬇️ Descargar snapshot (.feather)",
+                            data=snapshot,
+                            file_name=f"{os.path.splitext(archivo.name)[0]}.feather",
+                            help="Súbelo en lugar del Excel para una carga casi instantánea"
+                        )
+                
+                # La consulta compara contra todos los postulantes del ciclo, sin filtros
+                if seccion == CONSULTA_POSTULANTE:
+                    consulta_postulante(indice_percentiles(df, (datos.huella, escala)))
+                    return
+                
+                # Filtros en sidebar: se resuelven con el índice del dataset y se recorta el frame una sola vez
+                seleccion = filtros_barra_lateral([datos.indice])
+                df = datos.indice.aplicar(df, seleccion)
+                
+                if df.empty:
+                    st.warning("⚠️ Ningún postulante cumple los filtros seleccionados")
+                    return
                 
                 # Mostrar estadísticas del filtro aplicado
                 #with st.sidebar.expander("📊 Estadísticas del Filtro"):
@@ -1891,11 +1500,12 @@ def main():
                 #        st.write(f"**No ingresaron:** {no_ingreso_filtrado} ({no_ingreso_filtrado/total_filtrado*100:.1f}%)")
                 #        st.write(f"**Ingresaron:** {si_ingreso_filtrado} ({si_ingreso_filtrado/total_filtrado*100:.1f}%)")
                 
-                # Navegación entre secciones
-                if seccion == "Análisis General":
-                    generar_todas_graficas(df)
-                else:
-                    analisis_materias(df)
+                # Mismo archivo, escala y filtros => mismos resultados (clave de las cachés)
+                clave = (datos.huella, escala, clave_filtros(seleccion))
+                # Métricas y secciones agregables salen del cubo (o de este recorrido si no aplica)
+                agregados = agregados_filtrados(datos, escala, seleccion)
+                
+                mostrar_pagina(seccion, df, clave, secciones_generales, trabajadores_graficas, perfilar, agregados)
                 
         except Exception as e:
             st.error(f"❌ Error al procesar el archivo: {str(e)}")
@@ -1909,7 +1519,7 @@ def main():
         Esta aplicación te permite analizar los datos del proceso de admisión de la Universidad Nacional Agraria La Molina mediante gráficas realizadas con Matplotlib.
         
         ### 📋 Instrucciones:
-        1. **Sube tu archivo Excel** usando el panel lateral
+        1. **Sube tu archivo Excel** usando el panel lateral (o varios, uno por ciclo, para compararlos)
         2. **Asegúrate** de que el archivo tenga las columnas requeridas
         3. **Usa los filtros** en el panel lateral para refinar el análisis
         4. **Explora** las diferentes secciones del dashboard
@@ -1917,8 +1527,11 @@ def main():
         ### 🎯 Características:
         - **Análisis General**: 14 tipos diferentes de análisis gráficos
         - **Análisis por Materias**: Análisis detallado del rendimiento académico
+        - **Consulta de Postulante**: Percentil, orden de mérito estimado y probabilidad de ingreso de cualquier puntaje
         - **Conversión automática a escala 0-20**
+        - **Snapshots columnares** (.feather/.parquet) para recargar archivos grandes al instante
         - **Filtros por estado de ingreso**: Comparar ingresados vs no ingresados
+        - **Filtros combinables** por sexo, modalidad, gestión, tipo de institución, departamento y especialidad
         - Métricas resumidas
         - Visualización profesional
         """)
@@ -0,0 +1,168 @@
+"""Benchmark del dashboard: tiempos de cálculo, de dibujo y memoria pico por sección
+
+Genera datasets sintéticos con el formato del archivo de admisión y ejecuta cada sección
+sin servidor de Streamlit (las llamadas a `st` se sustituyen por un módulo falso que no
+muestra nada). Las cachés de estadísticas y figuras no se usan (clave=None), así que cada
+medición incluye todo el trabajo de la sección.
+
+Uso:
+    python benchmark.py                       # 1k, 10k, 100k y 1M filas
+    python benchmark.py --filas 1000 10000 --salida resultados.json
+"""
+import argparse
+import json
+import sys
+import types
+
+import numpy as np
+import pandas as pd
+
+from ingesta import COLUMNAS_CALIFICACIONES, MAXIMOS, convertir_a_escala_20, normalizar_tipos
+from perfilado import Perfilador
+
+TAMANOS = [1_000, 10_000, 100_000, 1_000_000]
+
+CARRERAS = ['Agronomía', 'Biología', 'Ciencias Forestales', 'Economía', 'Estadística Informática',
+            'Ingeniería Agrícola', 'Ingeniería Ambiental', 'Ingeniería en Gestión Empresarial',
+            'Ingeniería Pesquera', 'Industrias Alimentarias', 'Meteorología', 'Zootecnia']
+DEPARTAMENTOS = ['LIMA', 'CALLAO', 'JUNIN', 'ICA', 'ANCASH', 'AREQUIPA', 'CUSCO', 'PIURA',
+                 'LA LIBERTAD', 'CAJAMARCA', 'HUANUCO', 'AYACUCHO']
+MODALIDADES = ['ORDINARIO', 'CENTRO PRE', 'PRIMEROS PUESTOS', 'TRASLADO EXTERNO', 'GRADUADOS']
+
+
+def generar_dataset(n_filas, semilla=0):
+    """Frame con las columnas del archivo de admisión y calificaciones en su escala original"""
+    rng = np.random.default_rng(semilla)
+    departamento = rng.choice(DEPARTAMENTOS, n_filas, p=np.r_[0.6, np.full(11, 0.4 / 11)])
+    df = pd.DataFrame({
+        'orden': np.arange(1, n_filas + 1),
+        'SEXO': rng.choice(['Femenino', 'Masculino'], n_filas),
+        'EDAD': rng.integers(16, 31, n_filas),
+        'DIST..NAC.': departamento, 'PROV..NAC.': departamento, 'DEP..NAC.': departamento,
+        'NACIONALIDAD': rng.choice(['PERUANA', 'VENEZOLANA', 'COLOMBIANA'], n_filas, p=[0.96, 0.03, 0.01]),
+        'TIPO.INSTITUCIÓN': rng.choice(['COLEGIO', 'COAR', 'CEBA'], n_filas, p=[0.9, 0.05, 0.05]),
+        'GESTIÓN': rng.choice(['PRIVADA', 'PÚBLICA', 'PARROQUIAL'], n_filas, p=[0.5, 0.45, 0.05]),
+        'INSTITUCIÓN': rng.integers(0, max(n_filas // 20, 1), n_filas).astype(str),
+        'DPTO..PROCEDENCIA': departamento,
+        'DIST..DOM.': departamento, 'PROV..DOM.': departamento, 'DEP..DOM.': departamento,
+        'MODALIDAD': rng.choice(MODALIDADES, n_filas, p=[0.7, 0.15, 0.08, 0.04, 0.03]),
+        'OPCION.1': rng.choice(CARRERAS, n_filas),
+    })
+    opcion_2 = pd.Series(rng.choice(CARRERAS, n_filas))
+    df['OPCION.2'] = opcion_2.where(rng.random(n_filas) < 0.8)
+
+    # Calificaciones en fracciones de 0.25, correlacionadas con la habilidad de cada postulante
+    habilidad = rng.beta(2, 3, n_filas)
+    for col in COLUMNAS_CALIFICACIONES[:-1]:
+        p = np.clip(habilidad + rng.normal(0, 0.15, n_filas), 0, 1)
+        df[col] = rng.binomial(MAXIMOS[col] * 4, p) / 4
+    # Los máximos de las áreas suman 100, igual que el máximo del puntaje final
+    df['Final'] = df[COLUMNAS_CALIFICACIONES[:-1]].sum(axis=1)
+    df['OM'] = df['Final'].rank(ascending=False, method='first').astype(int)
+
+    ingreso = rng.random(n_filas)
+    df['Especialidad'] = np.where(ingreso < 0.3, df['OPCION.1'],
+                                  np.where((ingreso < 0.4) & df['OPCION.2'].notna(), df['OPCION.2'], 'No Ingreso'))
+    return df
+
+
+class _ElementoFalso:
+    """Sustituto de cualquier objeto de Streamlit: se puede llamar, usar con `with` e iterar"""
+
+    def __getattr__(self, nombre):
+        return _ElementoFalso()
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        return iter(())
+
+
+def _contenedores(cantidad, *args, **kwargs):
+    n = cantidad if isinstance(cantidad, int) else len(cantidad)
+    return [_ElementoFalso() for _ in range(n)]
+
+
+def _primera_opcion(etiqueta, opciones=(), *args, **kwargs):
+    return list(opciones)[0] if len(opciones) else None
+
+
+def streamlit_falso():
+    """Módulo `streamlit` que acepta las llamadas del dashboard sin mostrar nada"""
+    st = types.ModuleType('streamlit')
+    st.__getattr__ = lambda nombre: _ElementoFalso()
+    st.columns = _contenedores
+    st.tabs = _contenedores
+    st.selectbox = _primera_opcion
+    st.radio = _primera_opcion
+    st.multiselect = lambda *args, **kwargs: []
+    st.checkbox = lambda etiqueta, value=False, **kwargs: value
+    st.number_input = lambda etiqueta, value=None, **kwargs: value
+    st.file_uploader = lambda *args, **kwargs: None
+    st.session_state = {}
+    st.sidebar = st
+    return st
+
+
+def _importar_dashboard():
+    sys.modules['streamlit'] = streamlit_falso()
+    import App_Streamlit
+    return App_Streamlit
+
+
+def medir(perfilador, nombre, funcion, *args):
+    """Mide funcion(*args) con el perfilador y devuelve su registro (sin el nombre)"""
+    with perfilador.seccion(nombre):
+        funcion(*args)
+    registro = dict(perfilador.registros[-1])
+    del registro['seccion']
+    return registro
+
+
+def ejecutar(tamanos, semilla=0):
+    """Resultados por tamaño: conversión de escala y cada sección del dashboard"""
+    app = _importar_dashboard()
+
+    secciones = {titulo: funcion for titulo, funcion in app.SECCIONES_GENERALES.items()}
+    secciones['Análisis por Materias'] = app.analisis_materias
+
+    resultados = []
+    with Perfilador(archivo=None) as perfilador:
+        for n_filas in tamanos:
+            df = normalizar_tipos(generar_dataset(n_filas, semilla))
+            resultado = {'filas': n_filas,
+                         'convertir_a_escala_20': medir(perfilador, 'convertir_a_escala_20', convertir_a_escala_20, df)}
+            df = convertir_a_escala_20(df)
+            resultado['secciones'] = {titulo: medir(perfilador, titulo, funcion, df, None)
+                                      for titulo, funcion in secciones.items()}
+            resultados.append(resultado)
+            print(f"{n_filas} filas: {sum(s['total_s'] for s in resultado['secciones'].values()):.2f} s",
+                  file=sys.stderr)
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filas', type=int, nargs='+', default=TAMANOS, help="Tamaños de dataset a medir")
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--salida', help="Archivo JSON de resultados (por defecto, salida estándar)")
+    args = parser.parse_args()
+
+    resultados = ejecutar(args.filas, args.semilla)
+    texto = json.dumps(resultados, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as archivo:
+            archivo.write(texto)
+    else:
+        print(texto)
+
+
+if __name__ == '__main__':
+    main()
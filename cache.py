@@ -0,0 +1,232 @@
+"""Cachés en memoria compartidas entre reejecuciones y sesiones del dashboard
+
+Las cachés viven en módulos importados, así que todas las sesiones del mismo proceso las
+comparten: el vigésimo usuario que sube el mismo archivo con los mismos filtros recibe los
+resultados ya calculados. Opcionalmente caducan (TTL), se guardan también en disco y
+reservan las entradas que alguna sesión activa está usando.
+"""
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+# Segundos sin usarse tras los que una entrada caduca (0 = nunca)
+TTL_CACHE = float(os.environ.get('DASHBOARD_TTL_CACHE', '0')) or None
+
+# Directorio opcional donde los resultados también se guardan en disco (pickle), compartidos
+# entre procesos del servidor y reinicios; sin él las cachés son solo de memoria
+DIRECTORIO_RESULTADOS = os.environ.get('DASHBOARD_RESULTADOS') or None
+
+# Una entrada retenida por una sesión no se desaloja mientras la sesión la renueve dentro de este plazo
+DURACION_RETENCION = 30 * 60
+
+
+class _Calculo:
+    """Cálculo en curso de una clave: su candado y, si falló, el error para quienes esperaban"""
+
+    def __init__(self):
+        self.candado = threading.Lock()
+        self.error = None
+
+
+class CacheLRU:
+    """Caché acotada que desaloja la entrada usada hace más tiempo (LRU)
+
+    El límite puede ser de número de entradas, de bytes (medidos con `tamano`) o ambos.
+    Con `ttl` las entradas no usadas en ese tiempo caducan; con `directorio` los valores
+    también se guardan en disco y se recuperan de ahí tras desalojarse. Las entradas
+    retenidas (retener) no se desalojan ni caducan, aunque se supere el límite.
+    """
+
+    def __init__(self, max_entradas=None, max_bytes=None, tamano=len, ttl=None, directorio=None):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.directorio = directorio
+        self.aciertos = 0
+        self.fallos = 0
+        self.bytes = 0
+        self._tamano = tamano
+        self._entradas = OrderedDict()
+        self._tamanos = {}
+        self._usos = {}
+        # clave -> {dueño: momento de la última renovación}
+        self._retenciones = {}
+        # clave -> _Calculo de quien la está calculando (obtener_o_calcular)
+        self._calculando = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def __contains__(self, clave):
+        return clave in self._entradas
+
+    def obtener(self, clave):
+        """Devuelve el valor guardado (o None) y actualiza los contadores"""
+        valor = self._buscar(clave)
+        with self._lock:
+            if valor is None:
+                self.fallos += 1
+            else:
+                self.aciertos += 1
+        return valor
+
+    def guardar(self, clave, valor):
+        """Guarda un valor y desaloja las entradas más antiguas si se supera algún límite"""
+        with self._lock:
+            self._insertar(clave, valor)
+        self._guardar_disco(clave, valor)
+
+    def obtener_o_calcular(self, clave, calcular):
+        """Valor guardado o calcular(); si varias sesiones lo piden a la vez se calcula una sola vez"""
+        valor = self.obtener(clave)
+        if valor is not None:
+            return valor
+        return self.calcular_una_vez(clave, calcular)
+
+    def calcular_una_vez(self, clave, calcular):
+        """calcular() y guardar, para quien ya consultó obtener(); las sesiones que lleguen mientras tanto esperan
+
+        Si calcular() falla, quienes esperaban reciben el mismo error; la clave queda libre
+        y el siguiente que la pida vuelve a intentarlo.
+        """
+        with self._lock:
+            calculo = self._calculando.setdefault(clave, _Calculo())
+        try:
+            with calculo.candado:
+                if calculo.error is not None:
+                    raise calculo.error
+                # Quien esperaba el candado encuentra el valor que dejó el primero
+                valor = self._buscar(clave)
+                if valor is None:
+                    try:
+                        valor = calcular()
+                    except BaseException as error:
+                        calculo.error = error
+                        raise
+                    self.guardar(clave, valor)
+        finally:
+            with self._lock:
+                if self._calculando.get(clave) is calculo:
+                    del self._calculando[clave]
+        return valor
+
+    def retener(self, clave, dueno):
+        """Marca la entrada como usada por `dueno` (p. ej. una sesión); hay que renovarlo en cada uso"""
+        with self._lock:
+            self._retenciones.setdefault(clave, {})[dueno] = time.monotonic()
+
+    def soltar(self, dueno, excepto=()):
+        """Deja de retener, para `dueno`, todas sus entradas salvo las de `excepto`"""
+        with self._lock:
+            for clave in list(self._retenciones):
+                if clave not in excepto:
+                    self._retenciones[clave].pop(dueno, None)
+                    if not self._retenciones[clave]:
+                        del self._retenciones[clave]
+
+    def _retenida(self, clave):
+        duenos = self._retenciones.get(clave)
+        if not duenos:
+            return False
+        limite = time.monotonic() - DURACION_RETENCION
+        for dueno, momento in list(duenos.items()):
+            if momento < limite:
+                # La sesión dejó de renovar: se cerró o se fue a otro archivo
+                del duenos[dueno]
+        if not duenos:
+            del self._retenciones[clave]
+        return bool(duenos)
+
+    def _caducada(self, clave):
+        return (self.ttl is not None and time.monotonic() - self._usos[clave] > self.ttl
+                and not self._retenida(clave))
+
+    def _buscar(self, clave):
+        """Valor en memoria (o, si no está, en disco) sin tocar los contadores"""
+        with self._lock:
+            if clave in self._entradas:
+                if not self._caducada(clave):
+                    self._entradas.move_to_end(clave)
+                    self._usos[clave] = time.monotonic()
+                    return self._entradas[clave]
+                self._quitar(clave)
+        valor = self._leer_disco(clave)
+        if valor is not None:
+            with self._lock:
+                self._insertar(clave, valor)
+        return valor
+
+    def _insertar(self, clave, valor):
+        if clave in self._entradas:
+            self._quitar(clave)
+        self._entradas[clave] = valor
+        self._usos[clave] = time.monotonic()
+        if self.max_bytes is not None:
+            self._tamanos[clave] = self._tamano(valor)
+            self.bytes += self._tamanos[clave]
+        # Primero las caducadas y después las menos usadas, respetando las retenidas
+        if self.ttl is not None:
+            for antigua in [antigua for antigua in self._entradas if self._caducada(antigua)]:
+                self._quitar(antigua)
+        for antigua in list(self._entradas):
+            if not self._excedida():
+                break
+            if not self._retenida(antigua):
+                self._quitar(antigua)
+
+    def _excedida(self):
+        return ((self.max_entradas is not None and len(self._entradas) > self.max_entradas)
+                or (self.max_bytes is not None and self.bytes > self.max_bytes))
+
+    def _quitar(self, clave):
+        del self._entradas[clave]
+        del self._usos[clave]
+        self.bytes -= self._tamanos.pop(clave, 0)
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, hashlib.sha1(repr(clave).encode()).hexdigest() + '.pickle')
+
+    def _leer_disco(self, clave):
+        if self.directorio is None:
+            return None
+        ruta = self._ruta(clave)
+        try:
+            if self.ttl is not None and time.time() - os.path.getmtime(ruta) > self.ttl:
+                return None
+            with open(ruta, 'rb') as archivo:
+                return pickle.load(archivo)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+
+    def _guardar_disco(self, clave, valor):
+        """Escribe el valor de forma atómica; si no se puede serializar solo queda en memoria"""
+        if self.directorio is None:
+            return
+        ruta = self._ruta(clave)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            with open(temporal, 'wb') as archivo:
+                pickle.dump(valor, archivo, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporal, ruta)
+        except (OSError, pickle.PicklingError, AttributeError, TypeError):
+            if os.path.exists(temporal):
+                os.remove(temporal)
+
+    def resumen(self):
+        """Contadores de uso para mostrar en la interfaz"""
+        with self._lock:
+            retenidas = sum(1 for clave in list(self._retenciones) if self._retenida(clave))
+        return {
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'entradas': len(self._entradas),
+            'max_entradas': self.max_entradas,
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'retenidas': retenidas,
+        }
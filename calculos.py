@@ -0,0 +1,454 @@
+"""Cálculo de cada sección del dashboard, separado de su presentación
+
+Cada función calcular_* recibe el frame filtrado (o Agregados, en las secciones que lo
+admiten) y devuelve un dict pequeño: conteos, tablas de una fila por carrera o materia,
+estadísticas de caja y escalares. No usan Streamlit ni dibujan, así que sus resultados se
+pueden memoizar por estado de filtros, calcular en otro proceso o probar por separado.
+App_Streamlit solo muestra los resultados y graficas los dibuja.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from cache import DIRECTORIO_RESULTADOS, TTL_CACHE, CacheLRU
+from cuantiles import SketchCuantiles
+from estadisticas import (agregado_por_carrera, agregados_dataset, contar_valores, cuantiles_por_grupo,
+                          estadisticas_calificaciones, indice_merito, Momentos)
+from graficas import TAMANO_MERITO, nube_dispersion, nube_vega
+from histogramas import histogramas_dataset
+
+# Resultados guardados por (huella, escala, filtros, sección)
+MAX_RESULTADOS_EN_CACHE = 256
+
+MATERIAS = ['RV', 'RM', 'Arit', 'Alg', 'Geo', 'Trig', 'Bio', 'Qui', 'Fis', 'Eco', 'Geog', 'His']
+
+# Límites superiores de los rangos de orden de mérito de la sección 11; tras el último, el resto
+LIMITES_OM = [int(limite) for limite in os.environ.get('DASHBOARD_LIMITES_OM', '10,50,100,500,1000,2000').split(',')]
+# Hasta este orden de mérito los rangos son "Top"; el boxplot agrupa todo lo posterior en "Resto"
+TOP_OM = 1000
+
+# Cuadrantes de demanda y selectividad de la sección 12 (demanda-selectividad respecto a su promedio)
+CUADRANTES = ['Alto-Alto', 'Alto-Bajo', 'Bajo-Alto', 'Bajo-Bajo']
+
+GRUPOS_AREAS = {
+    "Matemáticas": ['RV', 'RM', 'Arit', 'Alg', 'Geo', 'Trig'],
+    "Ciencias": ['Bio', 'Qui', 'Fis'],
+    "Humanidades": ['Eco', 'Geog', 'His']
+}
+
+
+def calcular_metricas(datos, clave=None):
+    """Métricas principales de la cabecera (acepta también Agregados)"""
+    agregados = agregados_dataset(datos, clave)
+    resumen_final = estadisticas_calificaciones(datos, clave)['resumen'].loc['Final']
+    return {
+        'postulantes': agregados.n_filas,
+        'edad_media': agregados.edad_media,
+        'puntaje_promedio': resumen_final['mean'],
+        'coincidencia': agregados.proporcion_coincidencia * 100,
+    }
+
+
+def calcular_materias(df_plot, clave=None):
+    """Análisis por materias: resumen, correlaciones, rendimiento por género e histogramas"""
+    estadisticas = estadisticas_calificaciones(df_plot, clave)
+    resumen = estadisticas['resumen']
+    correlaciones = estadisticas['correlacion']
+    histogramas = histogramas_dataset(df_plot, clave)
+    resultado = {
+        'resumen': resumen,
+        'correlaciones': correlaciones,
+        'promedios': resumen.loc[MATERIAS, 'mean'],
+        'desviaciones': resumen.loc[MATERIAS, 'std'],
+        # Histograma de 15 barras de cada materia (conteos, bordes) desde las cubetas ya contadas
+        'histogramas': {materia: histogramas.histograma(materia, 15) for materia in MATERIAS},
+        # Puntaje final desde el que se está en el 10% superior
+        'final_top_10': histogramas.puntaje_top('Final', 0.10),
+        'cajas_genero': None,
+        'promedio_genero_materia': None,
+    }
+    if 'SEXO' in df_plot.columns:
+        sketches = cuantiles_por_grupo(df_plot, 'Final', 'SEXO', clave)
+        resultado['cajas_genero'] = [sketch.caja(genero) for genero, sketch in sketches.items()]
+        resultado['promedio_genero_materia'] = df_plot.groupby('SEXO', observed=True)[MATERIAS].mean().T
+
+    resultado['tabla'] = pd.DataFrame({
+        'Materia': MATERIAS,
+        'Promedio': resumen.loc[MATERIAS, 'mean'].values,
+        'Mediana': resumen.loc[MATERIAS, 'median'].values,
+        'Desviación Estándar': resumen.loc[MATERIAS, 'std'].values,
+        'Máximo': resumen.loc[MATERIAS, 'max'].values,
+        'Mínimo': resumen.loc[MATERIAS, 'min'].values,
+        'Correlación con Final': correlaciones.loc[MATERIAS, 'Final'].values
+    }).round(3).sort_values('Promedio', ascending=False)
+    return resultado
+
+
+def calcular_edades(df_plot, clave=None):
+    """Sección 1: histograma de 8 barras de la edad"""
+    conteos, bordes = histogramas_dataset(df_plot, clave).histograma('EDAD', 8)
+    return {'conteos': conteos, 'bordes': bordes}
+
+
+def calcular_sexo(df_plot, clave=None):
+    """Sección 2"""
+    return {'conteos': contar_valores(df_plot['SEXO']), 'total': len(df_plot)}
+
+
+def calcular_nacionalidad(datos, clave=None):
+    """Sección 3 (acepta también Agregados)"""
+    return {'conteos': agregados_dataset(datos, clave).conteos['NACIONALIDAD']}
+
+
+def calcular_departamento(datos, clave=None):
+    """Sección 4 (acepta también Agregados)"""
+    return {'conteos': agregados_dataset(datos, clave).conteos['DEP..DOM.']}
+
+
+def calcular_institucion_gestion(df_plot, clave=None):
+    """Sección 5"""
+    return {
+        'tipos': contar_valores(df_plot['TIPO.INSTITUCIÓN']),
+        'gestiones': contar_valores(df_plot['GESTIÓN']),
+        'total': len(df_plot),
+    }
+
+
+def calcular_modalidad(datos, clave=None):
+    """Sección 6 (acepta también Agregados)"""
+    agregados = agregados_dataset(datos, clave)
+    return {'conteos': agregados.conteos['MODALIDAD'], 'total': agregados.n_filas}
+
+
+def calcular_comparacion_modalidad(df_plot, clave=None):
+    """Sección 7: cajas de edad y puntaje por modalidad (en el orden en que las agrupaba pandas)"""
+    def cajas_por_modalidad(columna):
+        sketches = cuantiles_por_grupo(df_plot, columna, 'MODALIDAD', clave)
+        return [sketches[modalidad].caja(modalidad) for modalidad in sorted(sketches, key=str)]
+
+    return {'cajas_edad': cajas_por_modalidad('EDAD'), 'cajas_puntaje': cajas_por_modalidad('Final')}
+
+
+def calcular_coincidencia(df_plot, clave=None):
+    """Sección 8"""
+    coincidencias = (df_plot['OPCION.1'] == df_plot['Especialidad']).value_counts()
+    return {'coincidencias': coincidencias, 'porcentajes': (coincidencias / len(df_plot)) * 100}
+
+
+def calcular_puntaje_especialidad(df_plot, clave=None):
+    """Sección 9: cajas y resumen del puntaje final por especialidad, ordenadas por mediana"""
+    resumen_final = estadisticas_calificaciones(df_plot, clave)['resumen'].loc['Final']
+
+    # Medianas, cuartiles y extremos por especialidad desde sus sketches de cuantiles
+    sketches = cuantiles_por_grupo(df_plot, 'Final', 'Especialidad', clave)
+    medianas = pd.Series({especialidad: sketch.mediana() for especialidad, sketch in sketches.items()})
+    especialidades_ordenadas = medianas.sort_values(ascending=False, kind='stable').index
+
+    # Postulantes (con o sin puntaje final), media y desviación en una sola pasada agrupada
+    momentos = df_plot.groupby('Especialidad', observed=True)['Final'].agg(['size', 'mean', 'std'])
+    maximos = [sketches[especialidad].maximo for especialidad in especialidades_ordenadas]
+    tabla = pd.DataFrame({
+        'Especialidad': especialidades_ordenadas,
+        'Postulantes': momentos['size'].reindex(especialidades_ordenadas).values,
+        'Mediana': medianas.reindex(especialidades_ordenadas).values,
+        'Promedio': momentos['mean'].reindex(especialidades_ordenadas).values,
+        'Mínimo': [sketches[especialidad].minimo for especialidad in especialidades_ordenadas],
+        'Máximo': maximos,
+        'Desviación Estándar': momentos['std'].reindex(especialidades_ordenadas).values
+    }).round(2)
+    return {
+        'cajas': [sketches[especialidad].caja(especialidad) for especialidad in especialidades_ordenadas],
+        'maximos': maximos,
+        'promedio_general': resumen_final['mean'],
+        'maximo_global': resumen_final['max'],
+        'minimo_global': resumen_final['min'],
+        'tabla': tabla,
+    }
+
+
+def calcular_frecuencia_opciones(datos, clave=None):
+    """Sección 10 (acepta también Agregados)"""
+    agregados = agregados_dataset(datos, clave)
+    total = agregados.n_filas
+    conteos_op1 = agregados.conteos['OPCION.1']
+    conteos_op2 = agregados.conteos['OPCION.2']
+    op2_count = int(conteos_op2.sum())
+
+    def top5(conteos, base):
+        top = conteos.head()
+        return pd.DataFrame({
+            'Carrera': top.index,
+            'Postulantes': top.values,
+            'Porcentaje': (top.values / base) * 100
+        }).round(2)
+
+    return {
+        'total': total,
+        'conteos_op1': conteos_op1,
+        'conteos_op2': conteos_op2,
+        'op2_count': op2_count,
+        'carreras_comunes': sorted(set(conteos_op1.index).intersection(set(conteos_op2.index))),
+        'top_op1': top5(conteos_op1, total),
+        'top_op2': top5(conteos_op2, op2_count),
+    }
+
+
+def rangos_om(maximo=None):
+    """(desde, hasta, etiqueta) de cada rango de LIMITES_OM y, si se da `maximo`, del resto hasta él"""
+    rangos = []
+    desde = 1
+    for hasta in LIMITES_OM:
+        if desde == 1:
+            etiqueta = f"Top {hasta}"
+        elif hasta <= TOP_OM:
+            etiqueta = f"Top {desde}-{hasta}"
+        else:
+            etiqueta = f"Resto ({desde}-{hasta})"
+        rangos.append((desde, hasta, etiqueta))
+        desde = hasta + 1
+    if maximo is not None:
+        rangos.append((desde, maximo, f"Resto ({desde}-{int(maximo)})"))
+    return rangos
+
+
+def cajas_rangos_merito(indice):
+    """Cajas del puntaje final por rango de mérito hasta TOP_OM y el resto (rangos vacíos se omiten)
+
+    Cada caja se calcula sobre la vista del rango en el IndiceMerito, sin copiar filas.
+    """
+    rangos = [(desde, hasta, etiqueta) for desde, hasta, etiqueta in rangos_om() if hasta <= TOP_OM]
+    rangos[0] = (-np.inf, *rangos[0][1:])
+    rangos.append((TOP_OM + 1, np.inf, f'Resto (>{TOP_OM})'))
+    cajas = []
+    for desde, hasta, etiqueta in rangos:
+        finales = indice.finales(desde, hasta)
+        if len(finales):
+            cajas.append(SketchCuantiles.de_valores(finales).caja(etiqueta))
+    return cajas
+
+
+def calcular_orden_merito(df_plot, clave=None):
+    """Sección 11: recta, correlación, tabla y cajas por rango de mérito
+
+    Los rangos de OM se resuelven con el IndiceMerito del frame (búsquedas binarias y sumas
+    acumuladas), sin recorrer el frame una vez por rango. La nube de puntos se calcula aparte
+    (calcular_nube_merito o calcular_nube_merito_vega), solo para el motor que la dibuja.
+    """
+    resumen_final = estadisticas_calificaciones(df_plot, clave)['resumen'].loc['Final']
+    indice = indice_merito(df_plot, clave)
+
+    # Recta y correlación exactas desde los momentos de (OM, Final), sin evaluar la recta por fila
+    momentos_merito = Momentos.de_matriz(['OM', 'Final'], df_plot[['OM', 'Final']])
+
+    rangos_data = []
+    for rango_min, rango_max, etiqueta in rangos_om(indice.om[-1] if len(indice) else 0):
+        rango = indice.resumen(rango_min, rango_max)
+        if rango['postulantes'] > 0:
+            rangos_data.append({
+                'Rango OM': etiqueta,
+                'Postulantes': rango['postulantes'],
+                'Puntaje Promedio': rango['promedio'],
+                'Puntaje Mínimo': rango['minimo'],
+                'Puntaje Máximo': rango['maximo'],
+                'Rango Puntajes': f"{rango['minimo']:.1f} - {rango['maximo']:.1f}"
+            })
+
+    mejor = np.nanargmax(indice.final)
+    return {
+        'z': momentos_merito.recta('OM', 'Final'),
+        'correlacion': momentos_merito.correlacion().loc['OM', 'Final'],
+        'extremos': (momentos_merito.minimo[0], momentos_merito.maximo[0]),
+        'rangos': rangos_data,
+        'cajas_rangos': cajas_rangos_merito(indice),
+        'promedio_general': resumen_final['mean'],
+        'mejor_puntaje': (indice.final[mejor], int(indice.om[mejor])),
+        'peor_puntaje_top10': indice.resumen(hasta=10)['minimo'],
+        'mejor_puntaje_fuera_top1000': indice.resumen(desde=TOP_OM + 1)['maximo'],
+        'diferencia_top100_resto': indice.promedio(hasta=100) - indice.promedio(desde=TOP_OM + 1),
+    }
+
+
+def calcular_nube_merito(df_plot, clave=None):
+    """Sección 11: nube reducida de (OM, Final) para la imagen de Matplotlib"""
+    return nube_dispersion(df_plot['OM'], df_plot['Final'], TAMANO_MERITO)
+
+
+def calcular_nube_merito_vega(df_plot, clave=None):
+    """Sección 11: puntos (o celdas agregadas) de (OM, Final) para Vega-Lite en el navegador"""
+    return nube_vega(df_plot['OM'], df_plot['Final'])
+
+
+def calcular_demanda_selectividad(df_plot, clave=None):
+    """Sección 12: demanda (opción 1) y selectividad por carrera en una sola tabla con su cuadrante
+
+    La tabla está ordenada por cuadrante (en el orden de CUADRANTES) y, dentro de cada uno,
+    por orden de aparición de la carrera en OPCION.1; `limites[i]:limites[i + 1]` son las
+    filas del cuadrante i.
+    """
+    demanda = contar_valores(df_plot['OPCION.1'])
+    selectividad = df_plot.groupby('Especialidad', observed=True)['Final'].mean()
+    # Unión alineada por carrera (solo las que aparecen en ambas)
+    tabla = pd.concat({'Demanda': demanda.rename(index=str), 'Selectividad': selectividad.rename(index=str)},
+                      axis=1, join='inner')
+    aparicion = pd.Index(df_plot['OPCION.1'].dropna().unique()).astype(str)
+    tabla = tabla.loc[aparicion.intersection(tabla.index, sort=False)]
+
+    promedio_demanda = tabla['Demanda'].mean()
+    promedio_selectividad = tabla['Selectividad'].mean()
+    # Código de cuadrante: 0 Alto-Alto, 1 Alto-Bajo, 2 Bajo-Alto, 3 Bajo-Bajo
+    codigos = (2 * (tabla['Demanda'].to_numpy() <= promedio_demanda)
+               + (tabla['Selectividad'].to_numpy() <= promedio_selectividad))
+    tabla['Cuadrante'] = pd.Categorical.from_codes(codigos, CUADRANTES)
+    tabla = tabla.sort_values('Cuadrante', kind='stable')
+    limites = np.concatenate([[0], np.cumsum(np.bincount(codigos, minlength=len(CUADRANTES)))])
+
+    resumen = tabla.groupby('Cuadrante', observed=True).agg(
+        Carreras=('Demanda', 'size'),
+        demanda_promedio=('Demanda', 'mean'),
+        selectividad_promedio=('Selectividad', 'mean'),
+        demanda_total=('Demanda', 'sum'),
+    )
+    resumen_cuadrantes = pd.DataFrame({
+        'Cuadrante': resumen.index.astype(str),
+        'Carreras': resumen['Carreras'].values,
+        '% Total': [f"{porcentaje:.1f}%" for porcentaje in resumen['Carreras'].values / len(tabla) * 100],
+        'Demanda Promedio': resumen['demanda_promedio'].values,
+        'Selectividad Promedio': resumen['selectividad_promedio'].values,
+        'Demanda Total': resumen['demanda_total'].values,
+    }).round(2)
+
+    return {
+        'tabla': tabla,
+        'limites': limites,
+        'promedio_demanda': promedio_demanda,
+        'promedio_selectividad': promedio_selectividad,
+        'correlacion': tabla['Demanda'].corr(tabla['Selectividad']),
+        'resumen_cuadrantes': resumen_cuadrantes,
+    }
+
+
+def calcular_probabilidad_ingreso(df_plot, clave=None):
+    """Sección 13: probabilidad empírica de ingreso a la primera opción por carrera"""
+    # Postulantes, ingresantes, probabilidad y selectividad por carrera en un solo groupby
+    df_probabilidades = agregado_por_carrera(df_plot).sort_values('Probabilidad', ascending=True)
+    prob_promedio_global = (df_plot['OPCION.1'] == df_plot['Especialidad']).mean() * 100
+
+    def extremos(top):
+        return [{
+            'Carrera': carrera,
+            'Probabilidad': prob['Probabilidad'],
+            'Ingresaron': int(prob['Ingresaron']),
+            'Total': int(prob['Postulantes']),
+            'Ratio': f"{int(prob['Ingresaron'])}/{int(prob['Postulantes'])}"
+        } for carrera, prob in top.iterrows()]
+
+    tabla_completa = pd.DataFrame({
+        'Carrera': df_probabilidades.index,
+        'Probabilidad (%)': df_probabilidades['Probabilidad'].values,
+        'Ingresaron': df_probabilidades['Ingresaron'].values,
+        'Total Opción 1': df_probabilidades['Postulantes'].values,
+        'Ratio': df_probabilidades['Ingresaron'].astype(str).values + '/' + df_probabilidades['Postulantes'].astype(str).values,
+        'Selectividad': df_probabilidades['Selectividad'].fillna(0).values,
+        'Sobre Promedio': np.where(df_probabilidades['Probabilidad'] > prob_promedio_global, '✅', '❌')
+    }).sort_values('Probabilidad (%)', ascending=False).round(2)
+
+    return {
+        'probabilidades': df_probabilidades,
+        'promedio_global': prob_promedio_global,
+        'correlacion_selectividad': df_probabilidades['Probabilidad'].corr(df_probabilidades['Selectividad']),
+        'carreras_sobre_promedio': int((df_probabilidades['Probabilidad'] > prob_promedio_global).sum()),
+        'top_alta': extremos(df_probabilidades.nlargest(5, 'Probabilidad')),
+        'top_baja': extremos(df_probabilidades.nsmallest(5, 'Probabilidad')),
+        'tabla_completa': tabla_completa,
+    }
+
+
+def clasificar_correlacion(valor):
+    """Categoría y significado de la correlación de un área con el puntaje final"""
+    if valor >= 0.7:
+        return "🔴 Muy fuerte", "Las áreas con correlación muy fuerte son determinantes clave para el éxito en el examen"
+    elif valor >= 0.5:
+        return "🟠 Fuerte", "Áreas importantes que influyen significativamente en el puntaje final"
+    elif valor >= 0.3:
+        return "🟡 Moderada", "Áreas con influencia notable pero no determinante"
+    elif valor >= 0.1:
+        return "🟢 Débil", "Áreas con poca influencia directa en el resultado final"
+    else:
+        return "⚪ Muy débil", "Áreas con influencia prácticamente nula en el puntaje final"
+
+
+def calcular_correlacion_areas(datos, clave=None):
+    """Sección 14 (acepta también Agregados)
+
+    Con el frame, la correlación es la de pandas por pares de columnas (cada par usa las
+    filas con ambos valores), compartida con el Análisis por Materias; con Agregados sale
+    de sus co-momentos.
+    """
+    estadisticas = estadisticas_calificaciones(datos, clave)
+    correlaciones_ordenadas = estadisticas['correlacion'].loc[MATERIAS, 'Final'].sort_values(ascending=False).round(3)
+
+    analisis_areas = []
+    for area in correlaciones_ordenadas.index:
+        clasificacion, significado = clasificar_correlacion(correlaciones_ordenadas[area])
+        analisis_areas.append({
+            'Área': area,
+            'Correlación': correlaciones_ordenadas[area],
+            'Clasificación': clasificacion,
+            'Interpretación': significado,
+        })
+
+    analisis_grupos = []
+    for grupo, areas_grupo in GRUPOS_AREAS.items():
+        correlaciones_grupo = [correlaciones_ordenadas[area] for area in areas_grupo if area in correlaciones_ordenadas]
+        if correlaciones_grupo:
+            analisis_grupos.append({
+                'Grupo': grupo,
+                'Áreas Incluidas': ', '.join(areas_grupo),
+                'Correlación Promedio': np.mean(correlaciones_grupo),
+                'Correlación Máxima': max(correlaciones_grupo),
+                'Correlación Mínima': min(correlaciones_grupo),
+                'Número de Áreas': len(correlaciones_grupo)
+            })
+
+    return {
+        'correlaciones': correlaciones_ordenadas,
+        'analisis_areas': pd.DataFrame(analisis_areas),
+        'areas_fuertes': int((correlaciones_ordenadas >= 0.5).sum()),
+        'areas_moderadas': int(((correlaciones_ordenadas >= 0.3) & (correlaciones_ordenadas < 0.5)).sum()),
+        'analisis_grupos': analisis_grupos,
+    }
+
+
+# Nombre -> función de cálculo; el nombre forma parte de la clave de caché del resultado
+CALCULOS = {
+    'metricas': calcular_metricas,
+    'materias': calcular_materias,
+    'edades': calcular_edades,
+    'sexo': calcular_sexo,
+    'nacionalidad': calcular_nacionalidad,
+    'departamento': calcular_departamento,
+    'institucion_gestion': calcular_institucion_gestion,
+    'modalidad': calcular_modalidad,
+    'comparacion_modalidad': calcular_comparacion_modalidad,
+    'coincidencia': calcular_coincidencia,
+    'puntaje_especialidad': calcular_puntaje_especialidad,
+    'frecuencia_opciones': calcular_frecuencia_opciones,
+    'orden_merito': calcular_orden_merito,
+    'nube_merito': calcular_nube_merito,
+    'nube_merito_vega': calcular_nube_merito_vega,
+    'demanda_selectividad': calcular_demanda_selectividad,
+    'probabilidad_ingreso': calcular_probabilidad_ingreso,
+    'correlacion_areas': calcular_correlacion_areas,
+}
+
+# Compartida por todas las sesiones; con DASHBOARD_RESULTADOS también entre procesos y reinicios
+_cache_resultados = CacheLRU(MAX_RESULTADOS_EN_CACHE, ttl=TTL_CACHE, directorio=DIRECTORIO_RESULTADOS)
+
+
+def resultado_seccion(nombre, datos, clave=None):
+    """CALCULOS[nombre](datos) memoizado por clave (huella, escala y filtros); sin clave se calcula siempre"""
+    calcular = CALCULOS[nombre]
+    if clave is None:
+        return calcular(datos)
+    return _cache_resultados.obtener_o_calcular((*clave, nombre), lambda: calcular(datos, clave))
@@ -0,0 +1,154 @@
+"""Sketches de cuantiles fusionables para medianas y boxplots sobre historiales grandes"""
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+# Error de rango aproximado de los sketches (0.01 = cuantil a ±1% de las filas)
+ERROR_CUANTILES = float(os.environ.get('DASHBOARD_ERROR_CUANTILES', '0.01'))
+# Hasta este número de valores el sketch los guarda todos y responde exacto (como pandas)
+EXACTO_HASTA = int(os.environ.get('DASHBOARD_CUANTILES_EXACTOS_HASTA', '100000'))
+
+
+class SketchCuantiles:
+    """Sketch de cuantiles tipo KLL
+
+    Los valores se guardan en niveles de compactadores: cada valor del nivel h representa
+    2**h valores originales. Al llenarse un nivel se ordena y pasa al siguiente uno de cada
+    dos valores (con desplazamiento aleatorio). Dos sketches se fusionan uniendo sus niveles,
+    así que se pueden construir por grupo o por bloque y combinar después.
+
+    Mientras no haya compactado (n <= exacto_hasta) el sketch es exacto: guarda todos los
+    valores y los cuantiles coinciden con np.quantile / Series.median.
+    """
+
+    def __init__(self, error=ERROR_CUANTILES, exacto_hasta=EXACTO_HASTA, semilla=0):
+        self.error = error
+        self.exacto_hasta = exacto_hasta
+        # Capacidad del nivel superior para el error pedido (cota empírica de KLL)
+        self.k = max(8, math.ceil((2.296 / error) ** (1 / 0.9444)))
+        self.niveles = [np.empty(0)]
+        self.n = 0
+        self.minimo = np.inf
+        self.maximo = -np.inf
+        self.exacto = True
+        self._azar = np.random.default_rng(semilla)
+
+    def __len__(self):
+        return self.n
+
+    @classmethod
+    def de_valores(cls, valores, **opciones):
+        return cls(**opciones).agregar(valores)
+
+    def agregar(self, valores):
+        """Incorpora un bloque de valores (los NaN se ignoran)"""
+        valores = np.asarray(valores, dtype='float64')
+        valores = valores[~np.isnan(valores)]
+        if len(valores):
+            self.n += len(valores)
+            self.minimo = min(self.minimo, valores.min())
+            self.maximo = max(self.maximo, valores.max())
+            self.niveles[0] = np.concatenate([self.niveles[0], valores])
+            self._compactar()
+        return self
+
+    def fusionar(self, otro):
+        """Incorpora los valores resumidos en otro sketch"""
+        self.n += otro.n
+        self.minimo = min(self.minimo, otro.minimo)
+        self.maximo = max(self.maximo, otro.maximo)
+        self.exacto = self.exacto and otro.exacto
+        while len(self.niveles) < len(otro.niveles):
+            self.niveles.append(np.empty(0))
+        for h, valores in enumerate(otro.niveles):
+            self.niveles[h] = np.concatenate([self.niveles[h], valores])
+        self._compactar()
+        return self
+
+    def _capacidad(self, h):
+        # El nivel superior guarda k valores; cada nivel inferior, 2/3 del siguiente
+        return max(2, math.ceil(self.k * (2 / 3) ** (len(self.niveles) - h - 1)))
+
+    def _compactar(self):
+        if self.exacto and self.n <= self.exacto_hasta:
+            return
+        self.exacto = False
+        h = 0
+        while h < len(self.niveles):
+            nivel = self.niveles[h]
+            if len(nivel) > self._capacidad(h):
+                if h + 1 == len(self.niveles):
+                    self.niveles.append(np.empty(0))
+                nivel = np.sort(nivel)
+                # Con un número impar de valores el último se queda en este nivel
+                resto = nivel[len(nivel) - len(nivel) % 2:]
+                pares = nivel[:len(nivel) - len(resto)]
+                promovidos = pares[self._azar.integers(2)::2]
+                self.niveles[h + 1] = np.concatenate([self.niveles[h + 1], promovidos])
+                self.niveles[h] = resto
+            h += 1
+
+    def valores(self):
+        """Valores guardados (todos en modo exacto, una muestra ponderada si no)"""
+        return np.concatenate(self.niveles)
+
+    def cuantiles(self, qs):
+        qs = np.asarray(qs, dtype='float64')
+        if self.n == 0:
+            return np.full(qs.shape, np.nan)
+        if self.exacto:
+            return np.quantile(self.niveles[0], qs)
+        valores = self.valores()
+        pesos = np.concatenate([np.full(len(nivel), 2 ** h, dtype='int64') for h, nivel in enumerate(self.niveles)])
+        orden = np.argsort(valores, kind='stable')
+        acumulado = np.cumsum(pesos[orden])
+        posiciones = np.minimum(np.searchsorted(acumulado, qs * acumulado[-1]), len(valores) - 1)
+        resultado = valores[orden][posiciones]
+        # Los extremos se conocen exactos
+        return np.where(qs <= 0, self.minimo, np.where(qs >= 1, self.maximo, resultado))
+
+    def cuantil(self, q):
+        return float(self.cuantiles([q])[0])
+
+    def mediana(self):
+        return self.cuantil(0.5)
+
+    def caja(self, etiqueta=None, rango_bigotes=1.5):
+        """Estadísticas de un boxplot en el formato de Axes.bxp
+
+        Cuartiles y bigotes (último valor a rango_bigotes·IQR de la caja) como los de
+        Axes.boxplot; en modo aproximado los atípicos son los valores guardados fuera de
+        los bigotes más los extremos reales.
+        """
+        q1, mediana, q3 = self.cuantiles([0.25, 0.5, 0.75])
+        limite_inferior = q1 - rango_bigotes * (q3 - q1)
+        limite_superior = q3 + rango_bigotes * (q3 - q1)
+        valores = self.valores()
+        dentro = valores[(valores >= limite_inferior) & (valores <= limite_superior)]
+        fuera = valores[(valores < limite_inferior) | (valores > limite_superior)]
+        if not self.exacto:
+            fuera = np.union1d(fuera, [v for v in (self.minimo, self.maximo)
+                                       if v < limite_inferior or v > limite_superior])
+        return {
+            'label': etiqueta,
+            'med': mediana,
+            'q1': q1,
+            'q3': q3,
+            'whislo': self.minimo if self.minimo >= limite_inferior else (dentro.min() if len(dentro) else q1),
+            'whishi': self.maximo if self.maximo <= limite_superior else (dentro.max() if len(dentro) else q3),
+            'fliers': fuera,
+        }
+
+
+def sketches_por_grupo(valores, grupos, **opciones):
+    """Un SketchCuantiles por cada valor de `grupos` (en orden de aparición), ordenando una sola vez"""
+    valores = np.asarray(valores, dtype='float64')
+    codigos, etiquetas = pd.factorize(grupos, sort=False)
+    orden = np.argsort(codigos, kind='stable')
+    # Las filas sin grupo (código -1) quedan antes del primer límite y se descartan
+    limites = np.searchsorted(codigos[orden], np.arange(len(etiquetas) + 1))
+    limites[-1] = len(codigos)
+    return {etiqueta: SketchCuantiles.de_valores(valores[orden[inicio:fin]], **opciones)
+            for etiqueta, inicio, fin in zip(etiquetas, limites[:-1], limites[1:])}
@@ -0,0 +1,412 @@
+"""Cálculos agregados reutilizados por las secciones del dashboard"""
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from cache import TTL_CACHE, CacheLRU
+from cuantiles import SketchCuantiles, sketches_por_grupo
+from filtros import COLUMNA_INGRESO, INGRESARON, NO_INGRESARON
+from ingesta import COLUMNAS_CALIFICACIONES
+
+# Resultados de estadísticas guardados por (huella, escala, filtros)
+MAX_ESTADISTICAS_EN_CACHE = 64
+
+# Cubos de agregados guardados por (huella, escala)
+MAX_CUBOS_EN_CACHE = 8
+
+# Índices por orden de mérito guardados por (huella, escala, filtros)
+MAX_INDICES_MERITO_EN_CACHE = 16
+
+# Dimensiones del cubo: un filtro que solo usa estas columnas se responde fusionando celdas
+DIMENSIONES_CUBO = ['MODALIDAD', COLUMNA_INGRESO, 'SEXO']
+
+
+def contar_valores(serie):
+    """value_counts sin las categorías que no aparecen en los datos (columnas categóricas)"""
+    conteos = serie.value_counts()
+    return conteos[conteos > 0]
+
+
+def agregado_por_carrera(dataframe):
+    """Tabla por carrera (primera opción) con postulantes, ingresantes, probabilidad y selectividad
+
+    Sustituye los filtros por carrera repetidos en cada gráfica/tabla por un único groupby.
+    Las carreras se devuelven en el orden en que aparecen en OPCION.1.
+    """
+    ingreso_op1 = dataframe['OPCION.1'] == dataframe['Especialidad']
+    agregado = ingreso_op1.groupby(dataframe['OPCION.1'], observed=True).agg(['size', 'sum'])
+    agregado.columns = ['Postulantes', 'Ingresaron']
+    agregado = agregado.loc[dataframe['OPCION.1'].dropna().unique()]
+    agregado.index = pd.Index(agregado.index.astype(object), name='Carrera')
+
+    agregado['Probabilidad'] = agregado['Ingresaron'] / agregado['Postulantes'] * 100
+    # Selectividad: puntaje final promedio de quienes ingresaron a la carrera
+    selectividad = dataframe.groupby('Especialidad', observed=True)['Final'].mean()
+    agregado['Selectividad'] = selectividad.reindex(agregado.index)
+    return agregado
+
+
+class Momentos:
+    """Conteo, media, co-momentos, mínimo y máximo de varias columnas numéricas, fusionables
+
+    Dos Momentos de bloques disjuntos se combinan sin volver a leer las filas (fórmula de
+    Chan et al.); de ellos salen medias, desviaciones y la matriz de correlación exactas.
+    Las filas con algún valor vacío en estas columnas no se cuentan.
+    """
+
+    def __init__(self, columnas):
+        self.columnas = list(columnas)
+        k = len(self.columnas)
+        self.n = 0
+        self.media = np.zeros(k)
+        self.comomentos = np.zeros((k, k))
+        self.minimo = np.full(k, np.inf)
+        self.maximo = np.full(k, -np.inf)
+
+    @classmethod
+    def de_matriz(cls, columnas, valores):
+        momentos = cls(columnas)
+        valores = np.asarray(valores, dtype=np.float64)
+        valores = valores[~np.isnan(valores).any(axis=1)]
+        if len(valores):
+            momentos.n = len(valores)
+            momentos.media = valores.mean(axis=0)
+            centrados = valores - momentos.media
+            momentos.comomentos = centrados.T @ centrados
+            momentos.minimo = valores.min(axis=0)
+            momentos.maximo = valores.max(axis=0)
+        return momentos
+
+    def fusionar(self, otro):
+        """Incorpora los momentos de otro bloque (con las mismas columnas)"""
+        if otro.n == 0:
+            return self
+        n = self.n + otro.n
+        delta = otro.media - self.media
+        self.comomentos = self.comomentos + otro.comomentos + np.outer(delta, delta) * (self.n * otro.n / n)
+        self.media = self.media + delta * (otro.n / n)
+        self.minimo = np.minimum(self.minimo, otro.minimo)
+        self.maximo = np.maximum(self.maximo, otro.maximo)
+        self.n = n
+        return self
+
+    def recta(self, x, y):
+        """Pendiente e intercepto de mínimos cuadrados de y sobre x (lo mismo que np.polyfit de grado 1)"""
+        i, j = self.columnas.index(x), self.columnas.index(y)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            pendiente = self.comomentos[i, j] / self.comomentos[i, i] if self.n else np.nan
+        return np.array([pendiente, self.media[j] - pendiente * self.media[i]])
+
+    def desviacion(self):
+        """Desviación estándar muestral (ddof=1, como pandas)"""
+        if self.n < 2:
+            return np.full(len(self.columnas), np.nan)
+        return np.sqrt(np.diag(self.comomentos) / (self.n - 1))
+
+    def correlacion(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            escala = np.sqrt(np.diag(self.comomentos))
+            return pd.DataFrame(self.comomentos / np.outer(escala, escala),
+                                index=self.columnas, columns=self.columnas)
+
+
+# Columnas cuyos conteos por categoría se acumulan en Agregados
+COLUMNAS_CONTEO = ['NACIONALIDAD', 'DEP..DOM.', 'MODALIDAD', 'OPCION.1', 'OPCION.2', 'Especialidad']
+
+
+class Agregados:
+    """Resumen fusionable de un dataset: filas, edad, coincidencias, conteos, momentos y cuantiles de Final
+
+    Se puede construir de un frame completo o acumulando bloques, así que las secciones que
+    solo dependen de él (métricas principales y secciones 3, 4, 6, 10 y 14) no necesitan
+    tener todas las filas en memoria.
+    """
+
+    def __init__(self):
+        self.n_filas = 0
+        self.suma_edad = 0.0
+        self.n_edad = 0
+        # Postulantes que ingresaron a su primera opción
+        self.coincidencias = 0
+        self.conteos = {col: pd.Series(dtype='int64') for col in COLUMNAS_CONTEO}
+        self.momentos = Momentos(COLUMNAS_CALIFICACIONES)
+        # Final por sí sola: un área vacía no quita al postulante de la media ni de la desviación
+        self.momentos_final = Momentos(['Final'])
+        self.cuantiles_final = SketchCuantiles()
+
+    def __len__(self):
+        return self.n_filas
+
+    @classmethod
+    def de_dataframe(cls, dataframe):
+        agregados = cls()
+        agregados.n_filas = len(dataframe)
+        edad = dataframe['EDAD']
+        agregados.suma_edad = float(edad.sum())
+        agregados.n_edad = int(edad.count())
+        agregados.coincidencias = int((dataframe['OPCION.1'] == dataframe['Especialidad']).sum())
+        agregados.conteos = {col: contar_valores(dataframe[col]) for col in COLUMNAS_CONTEO}
+        agregados.momentos = Momentos.de_matriz(COLUMNAS_CALIFICACIONES, dataframe[COLUMNAS_CALIFICACIONES])
+        agregados.momentos_final = Momentos.de_matriz(['Final'], dataframe[['Final']])
+        agregados.cuantiles_final = SketchCuantiles.de_valores(dataframe['Final'])
+        return agregados
+
+    def _sumar_totales(self, otro):
+        self.n_filas += otro.n_filas
+        self.suma_edad += otro.suma_edad
+        self.n_edad += otro.n_edad
+        self.coincidencias += otro.coincidencias
+        self.momentos.fusionar(otro.momentos)
+        self.momentos_final.fusionar(otro.momentos_final)
+        self.cuantiles_final.fusionar(otro.cuantiles_final)
+
+    def fusionar(self, otro):
+        """Incorpora los agregados de otro bloque de filas"""
+        self._sumar_totales(otro)
+        for col in COLUMNAS_CONTEO:
+            suma = self.conteos[col].add(otro.conteos[col], fill_value=0).astype('int64')
+            self.conteos[col] = suma.sort_values(ascending=False, kind='stable')
+        return self
+
+    @property
+    def edad_media(self):
+        return self.suma_edad / self.n_edad if self.n_edad else np.nan
+
+    @property
+    def proporcion_coincidencia(self):
+        return self.coincidencias / self.n_filas if self.n_filas else np.nan
+
+    def estadisticas(self):
+        """Mismo formato que calcular_estadisticas; solo se conserva la mediana de Final (el resto, NaN)"""
+        momentos = self.momentos
+        medianas = pd.Series(np.nan, index=momentos.columnas)
+        medianas['Final'] = self.cuantiles_final.mediana()
+        resumen = pd.DataFrame({
+            'mean': momentos.media if momentos.n else np.nan,
+            'median': medianas,
+            'std': momentos.desviacion(),
+            'min': momentos.minimo if momentos.n else np.nan,
+            'max': momentos.maximo if momentos.n else np.nan,
+        }, index=momentos.columnas)
+        final = self.momentos_final
+        if final.n:
+            resumen.loc['Final', ['mean', 'std', 'min', 'max']] = [final.media[0], final.desviacion()[0],
+                                                                   final.minimo[0], final.maximo[0]]
+        return {'resumen': resumen, 'correlacion': momentos.correlacion()}
+
+
+def celdas_dispersion(x, y, celdas):
+    """Celdas no vacías de un histograma 2D de (x, y): bordes x0-x1, y0-y1 y postulantes"""
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    validos = ~(np.isnan(x) | np.isnan(y))
+    conteos, bordes_x, bordes_y = np.histogram2d(x[validos], y[validos], bins=celdas)
+    i, j = np.nonzero(conteos)
+    return pd.DataFrame({
+        'x0': bordes_x[i], 'x1': bordes_x[i + 1],
+        'y0': bordes_y[j], 'y1': bordes_y[j + 1],
+        'postulantes': conteos[i, j].astype('int64'),
+    })
+
+
+def calcular_estadisticas(dataframe):
+    """Media, mediana, desviación, mínimo, máximo y matriz de correlación de las calificaciones
+
+    Devuelve un dict con 'resumen' (una fila por columna de calificación) y 'correlacion'.
+    """
+    calificaciones = dataframe[COLUMNAS_CALIFICACIONES]
+    resumen = calificaciones.agg(['mean', 'median', 'std', 'min', 'max']).T
+    return {
+        'resumen': resumen,
+        'correlacion': calificaciones.corr(),
+    }
+
+
+_cache_estadisticas = CacheLRU(MAX_ESTADISTICAS_EN_CACHE, ttl=TTL_CACHE)
+_cache_agregados = CacheLRU(MAX_ESTADISTICAS_EN_CACHE, ttl=TTL_CACHE)
+_cache_cuantiles = CacheLRU(MAX_ESTADISTICAS_EN_CACHE, ttl=TTL_CACHE)
+
+
+def estadisticas_calificaciones(dataframe, clave=None):
+    """calcular_estadisticas memoizado por clave (huella del dataset, escala y filtros)
+
+    Sin clave se calcula siempre; con clave, cambiar de sección o reejecutar el script
+    no repite ningún cálculo numérico. También acepta Agregados en lugar del frame.
+    """
+    if isinstance(dataframe, Agregados):
+        return dataframe.estadisticas()
+    if clave is None:
+        return calcular_estadisticas(dataframe)
+    return _cache_estadisticas.obtener_o_calcular(clave, lambda: calcular_estadisticas(dataframe))
+
+
+def cuantiles_por_grupo(dataframe, columna, grupo, clave=None):
+    """SketchCuantiles de `columna` para cada valor de `grupo`, memoizados por (clave, grupo, columna)
+
+    Alimentan medianas, cuartiles y bigotes de los boxplots sin ordenar cada grupo por
+    separado; con pocos datos los sketches son exactos.
+    """
+    if clave is None:
+        return sketches_por_grupo(dataframe[columna], dataframe[grupo])
+    return _cache_cuantiles.obtener_o_calcular((*clave, grupo, columna),
+                                               lambda: sketches_por_grupo(dataframe[columna], dataframe[grupo]))
+
+
+def agregados_memoizados(clave, calcular):
+    """Agregados guardados para la clave; si no están se obtienen con calcular()"""
+    return _cache_agregados.obtener_o_calcular(clave, calcular)
+
+
+def agregados_dataset(datos, clave=None):
+    """Agregados.de_dataframe memoizado por clave; si `datos` ya son Agregados se devuelven tal cual"""
+    if isinstance(datos, Agregados):
+        return datos
+    if clave is None:
+        return Agregados.de_dataframe(datos)
+    return agregados_memoizados(clave, lambda: Agregados.de_dataframe(datos))
+
+
+_cache_cubos = CacheLRU(MAX_CUBOS_EN_CACHE, ttl=TTL_CACHE)
+
+
+def cubo_dataset(dataframe, clave):
+    """CuboAgregados del dataset completo, construido una vez por clave (huella, escala)"""
+    return _cache_cubos.obtener_o_calcular(clave, lambda: CuboAgregados(dataframe))
+
+
+def fusionar_agregados(varios):
+    """Agregados de la unión de varias particiones, sin concatenar sus filas
+
+    Los conteos de cada columna se suman de una vez (un concat y un groupby por columna)
+    en lugar de fusionar las particiones de dos en dos.
+    """
+    varios = list(varios)
+    total = Agregados()
+    for agregados in varios:
+        total._sumar_totales(agregados)
+    for col in COLUMNAS_CONTEO:
+        conteos = [agregados.conteos[col] for agregados in varios if len(agregados.conteos[col])]
+        if conteos:
+            suma = pd.concat(conteos).groupby(level=0, observed=True, sort=False).sum().astype('int64')
+            total.conteos[col] = suma[suma > 0].sort_values(ascending=False, kind='stable')
+    return total
+
+
+class CuboAgregados:
+    """Agregados precalculados por celda MODALIDAD × estado de ingreso × SEXO
+
+    Se construye una vez por dataset. Cualquier filtro que solo use esas tres columnas
+    se responde fusionando las celdas elegidas, sin recorrer ni recortar las filas.
+    """
+
+    def __init__(self, dataframe):
+        ingreso = pd.Series(np.where(dataframe['Especialidad'] == 'No Ingreso', NO_INGRESARON, INGRESARON),
+                            index=dataframe.index, name=COLUMNA_INGRESO)
+        grupos = dataframe.groupby([dataframe['MODALIDAD'], ingreso, dataframe['SEXO']],
+                                   observed=True, sort=False, dropna=False)
+        # Celda (modalidad, ingreso, sexo) -> Agregados de sus filas
+        self.celdas = {celda: Agregados.de_dataframe(grupo) for celda, grupo in grupos}
+        # Conteos de cada columna como matriz celda × categoría: una consulta es una suma de filas
+        self._conteos = {}
+        for col in COLUMNAS_CONTEO:
+            tabla = pd.DataFrame([agregados.conteos[col] for agregados in self.celdas.values()])
+            self._conteos[col] = (tabla.columns, tabla.fillna(0).to_numpy(dtype='int64'))
+
+    @staticmethod
+    def responde(seleccion):
+        """True si la selección solo filtra por dimensiones del cubo"""
+        return all(col in DIMENSIONES_CUBO for col, categorias in seleccion.items() if categorias)
+
+    def consultar(self, seleccion):
+        """Agregados de las filas que cumplen la selección (ver IndiceFiltros.filas_seleccionadas)"""
+        aceptadas = [set(map(str, seleccion.get(col) or ())) for col in DIMENSIONES_CUBO]
+        elegidas = np.array([all(not acepta or str(valor) in acepta for valor, acepta in zip(celda, aceptadas))
+                             for celda in self.celdas], dtype=bool)
+        total = Agregados()
+        for agregados in itertools.compress(self.celdas.values(), elegidas):
+            total._sumar_totales(agregados)
+        for col, (categorias, matriz) in self._conteos.items():
+            suma = pd.Series(matriz[elegidas].sum(axis=0), index=categorias, name='count')
+            total.conteos[col] = suma[suma > 0].sort_values(ascending=False, kind='stable')
+        return total
+
+
+class IndiceMerito:
+    """Puntajes finales ordenados por orden de mérito (OM) para consultar rangos de OM
+
+    Cada rango [desde, hasta] es un tramo contiguo del orden, que se encuentra con dos
+    búsquedas binarias. Postulantes, suma y promedio del tramo salen de sumas acumuladas y
+    sus puntajes son una vista del arreglo ordenado, sin copiar filas. Las filas sin OM
+    se descartan.
+    """
+
+    def __init__(self, om, final):
+        om = np.asarray(om, dtype='float64')
+        final = np.asarray(final, dtype='float64')
+        validos = ~np.isnan(om)
+        orden = np.argsort(om[validos], kind='stable')
+        self.om = om[validos][orden]
+        self.final = final[validos][orden]
+        con_final = ~np.isnan(self.final)
+        self._suma = np.concatenate([[0.0], np.cumsum(np.where(con_final, self.final, 0.0))])
+        self._con_final = np.concatenate([[0], np.cumsum(con_final)])
+
+    def __len__(self):
+        return len(self.om)
+
+    def tramo(self, desde=-np.inf, hasta=np.inf):
+        """Posiciones (i, j) de los postulantes con desde <= OM <= hasta"""
+        return (int(np.searchsorted(self.om, desde, side='left')),
+                int(np.searchsorted(self.om, hasta, side='right')))
+
+    def finales(self, desde=-np.inf, hasta=np.inf):
+        """Vista (sin copia) de los puntajes finales del rango"""
+        i, j = self.tramo(desde, hasta)
+        return self.final[i:j]
+
+    def promedio(self, desde=-np.inf, hasta=np.inf):
+        """Puntaje final promedio del rango desde las sumas acumuladas (NaN si no hay puntajes)"""
+        i, j = self.tramo(desde, hasta)
+        n = self._con_final[j] - self._con_final[i]
+        return (self._suma[j] - self._suma[i]) / n if n else np.nan
+
+    def resumen(self, desde=-np.inf, hasta=np.inf):
+        """Postulantes, promedio, mínimo y máximo del puntaje final en el rango"""
+        i, j = self.tramo(desde, hasta)
+        finales = self.final[i:j]
+        con_final = self._con_final[j] - self._con_final[i]
+        return {
+            'postulantes': j - i,
+            'promedio': (self._suma[j] - self._suma[i]) / con_final if con_final else np.nan,
+            'minimo': np.nanmin(finales) if con_final else np.nan,
+            'maximo': np.nanmax(finales) if con_final else np.nan,
+        }
+
+
+_cache_indices_merito = CacheLRU(MAX_INDICES_MERITO_EN_CACHE, ttl=TTL_CACHE)
+
+
+def indice_merito(dataframe, clave=None):
+    """IndiceMerito del frame, construido una vez por clave (huella, escala y filtros)"""
+    if clave is None:
+        return IndiceMerito(dataframe['OM'], dataframe['Final'])
+    return _cache_indices_merito.obtener_o_calcular(clave, lambda: IndiceMerito(dataframe['OM'], dataframe['Final']))
+
+
+def tabla_por_ciclo(agregados_por_ciclo):
+    """Una fila por ciclo de admisión con sus indicadores principales"""
+    filas = []
+    for ciclo, agregados in agregados_por_ciclo.items():
+        final = agregados.momentos_final
+        no_ingreso = agregados.conteos['Especialidad'].get('No Ingreso', 0)
+        filas.append({
+            'Ciclo': ciclo,
+            'Postulantes': agregados.n_filas,
+            'Ingresaron': agregados.n_filas - int(no_ingreso),
+            'Edad Promedio': agregados.edad_media,
+            'Puntaje Promedio': final.media[0] if final.n else np.nan,
+            'Desviación Puntaje': final.desviacion()[0],
+            'Coincidencia 1ra Opción (%)': agregados.proporcion_coincidencia * 100,
+        })
+    return pd.DataFrame(filas).round(2)
@@ -0,0 +1,91 @@
+"""Índices por categoría para filtrar el dataset sin cadenas de copias"""
+import numpy as np
+import pandas as pd
+
+# Columnas que se pueden filtrar desde la barra lateral (selección múltiple)
+COLUMNAS_FILTRO = ['SEXO', 'MODALIDAD', 'GESTIÓN', 'TIPO.INSTITUCIÓN', 'DEP..DOM.', 'Especialidad']
+
+# Estado de ingreso: columna derivada de Especialidad
+COLUMNA_INGRESO = 'INGRESO'
+INGRESARON = 'Ingresaron'
+NO_INGRESARON = 'No ingresaron'
+
+
+def _agrupar_filas(codigos, categorias, tipo):
+    """Posiciones (ordenadas) de las filas de cada categoría a partir de los códigos categóricos"""
+    orden = np.argsort(codigos, kind='stable').astype(tipo)
+    # Los nulos (código -1) quedan al principio y no pertenecen a ninguna categoría
+    limites = np.searchsorted(codigos[orden], np.arange(len(categorias) + 1))
+    return {categoria: orden[inicio:fin]
+            for categoria, inicio, fin in zip(categorias, limites[:-1], limites[1:]) if fin > inicio}
+
+
+class IndiceFiltros:
+    """Filas de cada categoría de las columnas filtrables, como arreglos ordenados de posiciones
+
+    Se construye una vez al cargar el dataset. Una combinación de filtros se resuelve
+    uniendo las filas de las categorías elegidas en cada columna e intersecando las de
+    columnas distintas; el frame solo se recorta una vez, al final.
+    """
+
+    def __init__(self, dataframe, columnas=COLUMNAS_FILTRO):
+        self.n_filas = len(dataframe)
+        tipo = np.int32 if self.n_filas < 2**31 else np.int64
+        self.filas = {}
+        for col in columnas:
+            if col not in dataframe.columns:
+                continue
+            serie = dataframe[col]
+            if not isinstance(serie.dtype, pd.CategoricalDtype):
+                serie = serie.astype('category')
+            self.filas[col] = _agrupar_filas(serie.cat.codes.to_numpy(), serie.cat.categories, tipo)
+
+        no_ingreso = self.filas.get('Especialidad', {}).get('No Ingreso', np.empty(0, dtype=tipo))
+        self.filas[COLUMNA_INGRESO] = {
+            INGRESARON: np.setdiff1d(np.arange(self.n_filas, dtype=tipo), no_ingreso, assume_unique=True),
+            NO_INGRESARON: no_ingreso,
+        }
+
+    def categorias(self, col):
+        """Categorías de la columna que aparecen en los datos"""
+        return list(self.filas.get(col, {}))
+
+    def contar(self, col, categoria):
+        return len(self.filas.get(col, {}).get(categoria, ()))
+
+    def filas_seleccionadas(self, seleccion):
+        """Posiciones de las filas que cumplen todos los filtros (None si no se filtra nada)
+
+        `seleccion` asocia cada columna con las categorías aceptadas; una lista vacía no filtra.
+        """
+        conjuntos = []
+        for col, categorias in seleccion.items():
+            if not categorias:
+                continue
+            indice = self.filas[col]
+            partes = [indice[categoria] for categoria in categorias if categoria in indice]
+            if not partes:
+                return np.empty(0, dtype=np.int32)
+            conjuntos.append(partes[0] if len(partes) == 1 else np.sort(np.concatenate(partes)))
+        if not conjuntos:
+            return None
+
+        # Intersecar empezando por el conjunto más pequeño
+        conjuntos.sort(key=len)
+        filas = conjuntos[0]
+        for otras in conjuntos[1:]:
+            filas = np.intersect1d(filas, otras, assume_unique=True)
+        return filas
+
+    def aplicar(self, dataframe, seleccion):
+        """Frame con las filas seleccionadas; sin filtros se devuelve el mismo objeto, sin copiar"""
+        filas = self.filas_seleccionadas(seleccion)
+        if filas is None:
+            return dataframe
+        return dataframe.take(filas)
+
+
+def clave_filtros(seleccion):
+    """Representación canónica (hashable) de los filtros activos, para las claves de caché"""
+    return tuple((col, tuple(sorted(map(str, categorias))))
+                 for col, categorias in sorted(seleccion.items()) if categorias)
@@ -0,0 +1,860 @@
+"""Gráficas del dashboard (matplotlib) y caché de las imágenes ya renderizadas"""
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+import matplotlib
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from matplotlib.gridspec import GridSpec
+from matplotlib.colors import LogNorm
+from matplotlib.lines import Line2D
+
+from cache import TTL_CACHE, CacheLRU
+from estadisticas import celdas_dispersion
+
+# Tamaño máximo total de las imágenes guardadas en la caché de figuras
+MAX_BYTES_FIGURAS = 256 * 1024**2
+
+# Mismas opciones con las que st.pyplot guarda las figuras
+OPCIONES_PNG = {'format': 'png', 'dpi': 200, 'bbox_inches': 'tight'}
+
+# Directorio opcional donde las imágenes también se guardan en disco, compartidas entre procesos
+# (por ejemplo, los del generador de reportes); sin él la caché es solo de memoria
+DIRECTORIO_FIGURAS = os.environ.get('DASHBOARD_FIGURAS') or None
+
+# Procesos que dibujan en paralelo las gráficas de una sección (1 = dibujar en el propio proceso)
+TRABAJADORES_GRAFICAS = int(os.environ.get('DASHBOARD_TRABAJADORES_GRAFICAS', os.cpu_count() or 1))
+
+# Motores para las gráficas con muchos puntos: imagen dibujada en el servidor o Vega-Lite en el navegador
+MOTOR_MATPLOTLIB = 'Matplotlib (imagen)'
+MOTOR_VEGA = 'Vega-Lite (navegador)'
+MOTORES_GRAFICAS = [MOTOR_MATPLOTLIB, MOTOR_VEGA]
+MOTOR_GRAFICAS = MOTOR_VEGA if os.environ.get('DASHBOARD_MOTOR_GRAFICAS', '').lower() == 'vega' else MOTOR_MATPLOTLIB
+# Por encima de estos puntos el navegador recibe celdas agregadas en lugar de cada punto
+UMBRAL_PUNTOS = int(os.environ.get('DASHBOARD_UMBRAL_PUNTOS', '20000'))
+# Celdas por eje al agregar una dispersión
+CELDAS_DISPERSION = 120
+# En la imagen, una celda del histograma de la nube ocupa estos píxeles por lado
+PIXELES_POR_CELDA = 8
+
+# Tamaño de la figura de la sección 11 (pulgadas)
+TAMANO_MERITO = (10, 6)
+
+# Colores de los cuadrantes de la sección 12, en el orden de calculos.CUADRANTES
+COLORES_CUADRANTES = ['blue', 'orange', 'green', 'red']
+
+
+def figura_a_png(fig):
+    """Renderiza la figura a bytes PNG y la cierra"""
+    buffer = BytesIO()
+    fig.savefig(buffer, **OPCIONES_PNG)
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+# Clave: (huella, escala, filtros..., id de la gráfica) -> bytes PNG
+_cache_figuras = CacheLRU(max_bytes=MAX_BYTES_FIGURAS, ttl=TTL_CACHE)
+
+
+def usar_directorio_figuras(ruta):
+    """Activa (o con None desactiva) la copia en disco de la caché de figuras"""
+    global DIRECTORIO_FIGURAS
+    DIRECTORIO_FIGURAS = ruta
+    if ruta is not None:
+        os.makedirs(ruta, exist_ok=True)
+
+
+def _ruta_figura(clave_figura):
+    return os.path.join(DIRECTORIO_FIGURAS, hashlib.sha1(repr(clave_figura).encode()).hexdigest() + '.png')
+
+
+def _leer_figura_disco(clave_figura):
+    if DIRECTORIO_FIGURAS is None:
+        return None
+    try:
+        with open(_ruta_figura(clave_figura), 'rb') as archivo:
+            return archivo.read()
+    except OSError:
+        return None
+
+
+def _guardar_figura_disco(clave_figura, png):
+    if DIRECTORIO_FIGURAS is None:
+        return
+    ruta = _ruta_figura(clave_figura)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    try:
+        with open(temporal, 'wb') as archivo:
+            archivo.write(png)
+        os.replace(temporal, ruta)
+    except OSError:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+
+def _iniciar_trabajador():
+    """Los procesos del pool solo rasterizan: backend sin interfaz gráfica"""
+    matplotlib.use('Agg')
+
+
+# Segundos que cada hilo ha pasado dibujando figuras en este proceso (para el perfilado)
+_tiempo_dibujo = threading.local()
+
+
+def _dibujar_png(dibujar, args):
+    inicio = time.perf_counter()
+    png = figura_a_png(dibujar(*args))
+    _tiempo_dibujo.segundos = segundos_dibujando() + time.perf_counter() - inicio
+    return png
+
+
+def segundos_dibujando():
+    """Tiempo acumulado por el hilo actual dibujando y rasterizando figuras en este proceso"""
+    return getattr(_tiempo_dibujo, 'segundos', 0.0)
+
+
+# El pool se crea al primer uso y se reutiliza entre reejecuciones; 'spawn' evita
+# heredar los hilos del servidor de Streamlit al crear los procesos
+_pool = None
+_pool_trabajadores = None
+_pool_lock = threading.Lock()
+
+
+def _obtener_pool(trabajadores):
+    global _pool, _pool_trabajadores
+    with _pool_lock:
+        if _pool is None or _pool_trabajadores != trabajadores:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=trabajadores, initializer=_iniciar_trabajador,
+                                        mp_context=multiprocessing.get_context('spawn'))
+            _pool_trabajadores = trabajadores
+        return _pool
+
+
+def _descartar_pool():
+    global _pool, _pool_trabajadores
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = None
+        _pool_trabajadores = None
+
+
+def renderizar_pngs(especificaciones, trabajadores=None):
+    """PNG de cada especificación (clave, id_grafica, dibujar, args), en el mismo orden
+
+    Las que ya están en la caché (o en DIRECTORIO_FIGURAS) no se vuelven a dibujar. Si falta
+    más de una y hay más de un trabajador, se dibujan en paralelo en el pool de procesos; si
+    no, en este proceso.
+    `dibujar` debe ser una función de este módulo (se envía por pickle a los procesos).
+    """
+    if trabajadores is None:
+        trabajadores = TRABAJADORES_GRAFICAS
+    pngs = [None] * len(especificaciones)
+    pendientes = []
+    for i, (clave, id_grafica, _, _) in enumerate(especificaciones):
+        if clave is not None:
+            pngs[i] = _cache_figuras.obtener((*clave, id_grafica))
+            if pngs[i] is None:
+                pngs[i] = _leer_figura_disco((*clave, id_grafica))
+                if pngs[i] is not None:
+                    _cache_figuras.guardar((*clave, id_grafica), pngs[i])
+        if pngs[i] is None:
+            pendientes.append(i)
+
+    if trabajadores > 1 and len(pendientes) > 1:
+        try:
+            pool = _obtener_pool(trabajadores)
+            futuros = [(i, pool.submit(_dibujar_png, especificaciones[i][2], especificaciones[i][3]))
+                       for i in pendientes]
+            for i, futuro in futuros:
+                pngs[i] = futuro.result()
+        except BrokenProcessPool:
+            # Un proceso murió: se recrea el pool en la próxima llamada y ahora se dibuja aquí
+            _descartar_pool()
+    for i in pendientes:
+        if pngs[i] is None:
+            pngs[i] = _dibujar_png(especificaciones[i][2], especificaciones[i][3])
+
+    for i in pendientes:
+        clave, id_grafica, _, _ = especificaciones[i]
+        if clave is not None:
+            _cache_figuras.guardar((*clave, id_grafica), pngs[i])
+            _guardar_figura_disco((*clave, id_grafica), pngs[i])
+    return pngs
+
+
+def png_grafica(clave, id_grafica, dibujar, *args):
+    """PNG de la gráfica desde la caché; si no está (o no hay clave) se dibuja con dibujar(*args)"""
+    return renderizar_pngs([(clave, id_grafica, dibujar, args)], trabajadores=1)[0]
+
+
+def estadisticas_cache_figuras():
+    """Aciertos, fallos y bytes ocupados por la caché de figuras"""
+    return _cache_figuras.resumen()
+
+
+# ---------------------------------------------------------------------------
+# Análisis por materias
+# ---------------------------------------------------------------------------
+
+def grafica_perfil_materias(materias, promedios):
+    """Radar y barras con la calificación promedio de cada materia"""
+    fig = plt.figure(figsize=(20, 8))
+    gs = GridSpec(1, 2, figure=fig)
+
+    # Subplot 1: Radar chart
+    ax1 = fig.add_subplot(gs[0, 0], polar=True)
+    promedios = list(promedios)
+    angles = np.linspace(0, 2*np.pi, len(promedios), endpoint=False).tolist()
+    angles += angles[:1]
+    promedios_radar = promedios + [promedios[0]]
+
+    ax1.plot(angles, promedios_radar, 'o-', linewidth=2, label='Promedio', color='blue', markersize=8)
+    ax1.fill(angles, promedios_radar, alpha=0.25, color='blue')
+    ax1.set_xticks(angles[:-1])
+    ax1.set_xticklabels(materias)
+    ax1.set_ylim(0, 20)
+    ax1.set_yticks([0, 5, 10, 15, 20])
+    ax1.grid(True)
+    ax1.set_title('Perfil Académico Promedio - Gráfico Radar', fontsize=14, fontweight='bold', pad=20)
+
+    # Subplot 2: Barras comparativas
+    ax2 = fig.add_subplot(gs[0, 1])
+    colors = plt.cm.Set3(np.linspace(0, 1, len(materias)))
+    bars = ax2.bar(range(len(promedios)), promedios, color=colors, alpha=0.7, edgecolor='black')
+
+    ax2.set_xticks(range(len(promedios)))
+    ax2.set_xticklabels(materias, rotation=45)
+    ax2.set_ylabel('Calificación (0-20)')
+    ax2.set_ylim(0, 20)
+    ax2.grid(True, alpha=0.3, axis='y')
+    ax2.set_title('Calificaciones Promedio por Materia', fontsize=14, fontweight='bold')
+
+    # Añadir valores en las barras
+    for bar, valor in zip(bars, promedios):
+        ax2.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.1,
+                f'{valor:.1f}', ha='center', va='bottom', fontweight='bold')
+
+    fig.tight_layout()
+    return fig
+
+
+def grafica_matriz_correlacion(correlaciones):
+    """Mapa de calor de la matriz de correlación con el valor en cada celda"""
+    columnas = list(correlaciones.columns)
+    fig, ax = plt.subplots(figsize=(12, 10))
+
+    im = ax.imshow(correlaciones, cmap='RdBu_r', aspect='auto', vmin=-1, vmax=1)
+
+    ax.set_xticks(range(len(columnas)))
+    ax.set_yticks(range(len(columnas)))
+    ax.set_xticklabels(columnas, rotation=45, ha='right')
+    ax.set_yticklabels(columnas)
+
+    # Añadir valores en las celdas
+    for i in range(len(columnas)):
+        for j in range(len(columnas)):
+            color = 'white' if abs(correlaciones.iloc[i, j]) > 0.5 else 'black'
+            ax.text(j, i, f'{correlaciones.iloc[i, j]:.2f}',
+                    ha="center", va="center", color=color, fontweight='bold', fontsize=8)
+
+    ax.set_title('Matriz de Correlación entre Materias', fontsize=16, fontweight='bold')
+    fig.colorbar(im, ax=ax, shrink=0.8)
+    fig.tight_layout()
+    return fig
+
+
+def grafica_genero(cajas, promedio_genero_materia, materias):
+    """Boxplot del puntaje final por género y promedio por género en cada materia
+
+    `cajas` son las estadísticas de caja de cada género (SketchCuantiles.caja) y
+    `promedio_genero_materia` tiene una fila por materia y una columna por género.
+    """
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(18, 6))
+
+    # Boxplot por género para el puntaje final
+    for i, caja in enumerate(cajas):
+        box = ax1.bxp([caja], positions=[i + 1], widths=0.6, patch_artist=True)
+        for patch in box['boxes']:
+            patch.set_facecolor(plt.cm.Pastel1(i))
+
+    ax1.set_ylabel('Puntaje Final (0-20)')
+    ax1.set_ylim(0, 20)
+    ax1.grid(True, alpha=0.3, axis='y')
+    ax1.set_title('Puntaje Final por Género', fontsize=14, fontweight='bold')
+
+    # Promedio por género para cada materia
+    if len(promedio_genero_materia.columns) > 0:
+        for genero in promedio_genero_materia.columns:
+            ax2.plot(range(len(materias)), promedio_genero_materia[genero],
+                    'o-', label=genero, linewidth=2, markersize=6)
+
+        ax2.set_xticks(range(len(materias)))
+        ax2.set_xticklabels(materias, rotation=45)
+        ax2.set_ylabel('Calificación Promedio (0-20)')
+        ax2.set_ylim(0, 20)
+        ax2.grid(True, alpha=0.3)
+        ax2.legend()
+        ax2.set_title('Rendimiento por Género y Materia', fontsize=14, fontweight='bold')
+
+    fig.tight_layout()
+    return fig
+
+
+def grafica_histogramas_materias(histogramas, materias, promedios, desviaciones):
+    """Rejilla 3x4 con el histograma de cada materia (`histogramas`: materia -> (conteos, bordes))"""
+    fig, axes = plt.subplots(3, 4, figsize=(20, 12))
+    axes = axes.ravel()
+
+    # Seleccionar las primeras 12 materias para los histogramas
+    materias_histograma = materias[:12]
+    colors = plt.cm.Set3(np.linspace(0, 1, len(materias_histograma)))
+
+    for i, materia in enumerate(materias_histograma):
+        if i < len(axes):
+            conteos, bordes = histogramas[materia]
+            axes[i].bar(bordes[:-1], conteos, width=np.diff(bordes), align='edge',
+                        alpha=0.7, color=colors[i], edgecolor='black')
+            axes[i].set_xlim(0, 20)
+            axes[i].set_xlabel('Calificación')
+            axes[i].set_ylabel('Frecuencia')
+            axes[i].set_title(f'{materia}\n(μ={promedios[materia]:.1f}, σ={desviaciones[materia]:.1f})')
+            axes[i].grid(True, alpha=0.3)
+
+    # Ocultar ejes vacíos
+    for i in range(len(materias_histograma), len(axes)):
+        axes[i].set_visible(False)
+
+    fig.suptitle('Distribución de Calificaciones por Materia', fontsize=16, fontweight='bold', y=0.95)
+    fig.tight_layout()
+    return fig
+
+
+# ---------------------------------------------------------------------------
+# Análisis general
+# ---------------------------------------------------------------------------
+
+def grafica_edades(conteos, bordes):
+    """1. Histograma de edades ya contado (conteos y bordes de sus barras)"""
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.bar(bordes[:-1], conteos, width=np.diff(bordes), align='edge',
+           color='cornflowerblue', edgecolor='black', alpha=0.7)
+    ax.set_title("Distribución de edades de postulantes", fontsize=14, fontweight='bold')
+    ax.set_xlabel("Edad", fontsize=12)
+    ax.set_ylabel("Frecuencia", fontsize=12)
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+    return fig
+
+
+def grafica_sexo(sexo_counts):
+    """2. Gráfico circular por sexo con los colores de las tarjetas"""
+    fig, ax = plt.subplots(figsize=(8, 8))
+
+    # Definir colores según el sexo (coherentes con las métricas)
+    colors = []
+    labels = []
+    for sexo in sexo_counts.index:
+        if sexo.lower() == 'femenino':
+            colors.append('#E75480')  # Rosa igual que las métricas
+            labels.append(sexo)
+        elif sexo.lower() == 'masculino':
+            colors.append('#0074D9')  # Azul igual que las métricas
+            labels.append(sexo)
+        else:
+            colors.append('lightgray')  # Color por defecto
+            labels.append(sexo)
+
+    # Crear el gráfico pie con colores personalizados
+    wedges, texts, autotexts = ax.pie(sexo_counts.values, labels=labels, autopct='%1.1f%%',
+                                    colors=colors, startangle=90, explode=(0.05, 0) if len(sexo_counts) == 2 else (0,))
+
+    # Personalizar el texto de los porcentajes
+    for autotext in autotexts:
+        autotext.set_color('white')
+        autotext.set_fontweight('bold')
+        autotext.set_fontsize(11)
+
+    # Personalizar las etiquetas
+    for text in texts:
+        text.set_fontweight('bold')
+        text.set_fontsize(12)
+
+    ax.set_title('Distribución de Postulantes por Sexo', fontsize=14, fontweight='bold')
+    ax.set_ylabel('')
+    return fig
+
+
+def grafica_nacionalidad(nationality_counts):
+    """3. Barras por nacionalidad (a partir de los conteos por nacionalidad)"""
+    fig, ax = plt.subplots(figsize=(10, 6))
+    bars = ax.bar(nationality_counts.index, nationality_counts.values,
+                color='skyblue', edgecolor='black', alpha=0.7)
+    ax.set_title('Distribución de Postulantes por Nacionalidad', fontsize=14, fontweight='bold')
+    ax.set_xlabel('Nacionalidad', fontsize=12)
+    ax.set_ylabel('Número de Postulantes', fontsize=12)
+    ax.tick_params(axis='x', rotation=45)
+
+    # Calcular límite Y dinámicamente
+    max_valor = nationality_counts.max()
+    y_upper_limit = max_valor + (max_valor * 0.12)  # 12% de margen superior
+    ax.set_ylim(0, y_upper_limit)
+
+    for bar in bars:
+        height = bar.get_height()
+        # Posicionar texto dentro del gráfico con margen
+        text_y_pos = min(height + (max_valor * 0.01), y_upper_limit - (max_valor * 0.005))
+        ax.text(bar.get_x() + bar.get_width()/2., text_y_pos,
+                f'{int(height)}', ha='center', va='bottom', fontsize=10)
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+    fig.tight_layout()
+    return fig
+
+
+def grafica_departamento(conteos):
+    """4. Barras horizontales por departamento de domicilio (a partir de los conteos)"""
+    fig, ax = plt.subplots(figsize=(12, 8))
+    dep_counts = conteos.sort_values(ascending=True)
+    bars = ax.barh(dep_counts.index, dep_counts.values,
+                color='steelblue', alpha=0.7, edgecolor='black')
+    ax.set_title('Distribución de Postulantes por Departamento de Domicilio', fontsize=14, fontweight='bold')
+    ax.set_xlabel('Número de Postulantes', fontsize=12)
+    ax.set_ylabel('Departamento', fontsize=12)
+
+    # Calcular límite X dinámicamente
+    max_valor = dep_counts.max()
+    x_upper_limit = max_valor + (max_valor * 0.15)  # 15% de margen superior
+    ax.set_xlim(0, x_upper_limit)
+
+    for bar in bars:
+        width = bar.get_width()
+        # Posicionar texto dentro del gráfico con margen
+        text_x_pos = min(width + (max_valor * 0.01), x_upper_limit - (max_valor * 0.02))
+        ax.text(text_x_pos, bar.get_y() + bar.get_height()/2,
+                f'{int(width)}', ha='left', va='center', fontsize=10)
+    ax.grid(axis='x', linestyle='--', alpha=0.3)
+    fig.tight_layout()
+    return fig
+
+
+def grafica_tipo_institucion(tipo_counts):
+    """5a. Gráfico circular por tipo de institución"""
+    fig, ax = plt.subplots(figsize=(8, 6))
+    colors_circle = ['lightblue', 'lightcoral', 'lightgreen']
+    wedges, texts, autotexts = ax.pie(tipo_counts.values, labels=None, autopct='%1.1f%%',
+                                     startangle=90, colors=colors_circle)
+    ax.legend(wedges, [f'{label} ({count})' for label, count in zip(tipo_counts.index, tipo_counts.values)],
+             title="Tipo de Institución", loc="center")
+    ax.set_title('Distribución por Tipo de Institución Educativa', fontsize=14, fontweight='bold')
+    return fig
+
+
+def grafica_gestion(gestion_counts, total):
+    """5b. Barras horizontales por tipo de gestión"""
+    fig, ax = plt.subplots(figsize=(8, 6))
+    gestion_counts = gestion_counts.sort_values(ascending=True)
+    colors_bars = ['lightcoral', 'lightgreen', 'lightblue']
+    bars = ax.barh(gestion_counts.index, gestion_counts.values,
+                color=colors_bars, alpha=0.8, edgecolor='black')
+
+    # Calcular límite X dinámicamente
+    max_valor = gestion_counts.max()
+    x_upper_limit = max_valor + (max_valor * 0.22)  # 18% de margen superior para texto más largo
+    ax.set_xlim(0, x_upper_limit)
+
+    for bar in bars:
+        width = bar.get_width()
+        # Posicionar texto dentro del gráfico con margen
+        text_x_pos = min(width + (max_valor * 0.02), x_upper_limit - (max_valor * 0.03))
+        ax.text(text_x_pos, bar.get_y() + bar.get_height()/2,
+            f'{int(width)} ({width/total*100:.1f}%)',
+            ha='left', va='center', fontsize=10, fontweight='bold')
+    ax.set_title('Distribución por Tipo de Gestión Educativa', fontsize=14, fontweight='bold')
+    ax.set_xlabel('Número de Postulantes', fontsize=12)
+    ax.grid(axis='x', linestyle='--', alpha=0.3)
+    fig.tight_layout()
+    return fig
+
+
+def grafica_modalidad(conteos, total):
+    """6. Barras horizontales por modalidad (conteos y total de postulantes para los porcentajes)"""
+    fig, ax = plt.subplots(figsize=(10, 6))
+    modalidad_counts = conteos.sort_values(ascending=True)
+    bars = ax.barh(modalidad_counts.index, modalidad_counts.values,
+                color='lightsteelblue', alpha=0.8, edgecolor='navy', linewidth=0.5)
+    ax.set_title('Distribución de Postulantes por Modalidad', fontsize=14, fontweight='bold')
+    ax.set_xlabel('Número de Postulantes', fontsize=12)
+    ax.set_ylabel('Modalidad', fontsize=12)
+
+    # Calcular límite X dinámicamente
+    max_valor = modalidad_counts.max()
+    x_upper_limit = max_valor + (max_valor * 0.22)  # 15% de margen superior
+    ax.set_xlim(0, x_upper_limit)
+
+    for bar in bars:
+        width = bar.get_width()
+        # Posicionar texto dentro del gráfico con margen
+        text_x_pos = min(width + (max_valor * 0.01), x_upper_limit - (max_valor * 0.02))
+        ax.text(text_x_pos, bar.get_y() + bar.get_height()/2,
+            f'{int(width)} ({width/total*100:.2f}%)',
+            ha='left', va='center', fontsize=10, fontweight='bold')
+    ax.grid(axis='x', linestyle='--', alpha=0.3)
+    fig.tight_layout()
+    return fig
+
+
+def grafica_boxplot_modalidad(cajas, titulo, etiqueta):
+    """7. Boxplot horizontal de una columna (EDAD o Final) por modalidad, desde estadísticas de caja"""
+    fig, ax = plt.subplots(figsize=(8, 6))
+    ax.bxp(cajas, vert=False)
+    ax.grid(True)
+    ax.set_title(titulo, fontsize=12, fontweight='bold')
+    ax.set_xlabel(etiqueta, fontsize=10)
+    ax.set_ylabel('Modalidad', fontsize=10)
+    return fig
+
+
+def grafica_coincidencia(coincidencias, porcentajes):
+    """8. Barras de coincidencia entre primera opción y especialidad asignada"""
+    fig, ax = plt.subplots(figsize=(8, 6))
+    labels_ordenados = ['No Coincide', 'Coincide']
+    valores_ordenados = [coincidencias.get(False, 0), coincidencias.get(True, 0)]
+    porcentajes_ordenados = [porcentajes.get(False, 0), porcentajes.get(True, 0)]
+
+    bars = ax.bar(labels_ordenados, valores_ordenados,
+                color=['lightcoral', 'lightgreen'], alpha=0.8, edgecolor='black')
+    ax.set_title('Coincidencia entre Primera Opción y Especialidad Asignada', fontsize=14, fontweight='bold')
+    ax.set_ylabel('Número de Postulantes', fontsize=12)
+
+    # Calcular límite Y dinámicamente
+    max_valor = max(valores_ordenados)
+    y_upper_limit = max_valor + (max_valor * 0.15)  # 15% de margen superior
+    ax.set_ylim(0, y_upper_limit)
+
+    for i, bar in enumerate(bars):
+        height = bar.get_height()
+        # Posicionar texto dentro del gráfico con margen
+        text_y_pos = min(height + (max_valor * 0.02), y_upper_limit - (max_valor * 0.01))
+        ax.text(bar.get_x() + bar.get_width()/2., text_y_pos,
+            f'{int(height)} postulantes\n({porcentajes_ordenados[i]:.1f}%)',
+            ha='center', va='bottom', fontsize=11, fontweight='bold')
+    ax.grid(axis='y', linestyle='--', alpha=0.3)
+    return fig
+
+
+def grafica_puntaje_especialidad(cajas, maximos, promedio_general, max_puntaje_global, min_puntaje_global):
+    """9. Boxplot del puntaje final por especialidad (cajas ya ordenadas por mediana)"""
+    fig, ax = plt.subplots(figsize=(14, 8))
+
+    box_plot = ax.bxp(cajas, patch_artist=True, vert=True)
+    colors = plt.cm.Set3(np.linspace(0, 1, len(cajas)))
+    for patch, color in zip(box_plot['boxes'], colors):
+        patch.set_facecolor(color)
+
+    # Calcular el límite Y dinámicamente
+    rango_puntaje = max_puntaje_global - min_puntaje_global
+
+    # Establecer límites del eje Y con margen para las etiquetas
+    y_upper_limit = max_puntaje_global + (rango_puntaje * 0.08)  # 8% de margen superior
+    y_lower_limit = max(0, min_puntaje_global - (rango_puntaje * 0.02))  # 2% de margen inferior, mínimo 0
+
+    ax.set_ylim(y_lower_limit, y_upper_limit)
+
+    for i, max_puntaje in enumerate(maximos):
+        # Verificar que la etiqueta esté dentro del límite Y
+        y_pos = min(max_puntaje + 0.3, y_upper_limit - 0.1)  # Asegurar que esté dentro del gráfico
+
+        ax.text(i + 1, y_pos, f'{max_puntaje:.1f}',
+                ha='center', va='bottom', fontsize=9, fontweight='bold',
+                bbox=dict(boxstyle="round,pad=0.2", facecolor="yellow", alpha=0.7, edgecolor='black'))
+
+    ax.set_title('Distribución de Puntaje Final por Especialidad Asignada', fontsize=14, fontweight='bold')
+    ax.set_ylabel('Puntaje Final', fontsize=12)
+    ax.set_xlabel('Especialidad', fontsize=12)
+    ax.tick_params(axis='x', rotation=45)
+    ax.grid(axis='y', linestyle='--', alpha=0.3)
+
+    ax.axhline(y=promedio_general, color='red', linestyle='--', linewidth=2,
+            label=f'Promedio General: {promedio_general:.2f}')
+    ax.legend()
+
+    # Ajustar diseño automáticamente
+    fig.tight_layout()
+    return fig
+
+
+def grafica_frecuencia_opcion(conteos, total, titulo, color, borde):
+    """10. Barras horizontales con la frecuencia de cada carrera en una opción (conteos y total)"""
+    fig, ax = plt.subplots(figsize=(10, 8))
+    conteos = conteos.sort_values(ascending=True)
+    bars = ax.barh(conteos.index, conteos.values,
+                color=color, alpha=0.8, edgecolor=borde, linewidth=0.5)
+    ax.set_title(titulo, fontsize=12, fontweight='bold')
+    ax.set_xlabel('Número de Postulantes', fontsize=10)
+
+    # Calcular límite X dinámicamente
+    max_valor = conteos.max()
+    x_upper_limit = max_valor + (max_valor * 0.12)  # 12% de margen superior
+    ax.set_xlim(0, x_upper_limit)
+
+    for bar in bars:
+        width = bar.get_width()
+        porcentaje = (width / total) * 100
+        # Posicionar texto dentro del gráfico con margen
+        text_x_pos = min(width + (max_valor * 0.01), x_upper_limit - (max_valor * 0.02))
+        ax.text(text_x_pos, bar.get_y() + bar.get_height()/2,
+            f'{int(width)} ({porcentaje:.1f}%)',
+            ha='left', va='center', fontsize=8, fontweight='bold')
+    ax.grid(axis='x', linestyle='--', alpha=0.3)
+    return fig
+
+
+def nube_dispersion(x, y, tamano, umbral=UMBRAL_PUNTOS):
+    """Nivel de detalle de una dispersión antes de enviarla a dibujar
+
+    Hasta `umbral` puntos se dibujan todos. Por encima, un histograma 2D con una celda
+    cada PIXELES_POR_CELDA píxeles de la figura final, así que el tamaño de lo que se
+    dibuja depende de la imagen y no del número de postulantes.
+    """
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    if len(x) <= umbral:
+        return {'x': x, 'y': y}
+    validos = ~(np.isnan(x) | np.isnan(y))
+    celdas = [max(1, round(pulgadas * OPCIONES_PNG['dpi'] / PIXELES_POR_CELDA)) for pulgadas in tamano]
+    conteos, bordes_x, bordes_y = np.histogram2d(x[validos], y[validos], bins=celdas)
+    return {'conteos': conteos, 'bordes_x': bordes_x, 'bordes_y': bordes_y}
+
+
+def nube_vega(x, y, umbral=UMBRAL_PUNTOS):
+    """Lo que recibe especificacion_merito: los puntos o, con más de `umbral`, las celdas no vacías"""
+    if len(x) <= umbral:
+        return {'x': np.asarray(x, dtype='float64'), 'y': np.asarray(y, dtype='float64')}
+    return {'celdas': celdas_dispersion(x, y, CELDAS_DISPERSION)}
+
+
+def grafica_merito(nube, extremos, z, correlacion):
+    """11. Dispersión del puntaje final frente al orden de mérito con su tendencia
+
+    `nube` viene de nube_dispersion (puntos o histograma 2D) y la tendencia es la recta
+    entre los dos extremos de OM.
+    """
+    fig, ax = plt.subplots(figsize=TAMANO_MERITO)
+    if 'conteos' in nube:
+        malla = ax.pcolormesh(nube['bordes_x'], nube['bordes_y'], np.ma.masked_equal(nube['conteos'].T, 0),
+                              cmap='Blues', norm=LogNorm())
+        fig.colorbar(malla, ax=ax, label='Postulantes')
+    else:
+        ax.scatter(nube['x'], nube['y'], alpha=0.6, color='steelblue', s=50)
+    ax.set_title('Relación entre Puntaje Final y Orden de Mérito', fontsize=14, fontweight='bold')
+    ax.set_xlabel('Orden de Mérito (OM)', fontsize=12)
+    ax.set_ylabel('Puntaje Final', fontsize=12)
+    ax.grid(True, alpha=0.3)
+
+    p = np.poly1d(z)
+    ax.plot(extremos, p(extremos), "r--", alpha=0.8, linewidth=2,
+            label=f'Tendencia: y = {z[0]:.3f}x + {z[1]:.3f}')
+
+    ax.text(0.05, 0.95, f'Correlación: {correlacion:.3f}',
+            transform=ax.transAxes, fontsize=12,
+            bbox=dict(boxstyle="round", facecolor="wheat", alpha=0.8))
+    ax.legend()
+    return fig
+
+
+def especificacion_merito(nube, extremos, z, correlacion):
+    """11. Especificación Vega-Lite de la dispersión puntaje final vs orden de mérito
+
+    `nube` viene de nube_vega: todos los puntos o, por encima de UMBRAL_PUNTOS, solo las
+    celdas no vacías de un histograma 2D, coloreadas por número de postulantes.
+    """
+    eje_x = {'type': 'quantitative', 'title': 'Orden de Mérito (OM)'}
+    eje_y = {'type': 'quantitative', 'title': 'Puntaje Final'}
+    if 'celdas' in nube:
+        celdas = nube['celdas']
+        capa = {
+            'data': {'values': celdas.to_dict('records')},
+            'mark': {'type': 'rect'},
+            'encoding': {
+                'x': {'field': 'x0', **eje_x}, 'x2': {'field': 'x1'},
+                'y': {'field': 'y0', **eje_y}, 'y2': {'field': 'y1'},
+                'color': {'field': 'postulantes', 'type': 'quantitative', 'scale': {'type': 'log', 'scheme': 'blues'}},
+                'tooltip': [{'field': 'postulantes', 'type': 'quantitative'}],
+            },
+        }
+    else:
+        puntos = pd.DataFrame({'OM': nube['x'], 'Final': nube['y']}).dropna()
+        capa = {
+            'data': {'values': puntos.to_dict('records')},
+            'mark': {'type': 'circle', 'opacity': 0.6, 'color': 'steelblue'},
+            'encoding': {'x': {'field': 'OM', **eje_x}, 'y': {'field': 'Final', **eje_y},
+                         'tooltip': [{'field': 'OM'}, {'field': 'Final'}]},
+        }
+    # La recta de tendencia solo necesita sus dos extremos
+    tendencia = {
+        'data': {'values': [{'OM': float(x), 'Final': float(z[0] * x + z[1])} for x in extremos]},
+        'mark': {'type': 'line', 'color': 'red', 'strokeDash': [6, 4], 'strokeWidth': 2},
+        'encoding': {'x': {'field': 'OM', **eje_x}, 'y': {'field': 'Final', **eje_y}},
+    }
+    return {
+        'title': f'Relación entre Puntaje Final y Orden de Mérito (correlación: {correlacion:.3f})',
+        'layer': [capa, tendencia],
+    }
+
+
+def grafica_rangos_merito(cajas, promedio_general):
+    """11. Boxplot del puntaje final por rango de orden de mérito, desde estadísticas de caja"""
+    fig2, ax2 = plt.subplots(figsize=(12, 6))
+
+    box_plot = ax2.bxp(cajas, patch_artist=True, vert=True)
+    colors = plt.cm.viridis(np.linspace(0, 1, len(cajas)))
+    for patch, color in zip(box_plot['boxes'], colors):
+        patch.set_facecolor(color)
+
+    ax2.set_title('Distribución de Puntajes Finales por Rango de Orden de Mérito', fontsize=14, fontweight='bold')
+    ax2.set_ylabel('Puntaje Final', fontsize=12)
+    ax2.set_xlabel('Rango de Orden de Mérito', fontsize=12)
+    ax2.tick_params(axis='x', rotation=45)
+    ax2.grid(axis='y', linestyle='--', alpha=0.3)
+
+    # Añadir línea del promedio general
+    ax2.axhline(y=promedio_general, color='red', linestyle='--', linewidth=2,
+            label=f'Promedio General: {promedio_general:.2f}')
+    ax2.legend()
+    return fig2
+
+
+def grafica_demanda_selectividad(tabla, promedio_demanda, promedio_selectividad, correlacion):
+    """12. Dispersión demanda vs selectividad coloreada por cuadrante (columna categórica 'Cuadrante')"""
+    fig, ax = plt.subplots(figsize=(12, 8))
+
+    # Un color por código de cuadrante: Alto-Alto, Alto-Bajo, Bajo-Alto, Bajo-Bajo
+    colores = np.array(COLORES_CUADRANTES)[tabla['Cuadrante'].cat.codes.to_numpy()]
+    demandas = tabla['Demanda'].to_numpy()
+    selectividades = tabla['Selectividad'].to_numpy()
+
+    ax.scatter(demandas, selectividades, s=100, alpha=0.7, c=colores, edgecolors='black')
+    ax.set_title('Relación entre Demanda y Selectividad por Carrera', fontsize=14, fontweight='bold')
+    ax.set_xlabel('Demanda (Número de postulantes como Opción 1)', fontsize=12)
+    ax.set_ylabel('Selectividad (Puntaje Promedio de Ingreso)', fontsize=12)
+    ax.grid(True, alpha=0.3)
+
+    for carrera, demanda, selectividad in zip(tabla.index, demandas, selectividades):
+        ax.annotate(carrera, (demanda, selectividad), xytext=(5, 5), textcoords='offset points',
+                    fontsize=9, alpha=0.8)
+
+    ax.text(0.05, 0.95, f'Correlación: {correlacion:.3f}',
+            transform=ax.transAxes, fontsize=12,
+            bbox=dict(boxstyle="round", facecolor="wheat", alpha=0.8))
+
+    ax.axhline(y=promedio_selectividad, color='red', linestyle='--', alpha=0.7,
+            label=f'Promedio Selectividad: {promedio_selectividad:.1f}')
+    ax.axvline(x=promedio_demanda, color='green', linestyle='--', alpha=0.7,
+            label=f'Promedio Demanda: {promedio_demanda:.1f}')
+
+    # Añadir leyenda de cuadrantes
+    legend_elements = [
+        Line2D([0], [0], marker='o', color='w', markerfacecolor='blue', markersize=10, label='Alta Demanda + Alta Selectividad'),
+        Line2D([0], [0], marker='o', color='w', markerfacecolor='orange', markersize=10, label='Alta Demanda + Baja Selectividad'),
+        Line2D([0], [0], marker='o', color='w', markerfacecolor='green', markersize=10, label='Baja Demanda + Alta Selectividad'),
+        Line2D([0], [0], marker='o', color='w', markerfacecolor='red', markersize=10, label='Baja Demanda + Baja Selectividad')
+    ]
+    ax.legend(handles=legend_elements, loc='upper right')
+    return fig
+
+
+def grafica_probabilidad(df_probabilidades, prob_promedio_global):
+    """13. Barras horizontales con la probabilidad de ingreso a la primera opción"""
+    fig, ax = plt.subplots(figsize=(12, 8))
+    bars = ax.barh(df_probabilidades.index, df_probabilidades['Probabilidad'],
+                color='lightcoral', alpha=0.8, edgecolor='darkred')
+    ax.set_title('Probabilidad Empírica de Ingresar a la Primera Opción por Carrera', fontsize=14, fontweight='bold')
+    ax.set_xlabel('Probabilidad de Ingreso (%)', fontsize=12)
+    ax.set_ylabel('Carrera (Primera Opción)', fontsize=12)
+
+    # Calcular límite X dinámicamente (máximo 100% pero con margen para etiquetas)
+    max_probabilidad = df_probabilidades['Probabilidad'].max()
+    x_upper_limit = min(100 + 8, max_probabilidad + (max_probabilidad * 0.15))  # Máximo 108% o 15% de margen
+    ax.set_xlim(0, x_upper_limit)
+
+    for bar, (carrera, fila) in zip(bars, df_probabilidades.iterrows()):
+        width = bar.get_width()
+        total_op1 = int(fila['Postulantes'])
+        ingresaron_op1 = int(fila['Ingresaron'])
+
+        # Posicionar texto dentro del gráfico con margen
+        text_x_pos = min(width + 1, x_upper_limit - 3)  # Margen de 3 unidades del borde
+        ax.text(text_x_pos, bar.get_y() + bar.get_height()/2,
+                f'{width:.1f}%\n({ingresaron_op1}/{total_op1})',
+                ha='left', va='center', fontsize=9, fontweight='bold')
+
+    ax.axvline(x=prob_promedio_global, color='blue', linestyle='--', linewidth=2,
+            label=f'Probabilidad Promedio Global: {prob_promedio_global:.1f}%')
+    ax.grid(axis='x', linestyle='--', alpha=0.3)
+    ax.legend()
+    fig.tight_layout()
+    return fig
+
+
+def grafica_probabilidad_selectividad(datos_correlacion, correlacion_prob_select):
+    """13. Dispersión probabilidad de ingreso vs selectividad con línea de tendencia"""
+    fig_corr, ax_corr = plt.subplots(figsize=(10, 6))
+
+    ax_corr.scatter(datos_correlacion['Selectividad'], datos_correlacion['Probabilidad'],
+                    alpha=0.7, s=80, color='purple', edgecolors='black')
+
+    # Añadir etiquetas
+    for carrera in datos_correlacion.index:
+        ax_corr.annotate(carrera,
+                        (datos_correlacion.loc[carrera, 'Selectividad'],
+                        datos_correlacion.loc[carrera, 'Probabilidad']),
+                        xytext=(5, 5), textcoords='offset points',
+                        fontsize=8, alpha=0.8)
+
+    ax_corr.set_xlabel('Selectividad (Puntaje Promedio de Ingreso)', fontsize=12)
+    ax_corr.set_ylabel('Probabilidad de Ingreso (%)', fontsize=12)
+    ax_corr.set_title('Relación entre Probabilidad de Ingreso y Selectividad', fontsize=14, fontweight='bold')
+    ax_corr.grid(True, alpha=0.3)
+
+    # Línea de tendencia
+    if len(datos_correlacion) > 1:
+        z_corr = np.polyfit(datos_correlacion['Selectividad'], datos_correlacion['Probabilidad'], 1)
+        p_corr = np.poly1d(z_corr)
+        ax_corr.plot(datos_correlacion['Selectividad'], p_corr(datos_correlacion['Selectividad']),
+                    "r--", alpha=0.8, linewidth=2)
+
+    ax_corr.text(0.05, 0.95, f'Correlación: {correlacion_prob_select:.3f}',
+                transform=ax_corr.transAxes, fontsize=12,
+                bbox=dict(boxstyle="round", facecolor="wheat", alpha=0.8))
+    return fig_corr
+
+
+def grafica_correlacion_areas(correlaciones_ordenadas):
+    """14. Barras con la correlación de cada área con el puntaje final"""
+    fig, ax = plt.subplots(figsize=(12, 6))
+    bars = ax.bar(correlaciones_ordenadas.index, correlaciones_ordenadas.values,
+                color=['green' if x > 0.5 else 'orange' if x > 0.3 else 'red' for x in correlaciones_ordenadas.values],
+                alpha=0.7, edgecolor='black')
+    ax.set_title('Correlación entre Áreas Académicas y Puntaje Final', fontsize=14, fontweight='bold')
+    ax.set_xlabel('Áreas Académicas', fontsize=12)
+    ax.set_ylabel('Coeficiente de Correlación', fontsize=12)
+    ax.set_ylim(-0.1, 1.0)
+    ax.axhline(y=0, color='black', linewidth=0.8)
+    ax.axhline(y=0.5, color='red', linestyle='--', alpha=0.5, label='Correlación fuerte (0.5)')
+    ax.axhline(y=0.3, color='orange', linestyle='--', alpha=0.5, label='Correlación moderada (0.3)')
+
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height + 0.02,
+                f'{height:.3f}', ha='center', va='bottom', fontsize=10, fontweight='bold')
+    ax.legend()
+    ax.grid(axis='y', linestyle='--', alpha=0.3)
+    return fig
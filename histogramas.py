@@ -0,0 +1,92 @@
+"""Histogramas de todas las columnas de puntaje a la vez, con conteos acumulados para percentiles"""
+import numpy as np
+
+from cache import TTL_CACHE, CacheLRU
+from ingesta import COLUMNAS_CALIFICACIONES
+
+# Columnas que se cuentan juntas: las calificaciones y la edad
+COLUMNAS_HISTOGRAMA = [*COLUMNAS_CALIFICACIONES, 'EDAD']
+
+# Cubetas finas por columna; múltiplo de las barras que se dibujan (8 de edad, 15 por materia)
+CUBETAS = 1200
+
+# Histogramas guardados por (huella, escala, filtros)
+MAX_HISTOGRAMAS_EN_CACHE = 64
+
+
+class HistogramaPuntajes:
+    """Conteos por cubeta fina de varias columnas numéricas en una matriz columnas × cubetas
+
+    Cada columna se divide en `cubetas` intervalos iguales entre su mínimo y su máximo (como
+    np.histogram) y todos los valores se cuentan con un solo np.bincount. Un histograma de k
+    barras (k divisor de `cubetas`) es una suma por bloques y, con los conteos acumulados,
+    un percentil es una búsqueda binaria sobre las cubetas, sin volver a recorrer los datos.
+    La resolución de los percentiles es el ancho de una cubeta. Los NaN no se cuentan.
+    """
+
+    def __init__(self, dataframe, columnas=COLUMNAS_HISTOGRAMA, cubetas=CUBETAS):
+        self.columnas = [col for col in columnas if col in dataframe.columns]
+        self.cubetas = cubetas
+        valores = dataframe[self.columnas].to_numpy(dtype='float64', na_value=np.nan)
+
+        # Rango de cada columna; una columna constante se centra en un intervalo de ancho 1 (como np.histogram)
+        minimos = np.fmin.reduce(valores, axis=0, initial=np.inf)
+        maximos = np.fmax.reduce(valores, axis=0, initial=-np.inf)
+        sin_datos = ~np.isfinite(minimos)
+        minimos[sin_datos], maximos[sin_datos] = 0.0, 1.0
+        constantes = minimos == maximos
+        minimos[constantes] -= 0.5
+        maximos[constantes] += 0.5
+        self.minimos = minimos
+        self.maximos = maximos
+
+        # Cubeta de cada valor, desplazada por columna para contarlas todas de una vez
+        validos = ~np.isnan(valores)
+        with np.errstate(invalid='ignore'):
+            cubeta = ((valores - minimos) / (maximos - minimos) * cubetas).astype(np.intp)
+        np.clip(cubeta, 0, cubetas - 1, out=cubeta)
+        codigos = cubeta + np.arange(len(self.columnas)) * cubetas
+        self.conteos = np.bincount(codigos[validos], minlength=len(self.columnas) * cubetas).reshape(-1, cubetas)
+        self.acumulados = np.cumsum(self.conteos, axis=1)
+
+    def _fila(self, columna):
+        return self.columnas.index(columna)
+
+    def total(self, columna):
+        """Valores no nulos de la columna"""
+        return int(self.acumulados[self._fila(columna), -1])
+
+    def bordes(self, columna, barras):
+        fila = self._fila(columna)
+        return np.linspace(self.minimos[fila], self.maximos[fila], barras + 1)
+
+    def histograma(self, columna, barras):
+        """(conteos, bordes) de `barras` barras iguales, como np.histogram(columna, bins=barras)"""
+        if self.cubetas % barras:
+            raise ValueError(f"{barras} barras no dividen las {self.cubetas} cubetas del histograma")
+        conteos = self.conteos[self._fila(columna)].reshape(barras, -1).sum(axis=1)
+        return conteos, self.bordes(columna, barras)
+
+    def percentil(self, columna, fraccion):
+        """Menor puntaje (borde superior de su cubeta) con al menos `fraccion` de los valores por debajo o igual"""
+        fila = self._fila(columna)
+        acumulados = self.acumulados[fila]
+        if acumulados[-1] == 0:
+            return np.nan
+        cubeta = int(np.searchsorted(acumulados, fraccion * acumulados[-1], side='left'))
+        ancho = (self.maximos[fila] - self.minimos[fila]) / self.cubetas
+        return self.minimos[fila] + (min(cubeta, self.cubetas - 1) + 1) * ancho
+
+    def puntaje_top(self, columna, fraccion):
+        """Puntaje a partir del cual se está en la `fraccion` superior (0.1 = top 10%)"""
+        return self.percentil(columna, 1 - fraccion)
+
+
+_cache_histogramas = CacheLRU(MAX_HISTOGRAMAS_EN_CACHE, ttl=TTL_CACHE)
+
+
+def histogramas_dataset(dataframe, clave=None):
+    """HistogramaPuntajes del frame, construido una vez por clave (huella, escala y filtros)"""
+    if clave is None:
+        return HistogramaPuntajes(dataframe)
+    return _cache_histogramas.obtener_o_calcular(clave, lambda: HistogramaPuntajes(dataframe))
@@ -0,0 +1,403 @@
+"""Carga, validación y conversión de los archivos de admisión"""
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+from pyarrow import parquet as pq
+
+from cache import TTL_CACHE, CacheLRU
+from filtros import IndiceFiltros
+
+# Columnas mínimas que debe tener el archivo para generar el dashboard
+COLUMNAS_REQUERIDAS = ['SEXO', 'EDAD', 'NACIONALIDAD', 'TIPO.INSTITUCIÓN', 'GESTIÓN',
+                       'DEP..DOM.', 'MODALIDAD', 'OPCION.1', 'OPCION.2', 'Final', 'OM', 'Especialidad']
+
+# Lista de columnas de calificaciones
+COLUMNAS_CALIFICACIONES = ['RV', 'RM', 'Arit', 'Alg', 'Geo', 'Trig', 'Bio', 'Qui', 'Fis', 'Eco', 'Geog', 'His', 'Final']
+
+# Máximos posibles para cada área
+MAXIMOS = {
+    'RV': 25, 'RM': 25, 'Arit': 5, 'Alg': 5, 'Geo': 4, 'Trig': 4,
+    'Bio': 6, 'Qui': 6, 'Fis': 6, 'Eco': 4, 'Geog': 5, 'His': 5, 'Final': 100
+}
+
+# Máximos de cada versión del examen (otros ciclos de admisión usan otros máximos)
+MAXIMOS_POR_VERSION = {
+    '2025-I': MAXIMOS,
+}
+# Archivo JSON con más versiones: {"2024-II": {"RV": 20, ...}, ...}; las áreas que no
+# indique una versión conservan los máximos de MAXIMOS
+ARCHIVO_MAXIMOS = os.environ.get('DASHBOARD_MAXIMOS_EXAMEN')
+
+
+class VersionExamenError(ValueError):
+    """Versión del examen sin máximos conocidos"""
+
+    def __init__(self, version):
+        super().__init__(f"Versión del examen desconocida: {version!r}. "
+                         f"Versiones disponibles: {', '.join(MAXIMOS_POR_VERSION)}")
+        self.version = version
+
+    def __reduce__(self):
+        return type(self), (self.version,)
+
+
+def leer_maximos(ruta):
+    """Versión -> máximos por área desde un archivo JSON (ver ARCHIVO_MAXIMOS)"""
+    with open(ruta, encoding='utf-8') as archivo:
+        versiones = json.load(archivo)
+    maximos = {}
+    for version, por_area in versiones.items():
+        desconocidas = set(por_area) - set(MAXIMOS)
+        if desconocidas:
+            raise ValueError(f"{ruta}: áreas desconocidas en la versión {version!r}: {', '.join(sorted(desconocidas))}")
+        maximos[version] = {**MAXIMOS, **{area: float(maximo) for area, maximo in por_area.items()}}
+    return maximos
+
+
+def validar_version(version):
+    """Devuelve la versión si tiene máximos; si no, VersionExamenError con las disponibles"""
+    if version not in MAXIMOS_POR_VERSION:
+        raise VersionExamenError(version)
+    return version
+
+
+if ARCHIVO_MAXIMOS:
+    MAXIMOS_POR_VERSION.update(leer_maximos(ARCHIVO_MAXIMOS))
+VERSION_EXAMEN = validar_version(os.environ.get('DASHBOARD_VERSION_EXAMEN', '2025-I'))
+
+# Tipo compacto de cada columna tras la validación:
+#  - 'float32': calificaciones
+#  - 'entero': se reduce al entero más pequeño que admita los valores
+#  - 'categoria': texto repetitivo como pandas Categorical
+#  - 'carrera': Categorical con un único conjunto de categorías compartido por las tres
+#    columnas de carrera, para que OPCION.1 == Especialidad compare códigos directamente
+ESQUEMA_TIPOS = {
+    **{col: 'float32' for col in COLUMNAS_CALIFICACIONES},
+    'EDAD': 'entero', 'OM': 'entero',
+    'SEXO': 'categoria', 'NACIONALIDAD': 'categoria', 'TIPO.INSTITUCIÓN': 'categoria',
+    'GESTIÓN': 'categoria', 'DEP..DOM.': 'categoria', 'MODALIDAD': 'categoria',
+    'OPCION.1': 'carrera', 'OPCION.2': 'carrera', 'Especialidad': 'carrera',
+}
+
+# El resto de columnas de texto se convierte a categórica si repite bastante sus valores
+PROPORCION_MAX_CATEGORIAS = 0.5
+
+# Número de archivos (por escala) que se mantienen ya procesados en memoria
+MAX_ARCHIVOS_EN_CACHE = 8
+# Memoria total de los datasets guardados; los que usa alguna sesión activa no se desalojan
+MAX_BYTES_DATASETS = int(float(os.environ.get('DASHBOARD_MEMORIA_DATASETS_MB', '2048')) * 1024**2)
+
+# Snapshots columnares (Feather sin compresión, legibles con memory-map) de los Excel ya validados
+DIRECTORIO_SNAPSHOTS = os.environ.get('DASHBOARD_SNAPSHOTS', '.snapshots')
+# Subir la versión al cambiar ESQUEMA_TIPOS invalida los snapshots ya escritos
+VERSION_SNAPSHOT = 3
+MAX_SNAPSHOTS = 20
+EXTENSIONES_ACEPTADAS = ['xlsx', 'feather', 'parquet']
+
+# Procesos para leer en paralelo varios archivos subidos a la vez
+TRABAJADORES_INGESTA = int(os.environ.get('DASHBOARD_TRABAJADORES_INGESTA', os.cpu_count() or 1))
+
+# Ciclo de admisión en el nombre del archivo: "2025-I", "admision_2024_II", "2023 II"...
+PATRON_CICLO = re.compile(r'(?<!\d)(\d{4})[-_ ]?(III|II|I)(?![a-z])', re.IGNORECASE)
+
+
+class ColumnasFaltantesError(ValueError):
+    """El archivo no tiene todas las columnas requeridas"""
+
+    def __init__(self, faltantes):
+        super().__init__(f"Faltan las siguientes columnas en el archivo: {', '.join(faltantes)}")
+        self.faltantes = faltantes
+
+    def __reduce__(self):
+        # Para llegar intacta desde los procesos de lectura en paralelo
+        return type(self), (self.faltantes,)
+
+
+@lru_cache(maxsize=None)
+def factores_escala_20(version=VERSION_EXAMEN):
+    """Factor 20 / máximo de cada columna de COLUMNAS_CALIFICACIONES para la versión del examen"""
+    maximos = MAXIMOS_POR_VERSION[validar_version(version)]
+    factores = np.array([20 / maximos[col] for col in COLUMNAS_CALIFICACIONES], dtype=np.float32)
+    factores.flags.writeable = False
+    return factores
+
+
+def convertir_a_escala_20(dataframe, version=VERSION_EXAMEN):
+    """Convierte las calificaciones a escala de 0 a 20
+
+    Las 13 columnas se escalan y redondean en una sola operación sobre un bloque NumPy;
+    el resto de columnas se comparte con `dataframe` sin copiarse.
+    """
+    presentes = np.array([col in dataframe.columns for col in COLUMNAS_CALIFICACIONES])
+    columnas = [col for col, presente in zip(COLUMNAS_CALIFICACIONES, presentes) if presente]
+
+    calificaciones = dataframe[columnas].to_numpy(dtype=np.float32, copy=True)
+    np.multiply(calificaciones, factores_escala_20(version)[presentes], out=calificaciones)
+    np.round(calificaciones, 2, out=calificaciones)
+
+    df_convertido = dataframe.copy(deep=False)
+    df_convertido[columnas] = calificaciones
+    return df_convertido
+
+
+def validar_columnas(dataframe):
+    """Devuelve la lista de columnas requeridas que no están en el archivo"""
+    return [col for col in COLUMNAS_REQUERIDAS if col not in dataframe.columns]
+
+
+def huella_contenido(contenido):
+    """Hash SHA-256 de los bytes del archivo, usado como clave de caché"""
+    return hashlib.sha256(contenido).hexdigest()
+
+
+def huella_particiones(huellas):
+    """Huella de un conjunto de archivos (ciclo -> huella), independiente del orden de subida"""
+    return hashlib.sha256(repr(sorted(huellas.items())).encode()).hexdigest()
+
+
+def ciclo_de_archivo(nombre):
+    """Ciclo de admisión indicado en el nombre del archivo (o el nombre sin extensión)"""
+    coincidencia = PATRON_CICLO.search(nombre)
+    if coincidencia:
+        return f"{coincidencia.group(1)}-{coincidencia.group(2).upper()}"
+    return os.path.splitext(os.path.basename(nombre))[0]
+
+
+def memoria_dataframe(dataframe):
+    """Bytes ocupados por el DataFrame, contando el contenido de los textos"""
+    return int(dataframe.memory_usage(deep=True).sum())
+
+
+def es_texto(serie):
+    """Columna de texto: object o el dtype `str` con que pandas 3 lee los textos"""
+    return pd.api.types.is_object_dtype(serie) or pd.api.types.is_string_dtype(serie)
+
+
+def normalizar_tipos(dataframe):
+    """Aplica ESQUEMA_TIPOS (y categóricas para el resto de textos) sobre el frame validado"""
+    df = dataframe.copy()
+
+    columnas_carrera = [col for col, tipo in ESQUEMA_TIPOS.items() if tipo == 'carrera' and col in df.columns]
+    carreras = set().union(*(df[col].dropna().unique() for col in columnas_carrera))
+    tipo_carrera = pd.CategoricalDtype(sorted(carreras, key=str))
+
+    for col in df.columns:
+        tipo = ESQUEMA_TIPOS.get(col)
+        if tipo == 'float32':
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float32')
+        elif tipo == 'entero':
+            # Con valores vacíos no hay entero posible: se queda en float32
+            if df[col].notna().all():
+                df[col] = pd.to_numeric(df[col], downcast='integer')
+            else:
+                df[col] = pd.to_numeric(df[col], errors='coerce').astype('float32')
+        elif tipo == 'carrera':
+            df[col] = df[col].astype(tipo_carrera)
+        elif tipo == 'categoria':
+            df[col] = df[col].astype('category')
+        elif es_texto(df[col]) and df[col].nunique() <= len(df) * PROPORCION_MAX_CATEGORIAS:
+            df[col] = df[col].astype('category')
+
+    return df
+
+
+class DatasetAdmision:
+    """Frame validado y normalizado junto con los datos de su carga y su índice de filtros"""
+
+    def __init__(self, df, huella, memoria_original=None):
+        self.df = df
+        self.huella = huella
+        # Memoria antes de normalizar tipos (None si no se conoce)
+        self.memoria_original = memoria_original
+        self.memoria = memoria_dataframe(df)
+        self.indice = IndiceFiltros(df)
+
+
+def detectar_formato(contenido):
+    """Identifica el formato del archivo por sus bytes iniciales"""
+    if contenido[:6] == b'ARROW1':
+        return 'feather'
+    if contenido[:4] == b'PAR1':
+        return 'parquet'
+    return 'xlsx'
+
+
+def ruta_snapshot(huella):
+    return os.path.join(DIRECTORIO_SNAPSHOTS, f"{huella}.v{VERSION_SNAPSHOT}.feather")
+
+
+def guardar_snapshot(dataframe, ruta, memoria_original):
+    """Escribe el snapshot de forma atómica; si el Excel tiene tipos que Arrow no admite se omite"""
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    try:
+        tabla = pa.Table.from_pandas(dataframe.reset_index(drop=True), preserve_index=False)
+        metadatos = {**(tabla.schema.metadata or {}), b'memoria_original': str(memoria_original).encode()}
+        feather.write_feather(tabla.replace_schema_metadata(metadatos), temporal, compression='uncompressed')
+        os.replace(temporal, ruta)
+    except (pa.ArrowException, ValueError, OSError):
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        return
+    _podar_snapshots()
+
+
+def _podar_snapshots():
+    """Borra los snapshots más antiguos si se supera MAX_SNAPSHOTS"""
+    snapshots = [os.path.join(DIRECTORIO_SNAPSHOTS, nombre) for nombre in os.listdir(DIRECTORIO_SNAPSHOTS)
+                 if nombre.endswith('.feather')]
+    snapshots.sort(key=os.path.getmtime, reverse=True)
+    for ruta in snapshots[MAX_SNAPSHOTS:]:
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
+
+
+def bytes_snapshot(huella):
+    """Contenido del snapshot de un Excel ya cargado (o None) para ofrecerlo como descarga"""
+    ruta = ruta_snapshot(huella)
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta, 'rb') as archivo:
+        return archivo.read()
+
+
+def _leer_tabla_arrow(tabla):
+    """Convierte una tabla Arrow a pandas recuperando la memoria original guardada en el snapshot"""
+    memoria_original = (tabla.schema.metadata or {}).get(b'memoria_original')
+    return tabla.to_pandas(), int(memoria_original) if memoria_original else None
+
+
+def leer_archivo(contenido, huella):
+    """Lee, valida y normaliza el archivo subido; los Excel ya vistos se cargan desde su snapshot
+
+    Devuelve el frame normalizado y la memoria que ocupaba antes de normalizar (o None).
+    """
+    formato = detectar_formato(contenido)
+    ruta = ruta_snapshot(huella)
+
+    if formato == 'feather':
+        # Lectura sin copia sobre el buffer subido
+        df, memoria_original = _leer_tabla_arrow(feather.read_table(pa.BufferReader(contenido)))
+    elif formato == 'parquet':
+        df, memoria_original = _leer_tabla_arrow(pq.read_table(pa.BufferReader(contenido)))
+    elif os.path.exists(ruta):
+        # El snapshot ya fue validado y normalizado al escribirse
+        return _leer_tabla_arrow(feather.read_table(ruta, memory_map=True))
+    else:
+        df = pd.read_excel(BytesIO(contenido))
+        memoria_original = None
+
+    faltantes = validar_columnas(df)
+    if faltantes:
+        raise ColumnasFaltantesError(faltantes)
+    if memoria_original is None:
+        memoria_original = memoria_dataframe(df)
+    df = normalizar_tipos(df)
+
+    if formato == 'xlsx':
+        guardar_snapshot(df, ruta, memoria_original)
+    return df, memoria_original
+
+
+# La caché vive en el módulo importado, por lo que sobrevive a las
+# reejecuciones del script de Streamlit y se comparte entre sesiones
+_cache_ingesta = CacheLRU(MAX_ARCHIVOS_EN_CACHE, MAX_BYTES_DATASETS, tamano=lambda datos: datos.memoria, ttl=TTL_CACHE)
+
+
+def _clave_ingesta(huella, convertir_escala, version):
+    return huella, version if convertir_escala else None
+
+
+def _preparar_dataset(huella, df, memoria_original, convertir_escala, version):
+    """Convierte (opcionalmente) el frame ya leído y le construye su índice"""
+    if convertir_escala:
+        df = convertir_a_escala_20(df, version)
+    return DatasetAdmision(df, huella, memoria_original)
+
+
+def _guardar_dataset(huella, df, memoria_original, convertir_escala, version):
+    """_preparar_dataset y lo guarda en la caché de ingesta"""
+    datos = _preparar_dataset(huella, df, memoria_original, convertir_escala, version)
+    _cache_ingesta.guardar(_clave_ingesta(huella, convertir_escala, version), datos)
+    return datos
+
+
+def _leer_dataset(contenido, huella, convertir_escala, version):
+    return _preparar_dataset(huella, *leer_archivo(contenido, huella), convertir_escala, version)
+
+
+def cargar_dataset(contenido, convertir_escala=True, version=VERSION_EXAMEN):
+    """Lee, valida y (opcionalmente) convierte el archivo, reutilizando la caché por contenido
+
+    `version` elige los máximos de MAXIMOS_POR_VERSION usados en la conversión.
+    Devuelve un DatasetAdmision. Su DataFrame es compartido: quien lo use no debe
+    modificarlo en sitio.
+    """
+    if convertir_escala:
+        validar_version(version)
+    huella = huella_contenido(contenido)
+    # Varias sesiones que suben el mismo archivo a la vez lo leen una sola vez
+    return _cache_ingesta.obtener_o_calcular(_clave_ingesta(huella, convertir_escala, version),
+                                             lambda: _leer_dataset(contenido, huella, convertir_escala, version))
+
+
+def cargar_datasets(contenidos, convertir_escala=True, version=VERSION_EXAMEN, trabajadores=TRABAJADORES_INGESTA):
+    """cargar_dataset de varios archivos (ciclo -> bytes); devuelve ciclo -> DatasetAdmision
+
+    Cada archivo es una partición independiente: no se concatenan. Los que no están en la
+    caché se leen en paralelo en procesos aparte, así que cargar varios ciclos tarda
+    aproximadamente lo que el más grande.
+    """
+    if convertir_escala:
+        validar_version(version)
+    huellas = {ciclo: huella_contenido(contenido) for ciclo, contenido in contenidos.items()}
+    particiones = {}
+    pendientes = []
+    for ciclo in contenidos:
+        particiones[ciclo] = _cache_ingesta.obtener(_clave_ingesta(huellas[ciclo], convertir_escala, version))
+        if particiones[ciclo] is None:
+            pendientes.append(ciclo)
+
+    if len(pendientes) > 1 and trabajadores > 1:
+        # 'spawn' para no heredar los hilos del servidor de Streamlit
+        with ProcessPoolExecutor(max_workers=min(trabajadores, len(pendientes)),
+                                 mp_context=multiprocessing.get_context('spawn')) as pool:
+            futuros = {ciclo: pool.submit(leer_archivo, contenidos[ciclo], huellas[ciclo]) for ciclo in pendientes}
+            leidos = {ciclo: futuro.result() for ciclo, futuro in futuros.items()}
+        for ciclo, (df, memoria_original) in leidos.items():
+            particiones[ciclo] = _guardar_dataset(huellas[ciclo], df, memoria_original, convertir_escala, version)
+    else:
+        for ciclo in pendientes:
+            particiones[ciclo] = _cache_ingesta.calcular_una_vez(
+                _clave_ingesta(huellas[ciclo], convertir_escala, version),
+                lambda ciclo=ciclo: _leer_dataset(contenidos[ciclo], huellas[ciclo], convertir_escala, version))
+    return particiones
+
+
+def retener_datasets(sesion, particiones, convertir_escala=True, version=VERSION_EXAMEN):
+    """Reserva en la caché los datasets que usa la sesión y libera los que ya no usa
+
+    Se llama en cada reejecución; si la sesión se cierra, su reserva vence sola
+    (cache.DURACION_RETENCION).
+    """
+    claves = {_clave_ingesta(datos.huella, convertir_escala, version) for datos in particiones}
+    _cache_ingesta.soltar(sesion, excepto=claves)
+    for clave in claves:
+        _cache_ingesta.retener(clave, sesion)
+
+
+def estadisticas_cache_ingesta():
+    """Aciertos, fallos y ocupación de la caché de ingesta"""
+    return _cache_ingesta.resumen()
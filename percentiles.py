@@ -0,0 +1,193 @@
+"""Posición de un postulante cualquiera respecto a los datos: percentiles, orden de mérito y probabilidad de ingreso"""
+import numpy as np
+import pandas as pd
+
+from cache import TTL_CACHE, CacheLRU
+from ingesta import COLUMNAS_CALIFICACIONES
+
+# Grupos en los que también se calcula el percentil de cada puntaje
+GRUPOS_PERCENTIL = ['Especialidad', 'MODALIDAD']
+
+# Postulantes a cada lado en la vecindad de orden de mérito
+VECINOS_OM = 5
+
+# Postulantes de la misma primera opción a cada lado del puntaje con los que se estima la probabilidad de ingreso
+VECINOS_PROBABILIDAD = 50
+
+# Índices guardados por (huella, escala) o por conjunto de ciclos
+MAX_INDICES_EN_CACHE = 8
+
+
+def _ordenar_por_grupo(valores, codigos, categorias):
+    """Valores de cada categoría ordenados (sin NaN), como vistas de un único arreglo ordenado"""
+    validos = ~np.isnan(valores) & (codigos >= 0)
+    valores = valores[validos]
+    codigos = codigos[validos]
+    orden = np.lexsort((valores, codigos))
+    limites = np.searchsorted(codigos[orden], np.arange(len(categorias) + 1))
+    ordenados = valores[orden]
+    return {categoria: ordenados[limites[k]:limites[k + 1]] for k, categoria in enumerate(categorias)}, orden, validos
+
+
+class IndicePercentiles:
+    """Puntajes ordenados por columna para ubicar a cualquier postulante en O(log n) por columna
+
+    Guarda, para Final y cada área, los valores ordenados de todos los postulantes y de cada
+    categoría de GRUPOS_PERCENTIL; los puntajes finales de cada carrera de primera opción con
+    la suma acumulada de quienes ingresaron a ella; y el orden de mérito con su puntaje y
+    especialidad. Cada consulta es una búsqueda binaria. Los índices de varios ciclos se
+    fusionan (fusionar) sin volver a leer sus filas; la vecindad de orden de mérito solo
+    existe para un ciclo, porque el OM de ciclos distintos no es comparable.
+    """
+
+    def __init__(self):
+        self.columnas = []
+        # (grupo, categoría) -> columna -> valores ordenados; (None, None) son todos los postulantes
+        self.ordenados = {}
+        # carrera de primera opción -> (puntajes finales ordenados, ingresos acumulados con un 0 inicial)
+        self.primera_opcion = {}
+        # OM, Final y Especialidad ordenados por OM (None tras fusionar ciclos)
+        self.merito = None
+
+    @classmethod
+    def de_dataframe(cls, dataframe):
+        indice = cls()
+        indice.columnas = [col for col in COLUMNAS_CALIFICACIONES if col in dataframe.columns]
+        valores = dataframe[indice.columnas].to_numpy(dtype='float64', na_value=np.nan)
+        # Códigos de cada grupo, una sola vez para todas las columnas
+        grupos = {grupo: pd.factorize(dataframe[grupo]) for grupo in GRUPOS_PERCENTIL}
+
+        for j, col in enumerate(indice.columnas):
+            columna = valores[:, j]
+            indice.ordenados.setdefault((None, None), {})[col] = np.sort(columna[~np.isnan(columna)])
+            for grupo, (codigos, categorias) in grupos.items():
+                por_categoria, _, _ = _ordenar_por_grupo(columna, codigos, list(categorias))
+                for categoria, ordenados in por_categoria.items():
+                    indice.ordenados.setdefault((grupo, categoria), {})[col] = ordenados
+
+        # Ingreso a la primera opción, acumulado en el orden del puntaje final dentro de cada carrera
+        codigos, carreras = pd.factorize(dataframe['OPCION.1'])
+        finales = dataframe['Final'].to_numpy(dtype='float64', na_value=np.nan)
+        ingreso = (dataframe['OPCION.1'] == dataframe['Especialidad']).to_numpy(dtype=bool)
+        por_carrera, orden, validos = _ordenar_por_grupo(finales, codigos, list(carreras))
+        ingresos = ingreso[validos][orden]
+        inicio = 0
+        for carrera, ordenados in por_carrera.items():
+            fin = inicio + len(ordenados)
+            indice.primera_opcion[carrera] = (ordenados, np.concatenate([[0], np.cumsum(ingresos[inicio:fin])]))
+            inicio = fin
+
+        om = dataframe['OM'].to_numpy(dtype='float64', na_value=np.nan)
+        con_om = ~np.isnan(om)
+        orden = np.argsort(om[con_om], kind='stable')
+        indice.merito = {
+            'OM': om[con_om][orden],
+            'Final': finales[con_om][orden],
+            'Especialidad': dataframe['Especialidad'].to_numpy(dtype=object)[con_om][orden],
+        }
+        return indice
+
+    @classmethod
+    def fusionar(cls, varios):
+        """Índice de la unión de varios (p. ej. un ciclo por archivo), uniendo sus arreglos ordenados"""
+        varios = list(varios)
+        indice = cls()
+        indice.columnas = [col for col in COLUMNAS_CALIFICACIONES if all(col in otro.columnas for otro in varios)]
+        for clave in dict.fromkeys(clave for otro in varios for clave in otro.ordenados):
+            indice.ordenados[clave] = {
+                col: np.sort(np.concatenate([otro.ordenados[clave][col] for otro in varios if clave in otro.ordenados]),
+                             kind='stable')
+                for col in indice.columnas
+            }
+        for carrera in dict.fromkeys(carrera for otro in varios for carrera in otro.primera_opcion):
+            partes = [otro.primera_opcion[carrera] for otro in varios if carrera in otro.primera_opcion]
+            finales = np.concatenate([ordenados for ordenados, _ in partes])
+            ingresos = np.concatenate([np.diff(acumulados) for _, acumulados in partes])
+            orden = np.argsort(finales, kind='stable')
+            indice.primera_opcion[carrera] = (finales[orden], np.concatenate([[0], np.cumsum(ingresos[orden])]))
+        return indice
+
+    def categorias(self, grupo):
+        return [categoria for (nombre, categoria) in self.ordenados if nombre == grupo]
+
+    def mediana(self, columna):
+        ordenados = self.ordenados[(None, None)][columna]
+        return float(np.median(ordenados)) if len(ordenados) else np.nan
+
+    def percentil(self, columna, valor, grupo=None, categoria=None):
+        """Porcentaje de postulantes del grupo por debajo de `valor` (los empates cuentan la mitad)"""
+        ordenados = self.ordenados.get((grupo, categoria), {}).get(columna)
+        if ordenados is None or not len(ordenados):
+            return np.nan
+        menores = np.searchsorted(ordenados, valor, side='left')
+        iguales = np.searchsorted(ordenados, valor, side='right') - menores
+        return 100 * (menores + iguales / 2) / len(ordenados)
+
+    def orden_merito_estimado(self, final):
+        """Puesto que tendría un puntaje final: postulantes con un puntaje mayor, más uno"""
+        ordenados = self.ordenados[(None, None)]['Final']
+        return int(len(ordenados) - np.searchsorted(ordenados, final, side='right') + 1)
+
+    def vecindad_merito(self, final, vecinos=VECINOS_OM):
+        """Postulantes alrededor del orden de mérito estimado (None si el índice reúne varios ciclos)"""
+        if self.merito is None:
+            return None
+        posicion = int(np.searchsorted(self.merito['OM'], self.orden_merito_estimado(final), side='left'))
+        desde, hasta = max(posicion - vecinos, 0), posicion + vecinos
+        return pd.DataFrame({col: valores[desde:hasta] for col, valores in self.merito.items()})
+
+    def probabilidad_ingreso(self, carrera, final, vecinos=VECINOS_PROBABILIDAD):
+        """Proporción que ingresó a `carrera` entre quienes la eligieron en primera opción con puntaje cercano
+
+        Se toman los `vecinos` postulantes de la carrera inmediatamente por debajo y por encima
+        del puntaje; devuelve la probabilidad, cuántos se usaron y el rango de sus puntajes.
+        """
+        if carrera not in self.primera_opcion:
+            return None
+        finales, ingresos = self.primera_opcion[carrera]
+        if not len(finales):
+            return None
+        posicion = int(np.searchsorted(finales, final))
+        desde, hasta = max(posicion - vecinos, 0), min(posicion + vecinos, len(finales))
+        return {
+            'probabilidad': (ingresos[hasta] - ingresos[desde]) / (hasta - desde) * 100,
+            'postulantes': hasta - desde,
+            'puntaje_minimo': finales[desde],
+            'puntaje_maximo': finales[hasta - 1],
+        }
+
+    def consultar(self, puntajes, especialidad=None, modalidad=None, carrera=None):
+        """Ubicación de un vector de puntajes (columna -> valor)
+
+        Devuelve la tabla de percentiles (global y en la especialidad y modalidad indicadas),
+        el orden de mérito estimado, su vecindad y la probabilidad de ingreso a `carrera`.
+        """
+        filas = []
+        for columna, valor in puntajes.items():
+            fila = {'Área': columna, 'Puntaje': valor, 'Percentil global': self.percentil(columna, valor)}
+            if especialidad is not None:
+                fila[f'Percentil en {especialidad}'] = self.percentil(columna, valor, 'Especialidad', especialidad)
+            if modalidad is not None:
+                fila[f'Percentil en {modalidad}'] = self.percentil(columna, valor, 'MODALIDAD', modalidad)
+            filas.append(fila)
+        final = puntajes.get('Final')
+        return {
+            'percentiles': pd.DataFrame(filas).round(1),
+            'orden_merito': self.orden_merito_estimado(final) if final is not None else None,
+            'vecindad': self.vecindad_merito(final) if final is not None else None,
+            'probabilidad': self.probabilidad_ingreso(carrera, final) if carrera is not None and final is not None else None,
+        }
+
+
+_cache_indices = CacheLRU(MAX_INDICES_EN_CACHE, ttl=TTL_CACHE)
+
+
+def indice_percentiles(dataframe, clave):
+    """IndicePercentiles del dataset completo, construido una vez por clave (huella, escala)"""
+    return _cache_indices.obtener_o_calcular(clave, lambda: IndicePercentiles.de_dataframe(dataframe))
+
+
+def indice_percentiles_ciclos(dataframes, claves, clave):
+    """Índice de varios ciclos: el de cada uno (memoizado por su clave) fusionado y guardado por `clave`"""
+    return _cache_indices.obtener_o_calcular(clave, lambda: IndicePercentiles.fusionar(
+        indice_percentiles(dataframe, clave_ciclo) for dataframe, clave_ciclo in zip(dataframes, claves)))
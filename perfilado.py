@@ -0,0 +1,96 @@
+"""Medición de tiempo y memoria por sección del dashboard"""
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+from graficas import segundos_dibujando
+
+# Perfilado activado por defecto (también se puede activar desde la barra lateral)
+PERFILADO_ACTIVO = os.environ.get('DASHBOARD_PERFILADO', '').lower() in ('1', 'true', 'si', 'sí')
+# Cada medición se añade como una línea JSON a este archivo
+ARCHIVO_PERFILADO = os.environ.get('DASHBOARD_PERFILADO_LOG', 'perfilado.jsonl')
+
+_lock_archivo = threading.Lock()
+
+# tracemalloc es global al proceso: se inicia con el primer Perfilador activo y se detiene con
+# el último, salvo que ya estuviera activo antes (entonces no es nuestro y no se detiene)
+_lock_tracemalloc = threading.Lock()
+_perfiladores_activos = 0
+_tracemalloc_propio = False
+
+
+class Perfilador:
+    """Registra tiempo total, de cálculo y de dibujo y el pico de memoria de cada bloque medido
+
+    El tiempo de dibujo es el que este hilo pasa dibujando figuras (graficas.segundos_dibujando);
+    el de cálculo es el resto. El pico de memoria viene de tracemalloc, que es global al
+    proceso: con varias sesiones a la vez incluye lo que asignen las demás.
+    """
+
+    def __init__(self, archivo=ARCHIVO_PERFILADO, contexto=None):
+        self.archivo = archivo
+        # Datos comunes a todas las mediciones (huella, filtros, filas...)
+        self.contexto = contexto or {}
+        self.registros = []
+
+    def __enter__(self):
+        global _perfiladores_activos, _tracemalloc_propio
+        with _lock_tracemalloc:
+            if _perfiladores_activos == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _tracemalloc_propio = True
+            _perfiladores_activos += 1
+        return self
+
+    def __exit__(self, *exc):
+        global _perfiladores_activos, _tracemalloc_propio
+        with _lock_tracemalloc:
+            _perfiladores_activos -= 1
+            if _perfiladores_activos == 0 and _tracemalloc_propio:
+                tracemalloc.stop()
+                _tracemalloc_propio = False
+        return False
+
+    @contextmanager
+    def seccion(self, nombre):
+        memoria_inicio = 0
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            memoria_inicio = tracemalloc.get_traced_memory()[0]
+        dibujo_inicio = segundos_dibujando()
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            total = time.perf_counter() - inicio
+            dibujo = segundos_dibujando() - dibujo_inicio
+            pico = tracemalloc.get_traced_memory()[1] - memoria_inicio if tracemalloc.is_tracing() else 0
+            self.registrar({
+                'seccion': nombre,
+                'total_s': round(total, 4),
+                'calculo_s': round(total - dibujo, 4),
+                'render_s': round(dibujo, 4),
+                'pico_memoria_mb': round(max(pico, 0) / 1024**2, 2),
+            })
+
+    def registrar(self, registro):
+        """Guarda la medición en memoria y la añade al archivo JSONL (si hay archivo)"""
+        self.registros.append(registro)
+        if self.archivo is None:
+            return
+        linea = json.dumps({'momento': time.time(), **self.contexto, **registro}, ensure_ascii=False, default=str)
+        try:
+            with _lock_archivo, open(self.archivo, 'a', encoding='utf-8') as archivo:
+                archivo.write(linea + '\n')
+        except OSError:
+            # El perfilado nunca debe romper el dashboard
+            pass
+
+    def tabla(self):
+        """Mediciones de esta página, de la más lenta a la más rápida"""
+        return pd.DataFrame(self.registros).sort_values('total_s', ascending=False, ignore_index=True)
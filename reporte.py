@@ -0,0 +1,350 @@
+"""Generador de reportes estáticos (PDF o HTML) del dashboard, sin servidor de Streamlit
+
+Ejecuta el Análisis General (14 secciones) y el Análisis por Materias con el mismo código
+del dashboard para cada combinación de filtros: el dataset completo y cada modalidad y
+carrera por separado (o las columnas indicadas). Las llamadas a `st` se sustituyen por un
+registro que guarda en orden lo que la página mostraría, y ese registro se escribe como
+un PDF de varias páginas o un HTML autocontenido por combinación.
+
+Las combinaciones se reparten en un pool de procesos. Las figuras se guardan también en
+disco (graficas.usar_directorio_figuras), así que una gráfica con la misma clave se dibuja
+una sola vez aunque la pidan varios procesos o varias ejecuciones.
+
+Uso:
+    python reporte.py admision.xlsx                            # PDF por modalidad y carrera
+    python reporte.py admision.xlsx --formato html --por MODALIDAD --salida reportes
+"""
+import argparse
+import base64
+import html
+import multiprocessing
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+import pandas as pd
+
+from filtros import COLUMNA_INGRESO, INGRESARON, clave_filtros
+from graficas import MOTOR_MATPLOTLIB, TRABAJADORES_GRAFICAS, usar_directorio_figuras
+from ingesta import MAXIMOS_POR_VERSION, VERSION_EXAMEN, cargar_dataset
+
+FORMATOS = ['pdf', 'html']
+# Una combinación por cada categoría de estas columnas, además del dataset completo
+COLUMNAS_REPORTE = ['MODALIDAD', 'Especialidad']
+# Líneas de texto por página del PDF
+LINEAS_POR_PAGINA = 60
+
+ESTILO_HTML = """
+body { font-family: sans-serif; max-width: 1100px; margin: auto; color: #222; }
+.main-header { font-size: 2rem; color: #1f77b4; text-align: center; margin: 1rem 0; }
+.section-header { font-size: 1.5rem; color: #2e86ab; border-bottom: 2px solid #2e86ab; margin: 2rem 0 1rem; }
+img { max-width: 100%; }
+table { border-collapse: collapse; font-size: 0.85rem; }
+td, th { border: 1px solid #ccc; padding: 2px 6px; }
+.metrica { display: inline-block; margin: 0 2rem 1rem 0; }
+.metrica b { display: block; font-size: 1.4rem; }
+"""
+
+
+class _Espacio:
+    """Lugar reservado con st.empty(): el contenido llega después pero conserva su posición"""
+
+    def __init__(self, registro):
+        self._registro = registro
+        self._posicion = len(registro.elementos)
+        registro.elementos.append(('texto', ''))
+
+    def image(self, png, **kwargs):
+        self._registro.elementos[self._posicion] = ('imagen', png)
+
+    def __getattr__(self, nombre):
+        return getattr(self._registro, nombre)
+
+
+class RegistroStreamlit:
+    """Sustituto de `streamlit` que guarda en orden lo que la página mostraría
+
+    Columnas, pestañas y desplegables no cambian nada: su contenido se añade en el orden en
+    que se genera. Los controles devuelven su valor por defecto.
+    """
+
+    def __init__(self):
+        self.elementos = []
+        # Un reporte solo puede incluir imágenes: las gráficas se dibujan siempre con Matplotlib,
+        # aunque DASHBOARD_MOTOR_GRAFICAS elija Vega-Lite para el dashboard
+        self.session_state = {'motor_graficas': MOTOR_MATPLOTLIB}
+
+    @property
+    def sidebar(self):
+        # Lo que va a la barra lateral no forma parte del reporte
+        return RegistroStreamlit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __getattr__(self, nombre):
+        # Cualquier otra llamada (set_page_config, download_button...) se ignora
+        return lambda *args, **kwargs: self
+
+    def markdown(self, texto, *args, **kwargs):
+        self.elementos.append(('markdown', texto))
+
+    def write(self, *valores, **kwargs):
+        for valor in valores:
+            if isinstance(valor, (pd.DataFrame, pd.Series)):
+                self.dataframe(valor)
+            else:
+                self.elementos.append(('markdown', str(valor)))
+
+    def caption(self, texto, *args, **kwargs):
+        self.elementos.append(('texto', texto))
+
+    info = warning = error = success = caption
+
+    def metric(self, etiqueta, valor, delta=None, *args, **kwargs):
+        self.elementos.append(('metrica', (etiqueta, valor, delta)))
+
+    def dataframe(self, datos, *args, **kwargs):
+        self.elementos.append(('tabla', pd.DataFrame(datos)))
+
+    table = dataframe
+
+    def image(self, png, *args, **kwargs):
+        self.elementos.append(('imagen', png))
+
+    def empty(self):
+        return _Espacio(self)
+
+    def columns(self, cantidad, *args, **kwargs):
+        return [self] * (cantidad if isinstance(cantidad, int) else len(cantidad))
+
+    def tabs(self, nombres):
+        return [self] * len(nombres)
+
+    def expander(self, *args, **kwargs):
+        return self
+
+    container = expander
+
+    def selectbox(self, etiqueta, opciones=(), index=0, *args, **kwargs):
+        opciones = list(opciones)
+        return opciones[index] if opciones else None
+
+    radio = selectbox
+
+    def multiselect(self, *args, **kwargs):
+        return []
+
+    def checkbox(self, etiqueta, value=False, *args, **kwargs):
+        return value
+
+    def number_input(self, etiqueta, *args, value=None, **kwargs):
+        return value
+
+
+def _markdown_a_html(texto):
+    """Conversión mínima del markdown que usa el dashboard (títulos, negritas, viñetas y HTML propio)"""
+    if texto.lstrip().startswith('<'):
+        return texto
+    lineas = []
+    for linea in texto.strip().splitlines():
+        nivel = len(linea) - len(linea.lstrip('#'))
+        contenido = html.escape(linea.lstrip('#').strip())
+        contenido = re.sub(r'\*\*(.+?)\*\*', r'<b>\1</b>', contenido)
+        if 0 < nivel <= 6:
+            lineas.append(f'<h{nivel}>{contenido}</h{nivel}>')
+        elif contenido:
+            lineas.append(f'<p>{contenido}</p>')
+    return '\n'.join(lineas)
+
+
+# Emojis de los títulos: la fuente del PDF no los tiene
+_EMOJIS = re.compile('[\u2600-\u27bf\ufe0f\U0001f000-\U0001faff]')
+
+
+def _markdown_a_texto(texto):
+    texto = re.sub(r'<[^>]+>', '', texto)
+    texto = _EMOJIS.sub('', texto)
+    return re.sub(r'\*\*(.+?)\*\*', r'\1', texto).replace('#', '').strip()
+
+
+def escribir_html(ruta, titulo, elementos):
+    partes = []
+    for tipo, valor in elementos:
+        if tipo == 'markdown':
+            partes.append(_markdown_a_html(valor))
+        elif tipo == 'texto' and valor:
+            partes.append(f'<p><i>{html.escape(str(valor))}</i></p>')
+        elif tipo == 'metrica':
+            etiqueta, dato, delta = valor
+            extra = f' <small>{html.escape(str(delta))}</small>' if delta is not None else ''
+            partes.append(f'<div class="metrica">{html.escape(str(etiqueta))}<b>{html.escape(str(dato))}{extra}</b></div>')
+        elif tipo == 'tabla':
+            partes.append(valor.to_html(float_format=lambda x: f'{x:.2f}'))
+        elif tipo == 'imagen':
+            partes.append(f'<img src="data:image/png;base64,{base64.b64encode(valor).decode()}">')
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        archivo.write(f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{html.escape(titulo)}</title>'
+                      f'<style>{ESTILO_HTML}</style></head><body>\n<h1>{html.escape(titulo)}</h1>\n'
+                      + '\n'.join(partes) + '\n</body></html>\n')
+
+
+def escribir_pdf(ruta, titulo, elementos):
+    """PDF de varias páginas: el texto y las tablas en páginas de texto, cada gráfica en su página"""
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_pdf import PdfPages
+    from matplotlib.image import imread
+    from io import BytesIO
+
+    def pagina_texto(lineas):
+        fig = plt.figure(figsize=(8.27, 11.69))
+        fig.text(0.05, 0.97, '\n'.join(lineas), va='top', family='monospace', fontsize=7)
+        pdf.savefig(fig)
+        plt.close(fig)
+
+    def vaciar(lineas):
+        for inicio in range(0, len(lineas), LINEAS_POR_PAGINA):
+            pagina_texto(lineas[inicio:inicio + LINEAS_POR_PAGINA])
+        lineas.clear()
+
+    lineas = [titulo, '']
+    seccion = titulo
+    with PdfPages(ruta) as pdf:
+        for tipo, valor in elementos:
+            if tipo == 'markdown':
+                if 'section-header' in valor:
+                    seccion = _markdown_a_texto(valor)
+                texto = _markdown_a_texto(valor)
+                if texto:
+                    lineas.extend(texto.splitlines())
+            elif tipo == 'texto' and valor:
+                lineas.append(_markdown_a_texto(str(valor)))
+            elif tipo == 'metrica':
+                etiqueta, dato, delta = valor
+                lineas.append(_markdown_a_texto(f"{etiqueta}: {dato}" + (f" ({delta})" if delta is not None else '')))
+            elif tipo == 'tabla':
+                lineas.extend(line[:130] for line in valor.to_string(float_format=lambda x: f'{x:.2f}').splitlines())
+            elif tipo == 'imagen':
+                vaciar(lineas)
+                fig, ax = plt.subplots(figsize=(11.69, 8.27))
+                ax.imshow(imread(BytesIO(valor), format='png'))
+                ax.set_title(seccion, fontsize=10)
+                ax.axis('off')
+                pdf.savefig(fig)
+                plt.close(fig)
+        vaciar(lineas)
+
+
+def combinaciones(datos, columnas):
+    """(nombre, selección): el dataset completo y una por cada categoría de cada columna
+
+    Se omiten las categorías sin ningún ingresante (p. ej. Especialidad = No Ingreso): sin
+    carreras con ingresantes no hay nada que comparar en las secciones por carrera.
+    """
+    yield 'General', {}
+    for columna in columnas:
+        for categoria in datos.indice.categorias(columna):
+            seleccion = {columna: [categoria]}
+            if not len(datos.indice.filas_seleccionadas({**seleccion, COLUMNA_INGRESO: [INGRESARON]})):
+                continue
+            yield f'{columna} = {categoria}', seleccion
+
+
+def _nombre_archivo(nombre):
+    return re.sub(r'[^\w.-]+', '_', nombre).strip('_') or 'reporte'
+
+
+# Estado de cada proceso del pool: módulo del dashboard y dataset cargado una sola vez
+_app = None
+_datos = None
+
+
+def _iniciar_proceso(contenido, convertir_escala, version, directorio_figuras):
+    global _app, _datos
+    matplotlib.use('Agg')
+    sys.modules['streamlit'] = RegistroStreamlit()
+    import App_Streamlit
+    _app = App_Streamlit
+    usar_directorio_figuras(directorio_figuras)
+    _datos = cargar_dataset(contenido, convertir_escala, version)
+
+
+def _generar(nombre, seleccion, escala, formato, salida):
+    """Reporte de una combinación; devuelve su ruta (o None si ningún postulante la cumple o falla)
+
+    Un error en una combinación se informa por stderr sin interrumpir las demás.
+    """
+    try:
+        return _generar_reporte(nombre, seleccion, escala, formato, salida)
+    except Exception as error:
+        print(f"Reporte '{nombre}' no generado: {type(error).__name__}: {error}", file=sys.stderr)
+        return None
+
+
+def _generar_reporte(nombre, seleccion, escala, formato, salida):
+    registro = sys.modules['streamlit']
+    registro.elementos = []
+    df = _datos.indice.aplicar(_datos.df, seleccion)
+    if df.empty:
+        return None
+    clave = (_datos.huella, escala, clave_filtros(seleccion))
+    agregados = _app.agregados_filtrados(_datos, escala, seleccion)
+    _app.generar_todas_graficas(df, clave, agregados=agregados)
+    _app.analisis_materias(df, clave)
+
+    ruta = os.path.join(salida, f'{_nombre_archivo(nombre)}.{formato}')
+    titulo = f'Reporte de Admisión · {nombre} ({len(df)} postulantes)'
+    (escribir_pdf if formato == 'pdf' else escribir_html)(ruta, titulo, registro.elementos)
+    return ruta
+
+
+def generar_reportes(contenido, salida, formato='pdf', columnas=COLUMNAS_REPORTE, convertir_escala=True,
+                     version=VERSION_EXAMEN, trabajadores=TRABAJADORES_GRAFICAS):
+    """Escribe un reporte por combinación en `salida` y devuelve sus rutas"""
+    os.makedirs(salida, exist_ok=True)
+    directorio_figuras = os.path.join(salida, '.figuras')
+    escala = version if convertir_escala else None
+    # La primera carga deja el snapshot en disco: los procesos lo leen en lugar del Excel
+    datos = cargar_dataset(contenido, convertir_escala, version)
+    tareas = list(combinaciones(datos, columnas))
+
+    iniciar = (contenido, convertir_escala, version, directorio_figuras)
+    if trabajadores <= 1:
+        _iniciar_proceso(*iniciar)
+        rutas = [_generar(nombre, seleccion, escala, formato, salida) for nombre, seleccion in tareas]
+    else:
+        with ProcessPoolExecutor(max_workers=trabajadores, initializer=_iniciar_proceso, initargs=iniciar,
+                                 mp_context=multiprocessing.get_context('spawn')) as pool:
+            futuros = [pool.submit(_generar, nombre, seleccion, escala, formato, salida) for nombre, seleccion in tareas]
+            rutas = [futuro.result() for futuro in futuros]
+    return [ruta for ruta in rutas if ruta is not None]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('archivo', help="Archivo de admisión (.xlsx, .feather o .parquet)")
+    parser.add_argument('--formato', choices=FORMATOS, default='pdf')
+    parser.add_argument('--por', nargs='*', default=COLUMNAS_REPORTE,
+                        help="Columnas con un reporte por categoría (sin valores: solo el general)")
+    parser.add_argument('--salida', default='reportes', help="Directorio de los reportes")
+    parser.add_argument('--sin-escala', action='store_true', help="No convertir las calificaciones a escala 0-20")
+    parser.add_argument('--version', default=VERSION_EXAMEN, choices=list(MAXIMOS_POR_VERSION),
+                        help="Versión del examen para la conversión (más versiones con DASHBOARD_MAXIMOS_EXAMEN)")
+    parser.add_argument('--trabajadores', type=int, default=TRABAJADORES_GRAFICAS, help="Procesos en paralelo")
+    args = parser.parse_args()
+
+    with open(args.archivo, 'rb') as archivo:
+        contenido = archivo.read()
+    rutas = generar_reportes(contenido, args.salida, args.formato, args.por, not args.sin_escala,
+                             args.version, args.trabajadores)
+    for ruta in rutas:
+        print(ruta)
+
+
+if __name__ == '__main__':
+    main()
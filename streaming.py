@@ -0,0 +1,88 @@
+"""Ingesta por bloques de libros Excel muy grandes, acumulando solo Agregados"""
+from io import BytesIO
+
+import openpyxl
+import pandas as pd
+
+from cache import TTL_CACHE, CacheLRU
+from estadisticas import Agregados
+from ingesta import (COLUMNAS_CALIFICACIONES, COLUMNAS_REQUERIDAS, VERSION_EXAMEN, ColumnasFaltantesError,
+                     convertir_a_escala_20, huella_contenido, validar_columnas)
+
+# Filas que se convierten a DataFrame de una vez; acota la memoria usada durante la lectura
+FILAS_POR_BLOQUE = 50_000
+
+# Columnas numéricas que se convierten en cada bloque (el resto queda como texto)
+COLUMNAS_NUMERICAS = COLUMNAS_CALIFICACIONES + ['EDAD', 'OM']
+
+MAX_RESUMENES_EN_CACHE = 8
+
+
+def leer_excel_por_bloques(contenido, filas_por_bloque=FILAS_POR_BLOQUE):
+    """Genera DataFrames de como mucho `filas_por_bloque` filas, hoja por hoja
+
+    Usa openpyxl en modo read_only, que recorre las filas sin cargar el libro entero.
+    Las hojas sin ninguna columna requerida (notas, portadas) se omiten; las que tienen
+    solo algunas lanzan ColumnasFaltantesError.
+    """
+    libro = openpyxl.load_workbook(BytesIO(contenido), read_only=True, data_only=True)
+    try:
+        for hoja in libro.worksheets:
+            filas = hoja.iter_rows(values_only=True)
+            encabezado = next(filas, None)
+            if encabezado is None:
+                continue
+            columnas = [str(col) if col is not None else f'Unnamed: {i}' for i, col in enumerate(encabezado)]
+            faltantes = validar_columnas(pd.DataFrame(columns=columnas))
+            if len(faltantes) == len(COLUMNAS_REQUERIDAS):
+                continue
+            if faltantes:
+                raise ColumnasFaltantesError(faltantes)
+
+            bloque = []
+            for fila in filas:
+                bloque.append(fila)
+                if len(bloque) == filas_por_bloque:
+                    yield pd.DataFrame.from_records(bloque, columns=columnas)
+                    bloque = []
+            if bloque:
+                yield pd.DataFrame.from_records(bloque, columns=columnas)
+    finally:
+        libro.close()
+
+
+def _tipos_bloque(bloque):
+    """Conversión mínima de un bloque: solo las columnas numéricas que usan los agregados"""
+    for col in COLUMNAS_NUMERICAS:
+        if col in bloque.columns:
+            bloque[col] = pd.to_numeric(bloque[col], errors='coerce').astype('float32')
+    return bloque
+
+
+def agregar_contenidos(contenidos, convertir_escala=True, version=VERSION_EXAMEN,
+                       filas_por_bloque=FILAS_POR_BLOQUE):
+    """Agregados de uno o varios libros, leídos bloque a bloque sin guardar las filas"""
+    agregados = Agregados()
+    for contenido in contenidos:
+        for bloque in leer_excel_por_bloques(contenido, filas_por_bloque):
+            bloque = _tipos_bloque(bloque)
+            if convertir_escala:
+                bloque = convertir_a_escala_20(bloque, version)
+            agregados.fusionar(Agregados.de_dataframe(bloque))
+    if agregados.n_filas == 0:
+        raise ColumnasFaltantesError(COLUMNAS_REQUERIDAS)
+    return agregados
+
+
+_cache_resumenes = CacheLRU(MAX_RESUMENES_EN_CACHE, ttl=TTL_CACHE)
+
+
+def cargar_agregados(contenido, convertir_escala=True, version=VERSION_EXAMEN):
+    """agregar_contenidos de un archivo, reutilizando la caché por contenido
+
+    Devuelve la huella del archivo y sus Agregados.
+    """
+    huella = huella_contenido(contenido)
+    clave = (huella, version if convertir_escala else None)
+    agregados = _cache_resumenes.obtener_o_calcular(clave, lambda: agregar_contenidos([contenido], convertir_escala, version))
+    return huella, agregados
@@ -0,0 +1,42 @@
+"""Pruebas de la normalización de tipos de ingesta"""
+import pandas as pd
+
+from benchmark import generar_dataset
+from ingesta import ESQUEMA_TIPOS, normalizar_tipos
+
+# Textos muy repetidos que no están en ESQUEMA_TIPOS
+TEXTOS_REPETIDOS = ['DIST..NAC.', 'PROV..NAC.', 'DEP..NAC.', 'DPTO..PROCEDENCIA', 'DIST..DOM.', 'PROV..DOM.']
+
+
+def test_textos_repetidos_son_categoricos():
+    df = normalizar_tipos(generar_dataset(500))
+    for col in TEXTOS_REPETIDOS:
+        assert isinstance(df[col].dtype, pd.CategoricalDtype), col
+
+
+def test_textos_str_y_object_son_categoricos():
+    original = generar_dataset(500)
+    for tipo in ('object', 'str'):
+        df = normalizar_tipos(original.astype({col: tipo for col in TEXTOS_REPETIDOS}))
+        assert all(isinstance(df[col].dtype, pd.CategoricalDtype) for col in TEXTOS_REPETIDOS), tipo
+
+
+def test_esquema_aplicado():
+    df = normalizar_tipos(generar_dataset(500))
+    for col, tipo in ESQUEMA_TIPOS.items():
+        if col not in df.columns:
+            continue
+        if tipo == 'float32':
+            assert df[col].dtype == 'float32', col
+        elif tipo == 'entero':
+            assert pd.api.types.is_integer_dtype(df[col]), col
+        else:
+            assert isinstance(df[col].dtype, pd.CategoricalDtype), col
+    # OPCION.1, OPCION.2 y Especialidad comparten categorías
+    assert df['OPCION.1'].dtype == df['Especialidad'].dtype == df['OPCION.2'].dtype
+
+
+def test_texto_poco_repetido_no_es_categorico():
+    df = generar_dataset(500)
+    df['INSTITUCIÓN'] = [f'I{i}' for i in range(len(df))]
+    assert not isinstance(normalizar_tipos(df)['INSTITUCIÓN'].dtype, pd.CategoricalDtype)